@@ -1,14 +1,20 @@
-from agents import Agent
+import os
 
-from .tools import all_tools
+from agents import Agent, handoff
 
-ens_agent = Agent(
-    name="ENS Assistant",
-    model="gpt-4.1",
-    instructions="""You help users register and manage ENS (.eth) names on Ethereum.
+from .tools import all_tools, read_tools
+
+# Read-only turns go to LITE_MODEL with only the read tools; the run hands off
+# to the full agent when a transaction flow starts (see server.py)
+MODEL_TIERING = os.environ.get("MODEL_TIERING", "true").lower() in ("1", "true", "yes")
+LITE_MODEL = os.environ.get("LITE_MODEL", "gpt-4.1-mini")
+
+INSTRUCTIONS = """You help users register and manage ENS (.eth) names on Ethereum.
 
 RULES:
 - Always check availability before attempting registration.
+- To check many candidate names at once, use ens_check_many in one call and present the available
+  ones as a table sorted by price.
 - Explain the two-step commit-reveal process and the ~60s wait.
 - Never ask for private keys. Transactions are signed by the user's wallet.
 - When presenting a transaction for signing, tell the user: "Sign the transaction in your wallet.
@@ -22,14 +28,53 @@ RULES:
 - Transfer only works for unwrapped names. If ownership check fails, explain NameWrapper.
 - For subnames, explain the 3-transaction process (create + set address + set reverse).
 - Use ens_resolve for targeted lookups (single record, contenthash). Use ens_profile for full overviews.
+- For several names or addresses at once (lists, comparisons), use ens_profile_many in one call.
 - Use ens_verify to confirm records were set correctly after a transaction.
 - Use ens_list when a user wants to see all their names. Note: freshly registered names may take
   a minute to appear in ens_list due to subgraph indexing. If a name was just registered and
   doesn't show in the list, use ens_profile to verify ownership on-chain instead.
+  If names_omitted is set, page on with offset, or use contains to find a specific name.
 - Default to sepolia network unless the user specifies mainnet.
 - After a transaction is signed successfully, include an Etherscan link to it.
   Use [View on Etherscan](https://sepolia.etherscan.io/tx/{hash}) for sepolia,
   or [View on Etherscan](https://etherscan.io/tx/{hash}) for mainnet.
-  The tx_hash is in the sign_transaction tool result.""",
+  The tx_hash is in the sign_transaction tool result."""
+
+ens_agent = Agent(
+    name="ENS Assistant",
+    model="gpt-4.1",
+    instructions=INSTRUCTIONS,
     tools=all_tools,
 )
+
+lite_agent = Agent(
+    name="ENS Assistant (lite)",
+    model=LITE_MODEL,
+    instructions=INSTRUCTIONS + """
+
+You only have the read-only tools. As soon as the user wants to do something that needs a
+transaction (register, renew, transfer, set records, set the primary name, create a subname),
+call start_transaction_flow without answering yourself; the assistant that takes over can
+build transactions.""",
+    tools=read_tools,
+    handoffs=[handoff(
+        ens_agent,
+        tool_name_override="start_transaction_flow",
+        tool_description_override="Hand the conversation to the assistant that builds ENS transactions.",
+    )],
+)
+
+# Tier name of each agent, for the routing decision and metrics
+AGENT_TIERS = {lite_agent.name: "lite", ens_agent.name: "full"}
+
+# Folds older turns into the running summary used by the history window in server.py
+summary_agent = Agent(
+    name="History Summarizer",
+    model="gpt-4.1-mini",
+    instructions="""You maintain a running summary of an ENS assistant conversation.
+You are given the previous summary (possibly empty) and the turns that follow it.
+Return an updated summary in short bullet points. Keep every ENS name, address,
+transaction hash, registration session id, network, price and duration that was
+mentioned, and what the user still has to do next (e.g. pending commit, reveal or
+confirmation). Drop pleasantries and tool output that is no longer relevant.""",
+)
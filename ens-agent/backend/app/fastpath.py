@@ -0,0 +1,254 @@
+"""Deterministic answers for simple requests, without a model round trip.
+
+A user message that is exactly one of a few unambiguous requests (namehash of
+X, labelhash of Y, show the deployments, is foo.eth available) is answered by
+calling the same function the agent's tool would, and rendering the result
+into a fixed reply. Anything else, including a request that matches but whose
+lookup fails, goes to the agent as usual. So does a request that leans on the
+conversation: a pronoun or filler word where the name should be, or an
+availability check whose network the message, the wallet's chain and the
+earlier messages don't settle on.
+"""
+
+import json
+import os
+import re
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, replace
+from typing import Any
+
+from chatkit.types import UserMessageItem, UserMessageTextContent
+
+from .metrics import FAST_PATH_REQUESTS, FAST_PATH_SAVED_SECONDS
+from .tools.cache import cached_get
+from .tools.ens import (
+    DEPLOYMENTS_RESPONSE,
+    MIN_REGISTRABLE_LENGTH,
+    labelhash_response,
+    namehash_response,
+    normalize,
+)
+from .tools.prefetch import network_for_chain
+
+# Opt-in pre-router in front of the agent
+FAST_PATH = os.environ.get("FAST_PATH", "false").lower() in ("1", "true", "yes")
+
+# Saved latency is measured against a moving average of agent turns; until
+# there is one, this is assumed
+FAST_PATH_AGENT_SECONDS = float(os.environ.get("FAST_PATH_AGENT_SECONDS", "3"))
+
+# Recent thread messages searched for the network an availability check means
+FAST_PATH_HISTORY_ITEMS = 20
+
+_NAME = r"[^\s?!,]+"
+_NETWORK = r"(?: on (?P<network>mainnet|sepolia))?"
+_ASK = r"(?:(?:what(?:'s| is) |get |compute |show (?:me )?)(?:the )?)?"
+
+# Words that refer back to the conversation rather than name anything; taken
+# literally they would answer for it.eth or the namehash of "of"
+_FILLER = frozenset({
+    "it", "its", "that", "this", "these", "those", "they", "them", "one", "ones",
+    "same", "mine", "yours", "ours", "theirs", "there", "here", "what", "which",
+    "of", "for", "the", "a", "an", "name", "names", "domain", "label",
+})
+
+_NETWORK_MENTION = re.compile(r"\b(mainnet|sepolia)\b", re.I)
+
+_INTENTS: list[tuple[str, re.Pattern[str]]] = [
+    ("namehash", re.compile(rf"{_ASK}(?:ens )?namehash(?: (?:of|for))? (?P<name>{_NAME})", re.I)),
+    ("labelhash", re.compile(rf"{_ASK}(?:ens )?labelhash(?: (?:of|for))? (?P<name>{_NAME})", re.I)),
+    ("deployments", re.compile(
+        # A verb or "ens" is required: a bare "contracts" is more likely a follow-up
+        rf"(?:(?:show|list|get|what are)(?: me)? (?:the )?(?:ens )?|(?:the )?ens )"
+        rf"(?:deployments|contract addresses|contracts|deployed contracts){_NETWORK}",
+        re.I,
+    )),
+    ("check", re.compile(
+        rf"(?:is (?P<name>{_NAME}) (?:still )?available(?: to register)?|"
+        rf"check (?:availability of (?P<name2>{_NAME})|if (?P<name3>{_NAME}) is available)){_NETWORK}",
+        re.I,
+    )),
+]
+
+
+@dataclass(frozen=True)
+class Match:
+    intent: str
+    name: str
+    network: str | None
+
+
+def match(item: UserMessageItem) -> Match | None:
+    """The fast-path request a user message is, or None if it isn't exactly one."""
+    if item.attachments or item.quoted_text or item.inference_options.tool_choice:
+        return None
+    if not all(isinstance(part, UserMessageTextContent) for part in item.content):
+        return None
+    text = " ".join(part.text for part in item.content)
+    text = " ".join(text.split()).rstrip("?.! ")
+    for intent, pattern in _INTENTS:
+        found = pattern.fullmatch(text)
+        if found:
+            name = next((value for key, value in found.groupdict().items() if key.startswith("name") and value), "")
+            # A quoted word is meant literally, even "it"
+            if name.lower() in _FILLER:
+                return None
+            network = found.group("network") if "network" in pattern.groupindex else None
+            return Match(intent, name.strip("\"'`"), network.lower() if network else None)
+    return None
+
+
+async def thread_network(context: dict[str, Any], earlier: Callable[[], Awaitable[list[str]]] | None) -> str | None:
+    """The one network the wallet's chain and the earlier messages point to, or None if they don't agree."""
+    networks = set()
+    chain_id = context.get("chain_id")
+    if chain_id is not None:
+        network = network_for_chain(chain_id)
+        if network is None:
+            # Connected to a chain ENS isn't on: the agent should explain that
+            return None
+        networks.add(network)
+    if earlier is not None:
+        networks.update(found.lower() for text in await earlier() for found in _NETWORK_MENTION.findall(text))
+    return networks.pop() if len(networks) == 1 else None
+
+
+def _data(response: str) -> dict | None:
+    try:
+        body = json.loads(response)
+    except json.JSONDecodeError:
+        return None
+    return body.get("data") if isinstance(body, dict) and body.get("ok") is True else None
+
+
+async def _namehash(m: Match) -> str | None:
+    data = _data(namehash_response(m.name))
+    return f"The namehash of **{data['name']}** is `{data['node']}`." if data else None
+
+
+async def _labelhash(m: Match) -> str | None:
+    data = _data(labelhash_response(m.name))
+    return f"The labelhash of **{data['label']}** is `{data['labelhash']}`." if data else None
+
+
+async def _deployments(m: Match) -> str | None:
+    data = _data(DEPLOYMENTS_RESPONSE)
+    if not data:
+        return None
+    sections = []
+    for network, config in data.items():
+        if m.network and network != m.network:
+            continue
+        rows = [
+            f"- {key}: `{value}`" for key, value in config.items()
+            if isinstance(value, str) and value.startswith("0x")
+        ]
+        sections.append(f"**{network}** (chain ID {config['chainId']})\n" + "\n".join(rows))
+    return "ENS contract deployments:\n\n" + "\n\n".join(sections)
+
+
+async def _check(m: Match) -> str | None:
+    # Only an explicit .eth name; a bare word may not be meant as one
+    if not m.name.lower().endswith(".eth") or not m.network:
+        return None
+    label = m.name[:-4]
+    # Subnames aren't registered through the controller; leave them to the agent
+    if "." in label:
+        return None
+    try:
+        if len(normalize(label)) < MIN_REGISTRABLE_LENGTH:
+            return None
+    except Exception:
+        return None
+    network = m.network
+    # Same parameters as the ens_check tool, so the result is shared with its cache entry
+    data = _data(await cached_get("ens_check", "/check", {"label": label, "duration": "1y", "network": network}))
+    if not data:
+        return None
+    if not data.get("available"):
+        return f"**{data['fullName']}** is already registered on {data['network']}."
+    price = data.get("price") or {}
+    cost = ""
+    if price.get("total") and price.get("total_with_buffer"):
+        # Same terms the agent is instructed to quote
+        cost = (
+            f" Registering it for 1 year costs {price['total']} ETH. The transaction sends"
+            f" {price['total_with_buffer']} ETH, a 10% buffer, and the excess is refunded."
+        )
+    return f"**{data['fullName']}** is available on {data['network']}.{cost} Want me to register it?"
+
+
+_ANSWERS: dict[str, Callable[[Match], Awaitable[str | None]]] = {
+    "namehash": _namehash,
+    "labelhash": _labelhash,
+    "deployments": _deployments,
+    "check": _check,
+}
+
+
+class FastPath:
+    """Answers fast-path requests and counts hits and the agent time they saved."""
+
+    def __init__(self, agent_seconds: float = FAST_PATH_AGENT_SECONDS) -> None:
+        self.agent_seconds = agent_seconds
+        self.hits: Counter[str] = Counter()
+        self.fallbacks = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    async def answer(
+        self,
+        item: UserMessageItem,
+        context: dict[str, Any] | None = None,
+        earlier: Callable[[], Awaitable[list[str]]] | None = None,
+    ) -> str | None:
+        """The reply to a user message, or None to run the agent.
+
+        context is the request context (its chain_id), and earlier returns the
+        text of the thread's recent messages; both decide the network of an
+        availability check that doesn't name one.
+        """
+        found = match(item)
+        if found is None:
+            self.misses += 1
+            FAST_PATH_REQUESTS.labels("none", "miss").inc()
+            return None
+        start = time.perf_counter()
+        try:
+            if found.intent == "check" and found.network is None:
+                found = replace(found, network=await thread_network(context or {}, earlier))
+            text = await _ANSWERS[found.intent](found)
+        except Exception:
+            text = None
+        if text is None:
+            self.fallbacks += 1
+            FAST_PATH_REQUESTS.labels(found.intent, "fallback").inc()
+            return None
+        saved = max(0.0, self.agent_seconds - (time.perf_counter() - start))
+        self.hits[found.intent] += 1
+        self.saved_seconds += saved
+        FAST_PATH_REQUESTS.labels(found.intent, "hit").inc()
+        FAST_PATH_SAVED_SECONDS.inc(saved)
+        return text
+
+    def record_agent_turn(self, seconds: float) -> None:
+        """Fold a user turn that went to the agent into the moving average."""
+        self.agent_seconds += 0.1 * (seconds - self.agent_seconds)
+
+    def stats(self) -> dict[str, object]:
+        hits = sum(self.hits.values())
+        total = hits + self.fallbacks + self.misses
+        return {
+            "enabled": FAST_PATH,
+            "hits": dict(self.hits),
+            "fallbacks": self.fallbacks,
+            "misses": self.misses,
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "agent_turn_seconds": round(self.agent_seconds, 3),
+        }
+
+
+fast_path = FastPath()
@@ -0,0 +1,183 @@
+"""Incremental conversion of thread history to agent input, and history windowing."""
+
+import json
+import logging
+import os
+from collections import OrderedDict
+from collections.abc import Sequence
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, NamedTuple
+
+from agents import TResponseInputItem
+from chatkit.agents import ThreadItemConverter
+from chatkit.types import HiddenContextItem, ThreadItem, UserMessageItem
+
+from .store import VersionedStore
+
+logger = logging.getLogger(__name__)
+
+TOKENIZER_ENCODING = os.environ.get("TOKENIZER_ENCODING", "o200k_base")
+
+
+@lru_cache(maxsize=1)
+def _encoding() -> Any:
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception:
+        # Encodings are downloaded on first use; estimate if that isn't possible
+        logger.warning("Tokenizer %s unavailable, estimating tokens from length", TOKENIZER_ENCODING)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def input_tokens(items: Sequence[TResponseInputItem]) -> int:
+    return sum(count_tokens(json.dumps(item, default=str)) for item in items)
+
+
+class ConvertedItem(NamedTuple):
+    version: int
+    as_last: bool
+    input: list[TResponseInputItem]
+    tokens: int
+
+
+class AgentInputCache:
+    """Converted agent input per thread, keyed by item id and store version.
+
+    Each turn only converts items that are new or were rewritten by save_item
+    since the previous turn. Entries for deleted items are pruned once they
+    outnumber the live history, and whole threads are evicted least recently
+    used first beyond max_threads.
+    """
+
+    def __init__(
+        self, converter: ThreadItemConverter, store: VersionedStore, max_threads: int = 1024
+    ) -> None:
+        self._converter = converter
+        self._store = store
+        self._max_threads = max_threads
+        self._threads: OrderedDict[str, dict[str, ConvertedItem]] = OrderedDict()
+        self.converted = 0
+        self.reused = 0
+
+    async def convert(
+        self, thread_id: str, items: Sequence[ThreadItem]
+    ) -> list[ConvertedItem]:
+        """Converted input and token count for each item, in the same order."""
+        cache = self._threads.setdefault(thread_id, {})
+        self._threads.move_to_end(thread_id)
+        while len(self._threads) > self._max_threads:
+            self._threads.popitem(last=False)
+        entries: list[ConvertedItem] = []
+        for i, item in enumerate(items):
+            # Only quoted text on the final user message depends on position
+            as_last = i == len(items) - 1 and isinstance(item, UserMessageItem) and bool(item.quoted_text)
+            version = self._store.item_version(thread_id, item.id)
+            entry = cache.get(item.id)
+            if entry is not None and entry.version == version and entry.as_last == as_last:
+                self.reused += 1
+            else:
+                converted = await self._convert(item, as_last)
+                entry = cache[item.id] = ConvertedItem(version, as_last, converted, input_tokens(converted))
+                self.converted += 1
+            entries.append(entry)
+
+        if len(cache) > 2 * len(items) + 32:
+            live = {item.id for item in items}
+            self._threads[thread_id] = {k: v for k, v in cache.items() if k in live}
+        return entries
+
+    async def to_agent_input(
+        self, thread_id: str, items: Sequence[ThreadItem]
+    ) -> list[TResponseInputItem]:
+        return [x for entry in await self.convert(thread_id, items) for x in entry.input]
+
+    async def _convert(self, item: ThreadItem, as_last: bool) -> list[TResponseInputItem]:
+        if isinstance(item, UserMessageItem) and item.quoted_text and not as_last:
+            out = await self._converter.user_message_to_input(item, is_last_message=False) or []
+            return out if isinstance(out, list) else [out]
+        return await self._converter.to_agent_input(item)
+
+    def forget(self, thread_id: str) -> None:
+        self._threads.pop(thread_id, None)
+
+
+def is_turn_start(item: ThreadItem) -> bool:
+    """User messages and action context (tx_confirmed, countdown_complete, ...) each start a turn."""
+    return isinstance(item, (UserMessageItem, HiddenContextItem))
+
+
+def plan_window(
+    items: Sequence[ThreadItem],
+    entries: Sequence[ConvertedItem],
+    summary_through: str | None,
+    token_budget: int,
+    keep_recent_turns: int,
+    max_recent_turns: int,
+    summary_through_at: datetime | None = None,
+) -> tuple[int, int]:
+    """Split history into (summarized, verbatim) at turn boundaries.
+
+    Returns (start, window_start): items before `start` are already covered by
+    the stored summary, items[start:window_start] must be folded into it, and
+    items[window_start:] are sent verbatim. The window only moves (and the
+    summary is only recomputed) once the unsummarized tail exceeds
+    max_recent_turns or token_budget; it then shrinks back to the last
+    keep_recent_turns turns that fit the budget.
+
+    If the summary's last item is no longer among `items` (deleted, or older
+    than the loaded page), the summary covers everything created up to
+    summary_through_at.
+    """
+    start = 0
+    if summary_through is not None:
+        for i, item in enumerate(items):
+            if item.id == summary_through:
+                start = i + 1
+                break
+        else:
+            if summary_through_at is not None:
+                start = next((i for i, item in enumerate(items) if item.created_at > summary_through_at), len(items))
+
+    turn_starts = [i for i in range(start, len(items)) if is_turn_start(items[i])]
+    tail_tokens = sum(entry.tokens for entry in entries[start:])
+    if tail_tokens <= token_budget and len(turn_starts) <= max_recent_turns:
+        return start, start
+
+    kept = turn_starts[-keep_recent_turns:] if keep_recent_turns > 0 else []
+    if not kept:
+        return start, start
+    # Drop the oldest kept turns until the window fits, always keeping the last one
+    window_tokens = sum(entry.tokens for entry in entries[kept[0]:])
+    while len(kept) > 1 and window_tokens > token_budget:
+        window_tokens -= sum(entry.tokens for entry in entries[kept[0]:kept[1]])
+        kept.pop(0)
+    return start, kept[0]
+
+
+def transcript(items: Sequence[TResponseInputItem]) -> str:
+    """Plain-text rendering of agent input for the summarizer."""
+    lines = []
+    for item in items:
+        item_type = item.get("type", "message")
+        if item_type == "function_call":
+            lines.append(f"tool call {item.get('name')}: {item.get('arguments')}")
+        elif item_type == "function_call_output":
+            lines.append(f"tool result: {item.get('output')}")
+        else:
+            content = item.get("content")
+            if isinstance(content, list):
+                content = " ".join(
+                    part.get("text", "") for part in content if isinstance(part, dict)
+                )
+            lines.append(f"{item.get('role', 'user')}: {content}")
+    return "\n".join(lines)
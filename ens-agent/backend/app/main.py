@@ -1,3 +1,7 @@
+import os
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from typing import Any
 
 from dotenv import load_dotenv
@@ -9,10 +13,39 @@ from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, Response, StreamingResponse
 
+from .fastpath import fast_path
+from .metrics import CHATKIT_REQUEST_SECONDS, ERRORS, instrument_store, prompt_cache, render, timed_stream
 from .server import ENSChatKitServer
-from .store import MemoryStore
+from .store import DirectorySpill, MemoryStore, SqliteStore
+from .tools.cache import read_cache
+from .tools.helpers import (
+    close_clients,
+    open_clients,
+    pool_stats,
+    transport_stats,
+    worker_singleflight,
+)
+from .tools.prebuild import register_prebuilds
+from .tools.prefetch import wallet_prefetcher
+from .tools.projection import output_projection
+from .tracing import RequestTrace, setup_tracing, wallet_tag
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Shared Worker connection pool lives for the lifetime of the app
+    await open_clients()
+    try:
+        yield
+    finally:
+        await close_clients()
+        if isinstance(store, SqliteStore):
+            store.close()
 
-app = FastAPI(title="ENS Agent Backend")
+
+setup_tracing()
+
+app = FastAPI(title="ENS Agent Backend", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,17 +55,76 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-store = MemoryStore()
-server = ENSChatKitServer(store=store)
+# uvicorn's --workers defaults to WEB_CONCURRENCY; worker processes share no memory
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "1"))
+
+# "memory" (lost on restart) or "sqlite" (persisted to CHATKIT_SQLITE_PATH).
+# Defaults to sqlite with several workers so every process sees every thread.
+STORE_BACKEND = os.environ.get("CHATKIT_STORE", "sqlite" if WEB_CONCURRENCY > 1 else "memory")
+if STORE_BACKEND == "memory" and WEB_CONCURRENCY > 1:
+    raise RuntimeError(
+        "CHATKIT_STORE=memory cannot be shared between workers; use CHATKIT_STORE=sqlite "
+        "or WEB_CONCURRENCY=1"
+    )
+SQLITE_PATH = os.environ.get("CHATKIT_SQLITE_PATH", "ens-agent.db")
+
+# MemoryStore bounds (0 or unset = unbounded) and optional spill directory for evicted threads
+MEMORY_MAX_THREADS = int(os.environ.get("CHATKIT_MAX_THREADS", "0")) or None
+MEMORY_MAX_BYTES = int(os.environ.get("CHATKIT_MAX_BYTES", "0")) or None
+MEMORY_IDLE_SECONDS = float(os.environ.get("CHATKIT_THREAD_IDLE_SECONDS", "0")) or None
+MEMORY_SPILL_DIR = os.environ.get("CHATKIT_SPILL_DIR", "")
+
+store: MemoryStore | SqliteStore = (
+    SqliteStore(SQLITE_PATH)
+    if STORE_BACKEND == "sqlite"
+    else MemoryStore(
+        max_threads=MEMORY_MAX_THREADS,
+        max_bytes=MEMORY_MAX_BYTES,
+        idle_seconds=MEMORY_IDLE_SECONDS,
+        spill=DirectorySpill(MEMORY_SPILL_DIR) if MEMORY_SPILL_DIR else None,
+    )
+)
+instrument_store(store)
+# Prepared register txs outlive the Worker's commit session, so keep them across restarts
+if isinstance(store, SqliteStore):
+    register_prebuilds.prepared = store
+# Worker processes share run locks and action keys through the database
+server = ENSChatKitServer(
+    store=store,
+    coordination=store if WEB_CONCURRENCY > 1 and isinstance(store, SqliteStore) else None,
+)
 
 
 @app.get("/")
 async def health() -> dict[str, Any]:
-    return {"status": "ok", "agent": "ENS Assistant"}
+    return {
+        "status": "ok",
+        "agent": "ENS Assistant",
+        "worker_pool": pool_stats(),
+        "worker_singleflight": worker_singleflight.stats(),
+        "worker_transport": transport_stats(),
+        "pid": os.getpid(),
+        "read_cache": read_cache.stats(),
+        "prefetch": wallet_prefetcher.stats(),
+        "register_prebuild": register_prebuilds.stats(),
+        "fast_path": fast_path.stats(),
+        "prompt_cache": prompt_cache.stats(),
+        "tool_output": output_projection.stats(),
+        "runs": server.runs.stats(),
+        "action_idempotency": server.action_keys.stats(),
+        "store": store.stats() if isinstance(store, MemoryStore) else {"backend": STORE_BACKEND},
+    }
+
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    body, content_type = render()
+    return Response(content=body, media_type=content_type)
 
 
 @app.post("/chatkit")
 async def chatkit_endpoint(request: Request) -> Response:
+    start = time.perf_counter()
     body = await request.body()
     # Pass wallet info from frontend headers into request context
     context: dict[str, Any] = {}
@@ -42,7 +134,18 @@ async def chatkit_endpoint(request: Request) -> Response:
         context["wallet_address"] = wallet_address
     if chain_id:
         context["chain_id"] = chain_id
-    result = await server.process(body, context=context)
+    request_trace = RequestTrace(wallet=wallet_tag(wallet_address or ""), chain_id=chain_id or "")
+    headers = {"X-Trace-Id": request_trace.trace_id}
+    try:
+        with request_trace.active():
+            result = await server.process(body, context=context)
+    except Exception as err:
+        ERRORS.labels("chatkit").inc()
+        request_trace.finish(err)
+        raise
     if isinstance(result, StreamingResult):
-        return StreamingResponse(result, media_type="text/event-stream")
-    return Response(content=result.json, media_type="application/json")
+        stream = request_trace.stream(timed_stream(result, start))
+        return StreamingResponse(stream, media_type="text/event-stream", headers=headers)
+    request_trace.finish()
+    CHATKIT_REQUEST_SECONDS.labels("false").observe(time.perf_counter() - start)
+    return Response(content=result.json, media_type="application/json", headers=headers)
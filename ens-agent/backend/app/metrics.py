@@ -0,0 +1,251 @@
+"""Prometheus metrics for the chat hot path, served at GET /metrics.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to a shared empty
+directory so /metrics aggregates every process instead of the one that
+happened to answer.
+"""
+
+import functools
+import os
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any, TypeVar
+
+from agents import Agent, ModelResponse, RunContextWrapper, RunHooks, TResponseInputItem
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+# Finer buckets at the low end for store and Worker calls, up to model-scale latencies
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60, 120)
+
+CHATKIT_REQUEST_SECONDS = Histogram(
+    "ens_agent_chatkit_request_seconds",
+    "Duration of POST /chatkit, to the end of the SSE stream for streaming requests",
+    ["streaming"],
+    buckets=SLOW_BUCKETS,
+)
+CHATKIT_FIRST_EVENT_SECONDS = Histogram(
+    "ens_agent_chatkit_first_event_seconds",
+    "Time from receiving a streaming /chatkit request to its first SSE event",
+    buckets=SLOW_BUCKETS,
+)
+TOOL_SECONDS = Histogram(
+    "ens_agent_tool_seconds",
+    "Agent tool latency",
+    ["tool"],
+    buckets=FAST_BUCKETS,
+)
+WORKER_REQUEST_SECONDS = Histogram(
+    "ens_agent_worker_request_seconds",
+    "ENS Worker HTTP request latency (status is the HTTP status, or timeout/error)",
+    ["method", "route", "status"],
+    buckets=FAST_BUCKETS,
+)
+STORE_OP_SECONDS = Histogram(
+    "ens_agent_store_op_seconds",
+    "ChatKit store operation latency",
+    ["op"],
+    buckets=FAST_BUCKETS,
+)
+AGENT_RUNS = Counter(
+    "ens_agent_agent_runs_total",
+    "Agent runs by outcome",
+    ["outcome"],
+)
+CLIENT_TOOL_CALLS = Counter(
+    "ens_agent_client_tool_calls_total",
+    "Client tool calls (wallet signing requests) emitted by write tools",
+    ["operation_type"],
+)
+MODEL_CALL_SECONDS = Histogram(
+    "ens_agent_model_call_seconds",
+    "Model call latency by agent tier (lite, full) and whether any input tokens were cached",
+    ["tier", "cache"],
+    buckets=SLOW_BUCKETS,
+)
+MODEL_TOKENS = Counter(
+    "ens_agent_model_tokens_total",
+    "Model tokens by agent tier and kind (input, cached, output)",
+    ["tier", "kind"],
+)
+MODEL_TIER_RUNS = Counter(
+    "ens_agent_model_tier_runs_total",
+    "Agent runs by tier: lite, full, or escalated (started lite, handed off to full)",
+    ["tier"],
+)
+TOOL_OUTPUT_BYTES = Counter(
+    "ens_agent_tool_output_bytes_total",
+    "Tool output size before (raw) and after (projected) projection",
+    ["tool", "stage"],
+)
+TOOL_OUTPUT_TOKENS = Counter(
+    "ens_agent_tool_output_tokens_total",
+    "Tool output tokens before (raw) and after (projected) projection",
+    ["tool", "stage"],
+)
+FAST_PATH_REQUESTS = Counter(
+    "ens_agent_fast_path_requests_total",
+    "User messages seen by the fast path, by intent and outcome (hit, fallback, miss)",
+    ["intent", "outcome"],
+)
+FAST_PATH_SAVED_SECONDS = Counter(
+    "ens_agent_fast_path_saved_seconds_total",
+    "Estimated agent turn time saved by fast-path answers",
+)
+ERRORS = Counter(
+    "ens_agent_errors_total",
+    "Errors by component (chatkit, agent, tool, worker)",
+    ["component"],
+)
+
+STORE_OPS = (
+    "load_thread",
+    "save_thread",
+    "load_threads",
+    "load_thread_items",
+    "add_thread_item",
+    "save_item",
+    "load_item",
+    "delete_thread",
+    "delete_thread_item",
+)
+
+
+def timed_tool(fn: F) -> F:
+    """Record latency and failures of a tool function. Apply beneath @function_tool.
+
+    Exceptions and Worker-style error bodies ({"ok":false,...}) both count as errors.
+    """
+    histogram = TOOL_SECONDS.labels(fn.__name__)
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            ERRORS.labels("tool").inc()
+            raise
+        finally:
+            histogram.observe(time.perf_counter() - start)
+        if isinstance(result, str) and result.startswith('{"ok":false'):
+            ERRORS.labels("tool").inc()
+        return result
+
+    return wrapper  # type: ignore[return-value]
+
+
+class PromptCacheStats:
+    """Provider prompt cache usage across model calls, for GET /."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.hits = 0
+        self.input_tokens = 0
+        self.cached_tokens = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    def record(self, input_tokens: int, cached_tokens: int, seconds: float) -> None:
+        self.calls += 1
+        self.input_tokens += input_tokens
+        self.cached_tokens += cached_tokens
+        if cached_tokens:
+            self.hits += 1
+            self.hit_seconds += seconds
+        else:
+            self.miss_seconds += seconds
+
+    def stats(self) -> dict[str, float]:
+        misses = self.calls - self.hits
+        return {
+            "calls": self.calls,
+            "hits": self.hits,
+            "input_tokens": self.input_tokens,
+            "cached_tokens": self.cached_tokens,
+            "cached_ratio": round(self.cached_tokens / self.input_tokens, 3) if self.input_tokens else 0.0,
+            "hit_call_seconds": round(self.hit_seconds / self.hits, 3) if self.hits else 0.0,
+            "miss_call_seconds": round(self.miss_seconds / misses, 3) if misses else 0.0,
+        }
+
+
+prompt_cache = PromptCacheStats()
+
+
+class ModelCallMetrics(RunHooks[Any]):
+    """Run hooks recording model latency and tokens under the tier of the calling agent."""
+
+    def __init__(self, tiers: dict[str, str]) -> None:
+        self.tiers = tiers
+        self._started = 0.0
+
+    async def on_llm_start(
+        self,
+        context: RunContextWrapper[Any],
+        agent: Agent[Any],
+        system_prompt: str | None,
+        input_items: list[TResponseInputItem],
+    ) -> None:
+        self._started = time.perf_counter()
+
+    async def on_llm_end(self, context: RunContextWrapper[Any], agent: Agent[Any], response: ModelResponse) -> None:
+        seconds = time.perf_counter() - self._started
+        tier = self.tiers.get(agent.name, "other")
+        usage = response.usage
+        cached = usage.input_tokens_details.cached_tokens or 0
+        MODEL_CALL_SECONDS.labels(tier, "hit" if cached else "miss").observe(seconds)
+        MODEL_TOKENS.labels(tier, "input").inc(usage.input_tokens)
+        MODEL_TOKENS.labels(tier, "cached").inc(cached)
+        MODEL_TOKENS.labels(tier, "output").inc(usage.output_tokens)
+        prompt_cache.record(usage.input_tokens, cached, seconds)
+
+
+def instrument_store(store: Any) -> None:
+    """Time every ChatKit store operation on this store instance."""
+    for op in STORE_OPS:
+        method = getattr(store, op)
+        histogram = STORE_OP_SECONDS.labels(op)
+
+        @functools.wraps(method)
+        async def timed(*args: Any, _method=method, _histogram=histogram, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return await _method(*args, **kwargs)
+            finally:
+                _histogram.observe(time.perf_counter() - start)
+
+        setattr(store, op, timed)
+
+
+async def timed_stream(stream: AsyncIterator[bytes], start: float) -> AsyncIterator[bytes]:
+    """Pass an SSE stream through, recording time to first event and total duration."""
+    first = True
+    try:
+        async for chunk in stream:
+            if first:
+                CHATKIT_FIRST_EVENT_SECONDS.observe(time.perf_counter() - start)
+                first = False
+            yield chunk
+    except Exception:
+        ERRORS.labels("chatkit").inc()
+        raise
+    finally:
+        CHATKIT_REQUEST_SECONDS.labels("true").observe(time.perf_counter() - start)
+
+
+def render() -> tuple[bytes, str]:
+    """Exposition body and content type for GET /metrics."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,195 @@
+"""Per-thread run serialization and action idempotency.
+
+Both are kept in process memory. With several worker processes, pass a
+RunCoordination (SqliteStore implements it) so that a thread's runs and an
+action's key are also exclusive across processes.
+"""
+
+import asyncio
+import contextvars
+import os
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Hashable
+from contextlib import asynccontextmanager, suppress
+from typing import Protocol
+
+# Runs allowed to wait behind the active one on the same thread
+RUN_QUEUE_MAX = int(os.environ.get("RUN_QUEUE_MAX", "2"))
+
+# How long an action idempotency key is remembered, and how many are kept
+IDEMPOTENCY_TTL = float(os.environ.get("IDEMPOTENCY_TTL", "900"))
+IDEMPOTENCY_MAX_KEYS = int(os.environ.get("IDEMPOTENCY_MAX_KEYS", "10000"))
+
+# Cross-process run lease: renewed while the run lasts, so a crashed worker
+# holds a thread for at most this long
+RUN_LEASE_SECONDS = float(os.environ.get("RUN_LEASE_SECONDS", "30"))
+
+# Longest pause between attempts to take a lease held by another process
+_LEASE_POLL_MAX = 0.5
+
+
+class RunCoordination(Protocol):
+    """State shared by worker processes: claimed action keys and per-thread run leases."""
+
+    async def claim_key(self, key: str, ttl: float) -> bool: ...
+
+    async def release_key(self, key: str) -> None: ...
+
+    async def acquire_lease(self, name: str, owner: str, ttl: float) -> bool: ...
+
+    async def release_lease(self, name: str, owner: str) -> None: ...
+
+
+class RunQueueFull(Exception):
+    """Raised when a thread already has max_queued runs waiting."""
+
+
+class ThreadRunQueue:
+    """One agent run at a time per thread, with a bounded wait queue.
+
+    Runs on different threads don't block each other. Locks are dropped once
+    nothing holds or waits on them, so idle threads cost nothing. With
+    coordination, the holder of the local lock also takes the thread's lease
+    before running, waiting while another process holds it; the queue bound
+    is per process.
+    """
+
+    def __init__(
+        self,
+        max_queued: int = RUN_QUEUE_MAX,
+        coordination: RunCoordination | None = None,
+        lease_seconds: float = RUN_LEASE_SECONDS,
+    ) -> None:
+        self.max_queued = max_queued
+        self._coordination = coordination
+        self.lease_seconds = lease_seconds
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._waiting: dict[str, int] = {}
+        self.rejected = 0
+        self.runs = 0
+        self.waited = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    @asynccontextmanager
+    async def run(self, thread_id: str) -> AsyncIterator[None]:
+        lock = self._locks.get(thread_id)
+        if lock is None:
+            lock = self._locks[thread_id] = asyncio.Lock()
+        if lock.locked() and self._waiting.get(thread_id, 0) >= self.max_queued:
+            self.rejected += 1
+            raise RunQueueFull(thread_id)
+
+        self._waiting[thread_id] = self._waiting.get(thread_id, 0) + 1
+        start = time.perf_counter()
+        try:
+            await lock.acquire()
+        finally:
+            self._waiting[thread_id] -= 1
+            if not self._waiting[thread_id]:
+                del self._waiting[thread_id]
+
+        renewal: asyncio.Task[None] | None = None
+        owner = uuid.uuid4().hex
+        try:
+            if self._coordination is not None:
+                await self._acquire_lease(thread_id, owner)
+                renewal = asyncio.create_task(
+                    self._renew_lease(thread_id, owner), context=contextvars.Context(),
+                )
+            waited = time.perf_counter() - start
+            self.runs += 1
+            if waited > 0.001:
+                self.waited += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            yield
+        finally:
+            try:
+                if renewal is not None:
+                    renewal.cancel()
+                    with suppress(asyncio.CancelledError):
+                        await renewal
+                # Also after a cancelled acquire, which may have taken the lease anyway
+                if self._coordination is not None:
+                    await self._coordination.release_lease(thread_id, owner)
+            finally:
+                lock.release()
+                if not lock.locked() and thread_id not in self._waiting:
+                    self._locks.pop(thread_id, None)
+
+    async def _acquire_lease(self, thread_id: str, owner: str) -> None:
+        delay = 0.01
+        while not await self._coordination.acquire_lease(thread_id, owner, self.lease_seconds):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, _LEASE_POLL_MAX)
+
+    async def _renew_lease(self, thread_id: str, owner: str) -> None:
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await self._coordination.acquire_lease(thread_id, owner, self.lease_seconds)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "active": sum(1 for lock in self._locks.values() if lock.locked()),
+            "queued": sum(self._waiting.values()),
+            "runs": self.runs,
+            "waited": self.waited,
+            "rejected": self.rejected,
+            "wait_ms_mean": round(1000 * self.wait_seconds_total / self.runs, 3) if self.runs else 0.0,
+            "wait_ms_max": round(1000 * self.wait_seconds_max, 3),
+        }
+
+
+class IdempotencyKeys:
+    """Remembers recently seen keys for IDEMPOTENCY_TTL seconds, oldest dropped first.
+
+    With coordination, a key claimed here is also claimed in the shared
+    state, so a repeat that lands on another process is caught too.
+    """
+
+    def __init__(
+        self,
+        ttl: float = IDEMPOTENCY_TTL,
+        max_keys: int = IDEMPOTENCY_MAX_KEYS,
+        coordination: RunCoordination | None = None,
+    ) -> None:
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._coordination = coordination
+        self._seen: OrderedDict[Hashable, float] = OrderedDict()
+        self.duplicates = 0
+
+    async def claim(self, key: Hashable) -> bool:
+        """Record the key. False if it was already claimed within the TTL."""
+        if not self._claim_local(key):
+            return False
+        if self._coordination is not None and not await self._coordination.claim_key(repr(key), self.ttl):
+            self._seen.pop(key, None)
+            self.duplicates += 1
+            return False
+        return True
+
+    def _claim_local(self, key: Hashable) -> bool:
+        now = time.monotonic()
+        while self._seen:
+            oldest, seen_at = next(iter(self._seen.items()))
+            if now - seen_at < self.ttl and len(self._seen) < self.max_keys:
+                break
+            del self._seen[oldest]
+        if key in self._seen:
+            self.duplicates += 1
+            return False
+        self._seen[key] = now
+        return True
+
+    async def release(self, key: Hashable) -> None:
+        """Forget a key so the action can be retried (e.g. after its run failed)."""
+        self._seen.pop(key, None)
+        if self._coordination is not None:
+            await self._coordination.release_key(repr(key))
+
+    def stats(self) -> dict[str, int]:
+        return {"keys": len(self._seen), "duplicates": self.duplicates}
@@ -1,29 +1,94 @@
 """ChatKitServer subclass for the ENS Agent."""
 
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import time
 from collections.abc import AsyncIterator
+from dataclasses import dataclass, replace
 from datetime import datetime, timezone
 from typing import Any
 
-from agents import Runner
-from chatkit.agents import AgentContext, ThreadItemConverter, stream_agent_response
+from agents import ModelProvider, ModelSettings, RunConfig, Runner, TResponseInputItem
+from chatkit.agents import AgentContext, ClientToolCall, ThreadItemConverter, stream_agent_response
 from chatkit.server import ChatKitServer
 from chatkit.types import (
     Action,
+    AssistantMessageContent,
+    AssistantMessageItem,
+    ClientToolCallItem,
+    ErrorEvent,
     HiddenContextItem,
     ThreadMetadata,
+    ThreadItem,
+    ThreadItemDoneEvent,
     ThreadStreamEvent,
     UserMessageItem,
+    UserMessageTextContent,
     WidgetItem,
 )
 
-from .agent import ens_agent
-from .store import MemoryStore
+from .agent import AGENT_TIERS, MODEL_TIERING, ens_agent, lite_agent, summary_agent
+from .fastpath import FAST_PATH, FAST_PATH_HISTORY_ITEMS, fast_path
+from .history import AgentInputCache, plan_window, transcript
+from .metrics import AGENT_RUNS, CLIENT_TOOL_CALLS, ERRORS, MODEL_TIER_RUNS, ModelCallMetrics
+from .runs import IdempotencyKeys, RunCoordination, RunQueueFull, ThreadRunQueue
+from .store import VersionedStore
+from .tools.cache import read_cache
+from .tools.prebuild import REGISTER_PREBUILD, register_prebuilds
+from .tools.prefetch import PREFETCH_ENABLED, network_for_chain, wallet_prefetcher
+from .tools.writes import client_tool_call_for
+from .tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Number of most recent thread items loaded from the store each turn
+HISTORY_LIMIT = 100
+
+# Thread metadata key holding the cached summary of turns outside the window
+SUMMARY_KEY = "history_summary"
+
+# Thread metadata key holding the agent tier ("lite" or "full") its turns run on
+TIER_KEY = "model_tier"
+
+
+@dataclass(frozen=True)
+class HistoryPolicy:
+    """Which part of the thread history is sent to the model verbatim.
+
+    Turns older than the window are folded into a summary stored on the
+    thread. The window only moves once the unsummarized turns exceed
+    max_recent_turns or token_budget, so the summary is recomputed every
+    few turns rather than every turn.
+    """
+
+    token_budget: int = int(os.environ.get("HISTORY_TOKEN_BUDGET", "8000"))
+    keep_recent_turns: int = int(os.environ.get("HISTORY_KEEP_TURNS", "4"))
+    max_recent_turns: int = int(os.environ.get("HISTORY_MAX_TURNS", "8"))
+    summarize: bool = os.environ.get("HISTORY_SUMMARIZE", "true").lower() not in ("0", "false", "no")
 
 
 class ENSChatKitServer(ChatKitServer[dict[str, Any]]):
-    def __init__(self, store: MemoryStore) -> None:
+    def __init__(
+        self,
+        store: VersionedStore,
+        history_policy: HistoryPolicy | None = None,
+        model_provider: ModelProvider | None = None,
+        coordination: RunCoordination | None = None,
+    ) -> None:
         super().__init__(store=store)
+        # model_provider resolves the agents' model names; None uses the OpenAI provider
+        self._run_config = RunConfig(model_provider=model_provider) if model_provider else RunConfig()
         self._converter = ThreadItemConverter()
+        self._input_cache = AgentInputCache(self._converter, store)
+        self._history_policy = history_policy or HistoryPolicy()
+        # coordination makes run locks and action keys hold across worker processes
+        self.runs = ThreadRunQueue(coordination=coordination)
+        self.action_keys = IdempotencyKeys(coordination=coordination)
+        # Background summary updates by thread id, at most one per thread
+        self._summaries: dict[str, asyncio.Task[None]] = {}
 
     async def respond(
         self,
@@ -31,35 +96,296 @@ class ENSChatKitServer(ChatKitServer[dict[str, Any]]):
         input_user_message: UserMessageItem | None,
         context: dict[str, Any],
     ) -> AsyncIterator[ThreadStreamEvent]:
+        try:
+            async with self.runs.run(thread.id):
+                with span("respond", thread_id=thread.id):
+                    if FAST_PATH and input_user_message is not None:
+                        with span("fast_path") as fast_path_span:
+                            text = await fast_path.answer(
+                                input_user_message, context, lambda: self._recent_texts(thread, context),
+                            )
+                            fast_path_span.span_data.data["hit"] = text is not None
+                        if text is not None:
+                            yield ThreadItemDoneEvent(item=AssistantMessageItem(
+                                id=self.store.generate_item_id("message", thread, context),
+                                thread_id=thread.id,
+                                created_at=datetime.now(timezone.utc),
+                                content=[AssistantMessageContent(text=text)],
+                            ))
+                            return
+                    start = time.perf_counter()
+                    async for event in self._run(thread, context):
+                        yield event
+                    if FAST_PATH and input_user_message is not None:
+                        fast_path.record_agent_turn(time.perf_counter() - start)
+        except RunQueueFull:
+            yield _busy_event()
+
+    async def _recent_texts(self, thread: ThreadMetadata, context: dict[str, Any]) -> list[str]:
+        """Text of the thread's latest messages, newest first."""
+        page = await self.store.load_thread_items(
+            thread.id, after=None, limit=FAST_PATH_HISTORY_ITEMS, order="desc", context=context,
+        )
+        return [
+            part.text
+            for item in page.data
+            if isinstance(item, (UserMessageItem, AssistantMessageItem))
+            for part in item.content
+            if isinstance(part, (UserMessageTextContent, AssistantMessageContent))
+        ]
+
+    async def _run(
+        self,
+        thread: ThreadMetadata,
+        context: dict[str, Any],
+    ) -> AsyncIterator[ThreadStreamEvent]:
+        """One agent run over the thread's history. Callers hold the thread's run lock."""
         agent_context = AgentContext(
             thread=thread,
             store=self.store,
             request_context=context,
         )
 
-        # Load thread history and convert to agent input format
-        items_page = await self.store.load_thread_items(
-            thread.id, after=None, limit=100, order="asc", context=context,
-        )
-        input_items = await self._converter.to_agent_input(items_page.data)
+        # Load the most recent history (newest first, then back to chronological)
+        with span("store.load_thread_items", thread_id=thread.id):
+            items_page = await self.store.load_thread_items(
+                thread.id, after=None, limit=HISTORY_LIMIT, order="desc", context=context,
+            )
+        if items_page.data:
+            # The wallet reports a signed transaction as the sign_transaction output
+            _invalidate_signed_reads(items_page.data[0], context)
+            if REGISTER_PREBUILD:
+                _schedule_register_prebuild(items_page.data[0])
+        with span("to_agent_input", items=len(items_page.data)):
+            input_items = await self._history_input(thread, items_page.data[::-1], context)
 
-        # Inject wallet address from request headers so the agent knows it
+        # Inject wallet address from request headers so the agent knows it. It goes
+        # after the history: the request then starts with the static instructions
+        # and tools followed by the thread's earlier turns, which the previous
+        # request on this thread also started with, so the provider's prompt
+        # cache can serve all of it
         wallet_address = context.get("wallet_address")
         chain_id = context.get("chain_id")
         if wallet_address:
-            input_items.insert(0, {
+            input_items.append({
                 "role": "developer",
                 "content": f"The user's wallet is connected: {wallet_address} on chain ID {chain_id or 'unknown'}. Use this address as the 'owner' or 'from_addr' parameter when the user doesn't specify one.",
             })
 
-        result = Runner.run_streamed(ens_agent, input=input_items, context=agent_context)
+        tier = await self._model_tier(thread, items_page.data, context)
+        result = Runner.run_streamed(
+            ens_agent if tier == "full" else lite_agent,
+            input=input_items,
+            context=agent_context,
+            hooks=ModelCallMetrics(AGENT_TIERS),
+            run_config=self._thread_run_config(thread),
+        )
 
         # stream_agent_response handles ClientToolCall emission automatically:
         # when a write tool sets ctx.context.client_tool_call, the SDK emits
         # a ClientToolCallItem at the end of the stream, which ChatKit renders
         # and the frontend handles via onClientTool.
-        async for event in stream_agent_response(agent_context, result):
-            yield event
+        outcome = "cancelled"
+        try:
+            async for event in stream_agent_response(agent_context, result):
+                yield event
+            outcome = "completed"
+        except Exception:
+            outcome = "failed"
+            ERRORS.labels("agent").inc()
+            raise
+        finally:
+            AGENT_RUNS.labels(outcome).inc()
+
+        escalated = tier == "lite" and AGENT_TIERS.get(result.last_agent.name) == "full"
+        MODEL_TIER_RUNS.labels("escalated" if escalated else tier).inc()
+        if escalated:
+            # A transaction flow has started; stay on the full agent for the rest of the thread
+            thread.metadata[TIER_KEY] = "full"
+            await self.store.save_thread(thread, context)
+
+    def _thread_run_config(self, thread: ThreadMetadata) -> RunConfig:
+        """The run config for a turn on thread, grouped and prompt-cached by its id."""
+        settings = self._run_config.model_settings or ModelSettings()
+        # Set explicitly: whether and how the SDK derives a cache key from the
+        # group id depends on its version. Every turn of a thread is then routed
+        # to the same cache instead of a fresh key per run
+        settings = replace(settings, extra_args={**(settings.extra_args or {}), "prompt_cache_key": thread.id})
+        return replace(self._run_config, group_id=thread.id, model_settings=settings)
+
+    async def _model_tier(self, thread: ThreadMetadata, items: list[ThreadItem], context: dict[str, Any]) -> str:
+        """The thread's agent tier, decided on its first run and kept until it escalates."""
+        if not MODEL_TIERING:
+            return "full"
+        tier = thread.metadata.get(TIER_KEY)
+        if tier not in ("lite", "full"):
+            # Threads from before tiering that already built a transaction stay on the full agent
+            tier = "full" if any(isinstance(item, ClientToolCallItem) for item in items) else "lite"
+            thread.metadata[TIER_KEY] = tier
+            await self.store.save_thread(thread, context)
+        return tier
+
+    async def _history_input(
+        self,
+        thread: ThreadMetadata,
+        items: list[ThreadItem],
+        context: dict[str, Any],
+    ) -> list[TResponseInputItem]:
+        """Recent turns verbatim, preceded by the cached summary of everything older.
+
+        When the window moves, the summary is updated in the background; until
+        that finishes, turns it doesn't cover yet are sent verbatim.
+        """
+        entries = await self._input_cache.convert(thread.id, items)
+        policy = self._history_policy
+        if not policy.summarize:
+            return [x for entry in entries for x in entry.input]
+
+        summary = thread.metadata.get(SUMMARY_KEY) or {}
+        start, window_start = plan_window(
+            items,
+            entries,
+            summary.get("through"),
+            policy.token_budget,
+            policy.keep_recent_turns,
+            policy.max_recent_turns,
+            _parse_time(summary.get("through_at")),
+        )
+        if window_start > start:
+            folded = [x for entry in entries[start:window_start] for x in entry.input]
+            self._refresh_summary(thread, summary, folded, items[window_start - 1], context)
+        through = summary.get("through")
+        if through is not None and "through_at" not in summary and all(item.id != through for item in items):
+            # A summary stored without its timestamp can't be placed once its last
+            # item is gone; send the window rather than the whole page
+            start = window_start
+
+        input_items = [x for entry in entries[start:] for x in entry.input]
+        # A summary whose last item is no longer loaded still covers what came before the page
+        if summary.get("text"):
+            input_items.insert(0, {
+                "role": "developer",
+                "content": f"Summary of the earlier conversation:\n{summary['text']}",
+            })
+        return input_items
+
+    def _refresh_summary(
+        self,
+        thread: ThreadMetadata,
+        summary: dict[str, Any],
+        folded: list[TResponseInputItem],
+        through: ThreadItem,
+        context: dict[str, Any],
+    ) -> None:
+        if thread.id in self._summaries:
+            return
+        # A fresh context keeps the summary out of the triggering request's trace
+        task = asyncio.create_task(
+            self._store_summary(thread, summary, folded, through, context), context=contextvars.Context(),
+        )
+        self._summaries[thread.id] = task
+        task.add_done_callback(lambda _: self._summaries.pop(thread.id, None))
+
+    async def _store_summary(
+        self,
+        thread: ThreadMetadata,
+        summary: dict[str, Any],
+        folded: list[TResponseInputItem],
+        through: ThreadItem,
+        context: dict[str, Any],
+    ) -> None:
+        try:
+            updated = {
+                "through": through.id,
+                "through_at": through.created_at.isoformat(),
+                "text": await self._summarize(summary.get("text", ""), folded),
+            }
+            # Reload so metadata saved since this turn loaded the thread isn't reverted
+            stored = await self.store.load_thread(thread.id, context)
+            if (stored.metadata.get(SUMMARY_KEY) or {}).get("through") != summary.get("through"):
+                return
+            stored.metadata[SUMMARY_KEY] = updated
+            await self.store.save_thread(stored, context)
+            # The running turn's copy may be saved again after this
+            thread.metadata[SUMMARY_KEY] = updated
+        except Exception:
+            # The unsummarized turns keep being sent verbatim; the next turn retries
+            logger.exception("History summary failed for thread %s", thread.id)
+
+    async def _summarize(self, previous: str, folded: list[TResponseInputItem]) -> str:
+        prompt = f"Previous summary:\n{previous or '(none)'}\n\nNew turns:\n{transcript(folded)}"
+        result = await Runner.run(summary_agent, input=prompt, run_config=self._run_config)
+        return str(result.final_output).strip()
+
+    async def _invalidate_reads(
+        self,
+        thread: ThreadMetadata,
+        payload: dict[str, Any],
+        context: dict[str, Any],
+    ) -> None:
+        """Drop cached reads for the name and owner touched by a confirmed transaction."""
+        terms = [payload.get(key) for key in ("name", "address", "owner")]
+        terms.append(context.get("wallet_address"))
+        # The signed tx's name is carried on the most recent sign_transaction call
+        recent = await self.store.load_thread_items(
+            thread.id, after=None, limit=20, order="desc", context=context,
+        )
+        for item in recent.data:
+            if isinstance(item, ClientToolCallItem):
+                terms.append(item.arguments.get("operation"))
+                break
+        read_cache.invalidate(*[t for t in terms if isinstance(t, str)])
+
+    async def _commit_session(self, thread: ThreadMetadata, context: dict[str, Any]) -> str | None:
+        """Session id of the thread's most recent commit transaction."""
+        recent = await self.store.load_thread_items(
+            thread.id, after=None, limit=20, order="desc", context=context,
+        )
+        for item in recent.data:
+            if isinstance(item, ClientToolCallItem) and item.arguments.get("operation_type") == "commit":
+                return item.arguments.get("session_id")
+        return None
+
+    async def _send_prebuilt_register(
+        self,
+        thread: ThreadMetadata,
+        response: str,
+        call: ClientToolCall,
+        context: dict[str, Any],
+    ) -> AsyncIterator[ThreadStreamEvent]:
+        """Hand a register tx built during the wait straight to the wallet, without an agent run."""
+        data = json.loads(response)["data"]
+        name = data.get("name", "your name")
+        price = data.get("price_eth")
+        now = datetime.now(timezone.utc)
+        cost = f" for {price} ETH (sent with a 10% buffer; any excess is refunded)" if price else ""
+        hidden = HiddenContextItem(
+            id=self.store.generate_item_id("message", thread, context),
+            thread_id=thread.id,
+            created_at=now,
+            content=(
+                "The commit-reveal wait period is complete. The register transaction "
+                f"for {name}{cost} was built and sent to the wallet for signing."
+            ),
+        )
+        await self.store.add_thread_item(thread.id, hidden, context)
+        yield ThreadItemDoneEvent(item=AssistantMessageItem(
+            id=self.store.generate_item_id("message", thread, context),
+            thread_id=thread.id,
+            created_at=now,
+            content=[AssistantMessageContent(
+                text=f"The wait is over. Please sign the registration of **{name}** in your wallet{cost}.",
+            )],
+        ))
+        yield ThreadItemDoneEvent(item=ClientToolCallItem(
+            id=self.store.generate_item_id("tool_call", thread, context),
+            thread_id=thread.id,
+            created_at=now,
+            name=call.name,
+            arguments=call.arguments,
+            call_id=self.store.generate_item_id("tool_call", thread, context),
+        ))
+        CLIENT_TOOL_CALLS.labels("register").inc()
 
     async def action(
         self,
@@ -67,11 +393,36 @@ class ENSChatKitServer(ChatKitServer[dict[str, Any]]):
         action: Action[str, Any],
         sender: WidgetItem | None,
         context: dict[str, Any],
+    ) -> AsyncIterator[ThreadStreamEvent]:
+        key = _idempotency_key(thread, action)
+        if key is not None and not await self.action_keys.claim(key):
+            # Already handled (wallet retry, double click): acknowledge without another run
+            return
+        finished = False
+        try:
+            async with self.runs.run(thread.id):
+                with span("action", thread_id=thread.id, type=action.type):
+                    async for event in self._handle_action(thread, action, context):
+                        yield event
+            finished = True
+        except RunQueueFull:
+            yield _busy_event()
+        finally:
+            # Failed, rejected, cancelled or disconnected (GeneratorExit): let a retry run it
+            if key is not None and not finished:
+                await self.action_keys.release(key)
+
+    async def _handle_action(
+        self,
+        thread: ThreadMetadata,
+        action: Action[str, Any],
+        context: dict[str, Any],
     ) -> AsyncIterator[ThreadStreamEvent]:
         now = datetime.now(timezone.utc)
 
         if action.type == "tx_confirmed":
             tx_hash = action.payload.get("tx_hash", "unknown")
+            await self._invalidate_reads(thread, action.payload, context)
             hidden = HiddenContextItem(
                 id=self.store.generate_item_id("message", thread, context),
                 thread_id=thread.id,
@@ -79,10 +430,17 @@ class ENSChatKitServer(ChatKitServer[dict[str, Any]]):
                 content=f"Transaction confirmed with hash: {tx_hash}",
             )
             await self.store.add_thread_item(thread.id, hidden, context)
-            async for event in self.respond(thread, None, context):
+            async for event in self._run(thread, context):
                 yield event
 
         elif action.type == "countdown_complete":
+            session_id = action.payload.get("session_id") or await self._commit_session(thread, context)
+            prebuilt = await register_prebuilds.take(session_id) if REGISTER_PREBUILD and session_id else None
+            call = client_tool_call_for(prebuilt, "register") if prebuilt else None
+            if call is not None:
+                async for event in self._send_prebuilt_register(thread, prebuilt, call, context):
+                    yield event
+                return
             hidden = HiddenContextItem(
                 id=self.store.generate_item_id("message", thread, context),
                 thread_id=thread.id,
@@ -90,7 +448,7 @@ class ENSChatKitServer(ChatKitServer[dict[str, Any]]):
                 content="The commit-reveal wait period is complete. The user is ready to proceed with registration.",
             )
             await self.store.add_thread_item(thread.id, hidden, context)
-            async for event in self.respond(thread, None, context):
+            async for event in self._run(thread, context):
                 yield event
 
         elif action.type == "tx_rejected":
@@ -102,7 +460,7 @@ class ENSChatKitServer(ChatKitServer[dict[str, Any]]):
                 content=f"Transaction rejected by user: {reason}",
             )
             await self.store.add_thread_item(thread.id, hidden, context)
-            async for event in self.respond(thread, None, context):
+            async for event in self._run(thread, context):
                 yield event
 
         elif action.type == "wallet_connected":
@@ -115,4 +473,69 @@ class ENSChatKitServer(ChatKitServer[dict[str, Any]]):
                 content=f"User's wallet is connected: {address} on chain {chain_id}",
             )
             await self.store.add_thread_item(thread.id, hidden, context)
-            # Context injection only — no re-run needed
+            # Context injection only — no re-run needed. Warm the read cache
+            # for the questions that usually follow a connect.
+            network = network_for_chain(chain_id)
+            if PREFETCH_ENABLED and isinstance(address, str) and address and network:
+                wallet_prefetcher.start(address, network)
+
+
+def _idempotency_key(thread: ThreadMetadata, action: Action[str, Any]) -> tuple[str, ...] | None:
+    """Key identifying repeats of the same action, or None if it can't be told apart from a new one.
+
+    An explicit payload idempotency_key wins; tx_confirmed is keyed by tx_hash,
+    wallet_connected by address and chain, countdown_complete by session_id.
+    """
+    payload = action.payload or {}
+    if payload.get("idempotency_key"):
+        value = payload["idempotency_key"]
+    elif action.type == "tx_confirmed":
+        value = payload.get("tx_hash")
+    elif action.type == "wallet_connected":
+        value = f"{payload.get('address')}:{payload.get('chainId')}" if payload.get("address") else None
+    elif action.type == "countdown_complete":
+        value = payload.get("session_id")
+    else:
+        value = None
+    if not isinstance(value, str) or not value:
+        return None
+    return (thread.id, action.type, value.lower())
+
+
+def _invalidate_signed_reads(item: ThreadItem, context: dict[str, Any]) -> None:
+    """Drop cached reads for the name and wallet touched by a transaction the user just signed."""
+    if not isinstance(item, ClientToolCallItem) or item.name != "sign_transaction" or item.status != "completed":
+        return
+    output = item.output if isinstance(item.output, dict) else {}
+    if not output.get("success"):
+        return
+    terms = [item.arguments.get("operation"), context.get("wallet_address")]
+    read_cache.invalidate(*[t for t in terms if isinstance(t, str)])
+
+
+def _schedule_register_prebuild(item: ThreadItem) -> None:
+    """Start building the register tx once the signed commit tx is confirmed."""
+    if not isinstance(item, ClientToolCallItem) or item.status != "completed":
+        return
+    arguments = item.arguments
+    output = item.output if isinstance(item.output, dict) else {}
+    if arguments.get("operation_type") != "commit" or not arguments.get("session_id"):
+        return
+    # "submitted" means the receipt timed out, so the commit may not be on-chain
+    if not output.get("success") or output.get("status") == "submitted":
+        return
+    register_prebuilds.schedule(arguments["session_id"], float(arguments.get("wait_seconds") or 60))
+
+
+def _busy_event() -> ErrorEvent:
+    return ErrorEvent(
+        message="Still working on earlier requests in this conversation. Please try again in a moment.",
+        allow_retry=True,
+    )
+
+
+def _parse_time(value: object) -> datetime | None:
+    try:
+        return datetime.fromisoformat(value) if isinstance(value, str) else None
+    except ValueError:
+        return None
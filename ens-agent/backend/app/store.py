@@ -1,17 +1,355 @@
+import asyncio
+import os
+import sqlite3
+import time
 import uuid
-from typing import Any
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Generic, Protocol, TypeVar
 
 from chatkit.store import NotFoundError, Store
 from chatkit.types import Attachment, Page, ThreadItem, ThreadMetadata
+from pydantic import TypeAdapter
 
+T = TypeVar("T")
 
-class MemoryStore(Store[dict[str, Any]]):
-    """In-memory store for MVP. Can be replaced with SQLite/Redis later."""
+_item_adapter: TypeAdapter[ThreadItem] = TypeAdapter(ThreadItem)
+_items_adapter: TypeAdapter[list[ThreadItem]] = TypeAdapter(list[ThreadItem])
+_attachment_adapter: TypeAdapter[Attachment] = TypeAdapter(Attachment)
+
+
+class _HasId(Protocol):
+    id: str
+
+
+V = TypeVar("V", bound=_HasId)
+
+
+class OrderedIndex(Generic[V]):
+    """Values in insertion order with an id -> slot index.
+
+    Lookup, replace and delete by id are O(1). Deleted slots are left as
+    tombstones and compacted once they make up half the list. Pages are keyset
+    paginated by id, so they never copy the whole history and stay stable
+    while new values are appended.
+    """
 
     def __init__(self) -> None:
-        self._threads: dict[str, ThreadMetadata] = {}
-        self._items: dict[str, list[ThreadItem]] = {}
+        self._slots: list[V | None] = []
+        self._index: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, value_id: str) -> bool:
+        return value_id in self._index
+
+    def get(self, value_id: str) -> V | None:
+        slot = self._index.get(value_id)
+        return None if slot is None else self._slots[slot]
+
+    def append(self, value: V) -> None:
+        """Add a value at the end.
+
+        A value whose id is already present is moved to the end rather than
+        stored twice (the old list-backed store kept both copies): ids must be
+        unique for lookups and page cursors to be unambiguous.
+        """
+        if value.id in self._index:
+            self.delete(value.id)
+        self._index[value.id] = len(self._slots)
+        self._slots.append(value)
+
+    def put(self, value: V) -> None:
+        """Replace the value with the same id in place, or append it."""
+        slot = self._index.get(value.id)
+        if slot is None:
+            self.append(value)
+        else:
+            self._slots[slot] = value
+
+    def delete(self, value_id: str) -> V | None:
+        slot = self._index.pop(value_id, None)
+        if slot is None:
+            return None
+        value = self._slots[slot]
+        self._slots[slot] = None
+        if len(self._slots) > 2 * len(self._index) + 32:
+            self._compact()
+        return value
+
+    def _compact(self) -> None:
+        self._slots = [value for value in self._slots if value is not None]
+        self._index = {value.id: i for i, value in enumerate(self._slots)}
+
+    def values(self) -> Iterator[V]:
+        return (value for value in self._slots if value is not None)
+
+    def page(self, after: str | None, limit: int, order: str) -> Page[Any]:
+        """Up to `limit` values after the `after` id, oldest first for "asc", newest first for "desc".
+
+        An unknown cursor (e.g. a deleted value) yields an empty page rather
+        than restarting from the beginning.
+        """
+        desc = order == "desc"
+        if after is None:
+            start = len(self._slots) - 1 if desc else 0
+        elif after in self._index:
+            start = self._index[after] + (-1 if desc else 1)
+        else:
+            return Page(data=[], has_more=False, after=None)
+        slots = range(start, -1, -1) if desc else range(start, len(self._slots))
+        values = (self._slots[i] for i in slots)
+        if len(self._slots) != len(self._index):
+            values = (value for value in values if value is not None)
+        page = list(islice(values, limit + 1))
+        has_more = len(page) > limit
+        data = page[:limit]
+        return Page(data=data, has_more=has_more, after=data[-1].id if has_more else None)
+
+
+class VersionedStore(Store[dict[str, Any]]):
+    """Store that versions items on every add_thread_item and save_item.
+
+    ChatKit mutates items in place before calling save_item (e.g. completing a
+    client tool call), so callers caching per-item derived data compare
+    item_version rather than the item itself. Every add and save draws a new
+    version from one counter for the whole store (SqliteStore keeps it in the
+    database), so a value is never handed out twice: a cache entry recorded
+    before an item's version was forgotten (eviction, deletion and re-adding
+    the same id) can never match the version it gets afterwards.
+
+    With max_version_threads, versions are kept for that many threads, least
+    recently used dropped first; only stores that can read versions back
+    (SqliteStore, on load_thread_items) should set it.
+    """
+
+    def __init__(self, max_version_threads: int | None = None) -> None:
+        self._versions: OrderedDict[str, dict[str, int]] = OrderedDict()
+        self._max_version_threads = max_version_threads
+        self._last_version = 0
+
+    def item_version(self, thread_id: str, item_id: str) -> int:
+        return self._versions.get(thread_id, {}).get(item_id, 0)
+
+    def _thread_versions(self, thread_id: str) -> dict[str, int]:
+        versions = self._versions.setdefault(thread_id, {})
+        self._versions.move_to_end(thread_id)
+        if self._max_version_threads is not None:
+            while len(self._versions) > self._max_version_threads:
+                self._versions.popitem(last=False)
+        return versions
+
+    def _set_version(self, thread_id: str, item_id: str, version: int) -> None:
+        self._thread_versions(thread_id)[item_id] = version
+
+    def _bump_version(self, thread_id: str, item_id: str) -> None:
+        self._last_version += 1
+        self._set_version(thread_id, item_id, self._last_version)
+
+    def _forget_version(self, thread_id: str, item_id: str | None = None) -> None:
+        if item_id is None:
+            self._versions.pop(thread_id, None)
+        else:
+            self._versions.get(thread_id, {}).pop(item_id, None)
+
+
+class ThreadSpill(Protocol):
+    """Where MemoryStore puts the items of evicted threads until they are accessed again."""
+
+    async def save(self, thread_id: str, items: list[ThreadItem]) -> None: ...
+
+    async def load(self, thread_id: str) -> list[ThreadItem] | None: ...
+
+    async def delete(self, thread_id: str) -> None: ...
+
+
+class DirectorySpill:
+    """Spills each evicted thread's items to one JSON file.
+
+    This is overflow space, not persistence: the directory is cleared on
+    startup. Use SqliteStore to keep threads across restarts. Serialization
+    and file I/O run in a worker thread, off the event loop.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            if name.endswith(".json"):
+                os.remove(os.path.join(path, name))
+
+    def _file(self, thread_id: str) -> str:
+        return os.path.join(self._path, f"{thread_id}.json")
+
+    def _save(self, thread_id: str, items: list[ThreadItem]) -> None:
+        with open(self._file(thread_id), "wb") as f:
+            f.write(_items_adapter.dump_json(items))
+
+    def _load(self, thread_id: str) -> list[ThreadItem] | None:
+        try:
+            with open(self._file(thread_id), "rb") as f:
+                return _items_adapter.validate_json(f.read())
+        except FileNotFoundError:
+            return None
+
+    def _delete(self, thread_id: str) -> None:
+        try:
+            os.remove(self._file(thread_id))
+        except FileNotFoundError:
+            pass
+
+    async def save(self, thread_id: str, items: list[ThreadItem]) -> None:
+        await asyncio.to_thread(self._save, thread_id, items)
+
+    async def load(self, thread_id: str) -> list[ThreadItem] | None:
+        return await asyncio.to_thread(self._load, thread_id)
+
+    async def delete(self, thread_id: str) -> None:
+        await asyncio.to_thread(self._delete, thread_id)
+
+
+class MemoryStore(VersionedStore):
+    """In-memory store. Threads are lost on restart; use SqliteStore to persist them.
+
+    Optionally bounded: once more than max_threads threads or max_bytes of
+    serialized threads and items are resident, or a thread has been idle for
+    idle_seconds, the least recently accessed threads are evicted. With a
+    spill, an evicted thread keeps its metadata in memory, its items go to the
+    spill and are reloaded on next access; without one it is dropped. Sizes are
+    approximated by the length of each value's JSON serialization. Spill
+    writes and reloads are serialized by a lock; a thread stays marked as
+    spilled until its items are back, so concurrent accesses wait for them.
+    """
+
+    def __init__(
+        self,
+        max_threads: int | None = None,
+        max_bytes: int | None = None,
+        idle_seconds: float | None = None,
+        spill: ThreadSpill | None = None,
+    ) -> None:
+        super().__init__()
+        self._threads: OrderedIndex[ThreadMetadata] = OrderedIndex()
+        self._items: dict[str, OrderedIndex[ThreadItem]] = {}
         self._attachments: dict[str, Attachment] = {}
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self._spill = spill
+        self._spilled: set[str] = set()
+        self._spill_lock = asyncio.Lock()
+        # Resident threads, least recently accessed first, with access time
+        self._access: OrderedDict[str, float] = OrderedDict()
+        self._item_bytes: dict[str, dict[str, int]] = {}
+        self._thread_bytes: dict[str, int] = {}
+        self._bytes = 0
+        self.evictions = 0
+        self.reloads = 0
+
+    def _thread_items(self, thread_id: str) -> OrderedIndex[ThreadItem]:
+        items = self._items.get(thread_id)
+        if items is None:
+            items = self._items[thread_id] = OrderedIndex()
+        return items
+
+    async def _touch(self, thread_id: str) -> None:
+        """Mark a thread as just accessed, reloading it from the spill and evicting others as needed."""
+        await self._resident(thread_id)
+        self._access[thread_id] = time.monotonic()
+        self._access.move_to_end(thread_id)
+        await self._evict(keep=thread_id)
+
+    async def _resident(self, thread_id: str) -> None:
+        if thread_id in self._spilled:
+            async with self._spill_lock:
+                if thread_id in self._spilled:
+                    await self._reload(thread_id)
+
+    def _victim(self, keep: str | None) -> str | None:
+        """The least recently accessed thread if the store is over a bound, else None."""
+        if not self._access:
+            return None
+        thread_id, accessed = next(iter(self._access.items()))
+        over = (
+            (self.max_threads is not None and len(self._access) > self.max_threads)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            or (self.idle_seconds and accessed < time.monotonic() - self.idle_seconds)
+        )
+        # The thread being accessed is the most recent, so stop rather than evict it
+        return thread_id if over and thread_id != keep else None
+
+    async def _evict(self, keep: str | None = None) -> None:
+        if self._victim(keep) is None:
+            return
+        async with self._spill_lock:
+            while (thread_id := self._victim(keep)) is not None:
+                await self._evict_thread(thread_id)
+
+    async def _evict_thread(self, thread_id: str) -> None:
+        items = self._items.pop(thread_id, None)
+        spill = self._spill is not None and thread_id in self._threads
+        if spill:
+            self._spilled.add(thread_id)
+        else:
+            self._threads.delete(thread_id)
+        self._access.pop(thread_id, None)
+        self._item_bytes.pop(thread_id, None)
+        self._bytes -= self._thread_bytes.pop(thread_id, 0)
+        self._forget_version(thread_id)
+        self.evictions += 1
+        if spill:
+            await self._spill.save(thread_id, list(items.values()) if items is not None else [])
+
+    async def _reload(self, thread_id: str) -> None:
+        loaded = await self._spill.load(thread_id) or []
+        thread = self._threads.get(thread_id)
+        self._add_bytes(thread_id, "", len(thread.model_dump_json()) if thread else 0)
+        items = self._thread_items(thread_id)
+        for item in loaded:
+            items.append(item)
+            self._add_bytes(thread_id, item.id, len(_item_adapter.dump_json(item)))
+            # Versions were forgotten on eviction; fresh ones invalidate anything cached before
+            self._bump_version(thread_id, item.id)
+        self._spilled.discard(thread_id)
+        self.reloads += 1
+        await self._spill.delete(thread_id)
+
+    def _add_bytes(self, thread_id: str, key: str, size: int) -> None:
+        """Record the size of a thread's metadata ("") or of one of its items, replacing any previous size."""
+        sizes = self._item_bytes.setdefault(thread_id, {})
+        delta = size - sizes.get(key, 0)
+        sizes[key] = size
+        self._thread_bytes[thread_id] = self._thread_bytes.get(thread_id, 0) + delta
+        self._bytes += delta
+
+    def _drop_bytes(self, thread_id: str, key: str) -> None:
+        size = self._item_bytes.get(thread_id, {}).pop(key, 0)
+        if size:
+            self._thread_bytes[thread_id] -= size
+            self._bytes -= size
+
+    def thread_bytes(self, thread_id: str) -> int:
+        """Approximate resident size of a thread, 0 if evicted or unknown."""
+        return self._thread_bytes.get(thread_id, 0)
+
+    def stats(self) -> dict[str, Any]:
+        sizes = self._thread_bytes.values()
+        return {
+            "threads": len(self._threads),
+            "resident_threads": len(self._access),
+            "spilled_threads": len(self._spilled),
+            "bytes": self._bytes,
+            "mean_thread_bytes": self._bytes // len(sizes) if sizes else 0,
+            "max_thread_bytes": max(sizes, default=0),
+            "max_threads": self.max_threads,
+            "max_bytes": self.max_bytes,
+            "idle_seconds": self.idle_seconds,
+            "evictions": self.evictions,
+            "reloads": self.reloads,
+        }
 
     def generate_thread_id(self, context: dict[str, Any]) -> str:
         return str(uuid.uuid4())
@@ -24,14 +362,19 @@ class MemoryStore(Store[dict[str, Any]]):
     async def load_thread(
         self, thread_id: str, context: dict[str, Any]
     ) -> ThreadMetadata:
-        if thread_id not in self._threads:
+        thread = self._threads.get(thread_id)
+        if thread is None:
             raise NotFoundError(f"Thread {thread_id} not found")
-        return self._threads[thread_id]
+        await self._touch(thread_id)
+        return thread
 
     async def save_thread(
         self, thread: ThreadMetadata, context: dict[str, Any]
     ) -> None:
-        self._threads[thread.id] = thread
+        await self._resident(thread.id)
+        self._threads.put(thread)
+        self._add_bytes(thread.id, "", len(thread.model_dump_json()))
+        await self._touch(thread.id)
 
     async def load_threads(
         self,
@@ -40,10 +383,7 @@ class MemoryStore(Store[dict[str, Any]]):
         order: str,
         context: dict[str, Any],
     ) -> Page[ThreadMetadata]:
-        threads = list(self._threads.values())
-        if order == "desc":
-            threads.reverse()
-        return Page(data=threads[:limit], has_more=len(threads) > limit, after=None)
+        return self._threads.page(after, limit, order)
 
     async def load_thread_items(
         self,
@@ -53,45 +393,67 @@ class MemoryStore(Store[dict[str, Any]]):
         order: str,
         context: dict[str, Any],
     ) -> Page[ThreadItem]:
-        items = list(self._items.get(thread_id, []))
-        if order == "desc":
-            items.reverse()
-        return Page(data=items[:limit], has_more=len(items) > limit, after=None)
+        if thread_id in self._threads:
+            await self._touch(thread_id)
+        items = self._items.get(thread_id)
+        if items is None:
+            return Page(data=[], has_more=False, after=None)
+        return items.page(after, limit, order)
 
     async def add_thread_item(
         self, thread_id: str, item: ThreadItem, context: dict[str, Any]
     ) -> None:
-        self._items.setdefault(thread_id, []).append(item)
+        await self._touch(thread_id)
+        items = self._thread_items(thread_id)
+        self._bump_version(thread_id, item.id)
+        items.append(item)
+        self._add_bytes(thread_id, item.id, len(_item_adapter.dump_json(item)))
+        await self._evict(keep=thread_id)
 
     async def save_item(
         self, thread_id: str, item: ThreadItem, context: dict[str, Any]
     ) -> None:
-        items = self._items.setdefault(thread_id, [])
-        for i, existing in enumerate(items):
-            if existing.id == item.id:
-                items[i] = item
-                return
-        items.append(item)
+        await self._touch(thread_id)
+        self._thread_items(thread_id).put(item)
+        self._bump_version(thread_id, item.id)
+        self._add_bytes(thread_id, item.id, len(_item_adapter.dump_json(item)))
+        await self._evict(keep=thread_id)
 
     async def load_item(
         self, thread_id: str, item_id: str, context: dict[str, Any]
     ) -> ThreadItem:
-        for item in self._items.get(thread_id, []):
-            if item.id == item_id:
-                return item
-        raise NotFoundError(f"Item {item_id} not found in thread {thread_id}")
+        if thread_id in self._threads:
+            await self._touch(thread_id)
+        items = self._items.get(thread_id)
+        item = items.get(item_id) if items is not None else None
+        if item is None:
+            raise NotFoundError(f"Item {item_id} not found in thread {thread_id}")
+        return item
 
     async def delete_thread(
         self, thread_id: str, context: dict[str, Any]
     ) -> None:
-        self._threads.pop(thread_id, None)
+        self._threads.delete(thread_id)
         self._items.pop(thread_id, None)
+        self._access.pop(thread_id, None)
+        self._item_bytes.pop(thread_id, None)
+        self._bytes -= self._thread_bytes.pop(thread_id, 0)
+        if thread_id in self._spilled:
+            async with self._spill_lock:
+                self._spilled.discard(thread_id)
+                await self._spill.delete(thread_id)
+        self._forget_version(thread_id)
 
     async def delete_thread_item(
         self, thread_id: str, item_id: str, context: dict[str, Any]
     ) -> None:
-        items = self._items.get(thread_id, [])
-        self._items[thread_id] = [i for i in items if i.id != item_id]
+        if thread_id in self._threads:
+            await self._touch(thread_id)
+        items = self._items.get(thread_id)
+        if items is not None:
+            items.delete(item_id)
+        self._drop_bytes(thread_id, item_id)
+        self._forget_version(thread_id, item_id)
 
     async def save_attachment(
         self, attachment: Attachment, context: dict[str, Any]
@@ -109,3 +471,336 @@ class MemoryStore(Store[dict[str, Any]]):
         self, attachment_id: str, context: dict[str, Any]
     ) -> None:
         self._attachments.pop(attachment_id, None)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS threads (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS threads_created_at ON threads (created_at, id);
+
+CREATE TABLE IF NOT EXISTS items (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    thread_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS items_thread_created_at ON items (thread_id, created_at, seq);
+
+CREATE TABLE IF NOT EXISTS item_version_counter (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    value INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS attachments (
+    id TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS action_keys (
+    key TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS action_keys_expires_at ON action_keys (expires_at);
+
+CREATE TABLE IF NOT EXISTS run_leases (
+    thread_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS prepared_txs (
+    session_id TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    built_at REAL NOT NULL
+);
+"""
+
+
+class SqliteStore(VersionedStore):
+    """SQLite store in WAL mode. Persists threads across restarts.
+
+    Writes run on a single dedicated thread and reads on another, each with its
+    own connection, so the event loop never blocks on disk I/O. Several
+    processes can share one database file: item versions are kept in the
+    database and picked up when items are loaded, so another process's
+    save_item is seen like a local one. It also implements RunCoordination,
+    keeping claimed action keys and per-thread run leases in the database.
+    """
+
+    def __init__(self, path: str, max_version_threads: int = 1024) -> None:
+        super().__init__(max_version_threads)
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-writer")
+        self._reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-reader")
+        self._write_conn = self._connect(path)
+        self._write_conn.executescript(_SCHEMA)
+        columns = [row[1] for row in self._write_conn.execute("PRAGMA table_info(items)")]
+        if "version" not in columns:
+            self._write_conn.execute("ALTER TABLE items ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self._write_conn.execute(
+            "INSERT OR IGNORE INTO item_version_counter (id, value) SELECT 1, COALESCE(MAX(version), 0) FROM items"
+        )
+        self._read_conn = self._connect(path)
+
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        # Wait for other processes' writes instead of failing with "database is locked"
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    async def _read(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._reader, fn, self._read_conn)
+
+    async def _write(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._writer, fn, self._write_conn)
+
+    def close(self) -> None:
+        self._reader.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+        self._read_conn.close()
+        self._write_conn.close()
+
+    def generate_thread_id(self, context: dict[str, Any]) -> str:
+        return str(uuid.uuid4())
+
+    def generate_item_id(
+        self, item_type: str, thread: ThreadMetadata, context: dict[str, Any]
+    ) -> str:
+        return str(uuid.uuid4())
+
+    async def load_thread(
+        self, thread_id: str, context: dict[str, Any]
+    ) -> ThreadMetadata:
+        row = await self._read(lambda conn: conn.execute(
+            "SELECT data FROM threads WHERE id = ?", (thread_id,)
+        ).fetchone())
+        if row is None:
+            raise NotFoundError(f"Thread {thread_id} not found")
+        return ThreadMetadata.model_validate_json(row[0])
+
+    async def save_thread(
+        self, thread: ThreadMetadata, context: dict[str, Any]
+    ) -> None:
+        # Strip items if a full Thread is passed in
+        data = ThreadMetadata(**thread.model_dump()).model_dump_json()
+        await self._write(lambda conn: conn.execute(
+            "INSERT INTO threads (id, created_at, data) VALUES (?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET data = excluded.data",
+            (thread.id, thread.created_at.timestamp(), data),
+        ))
+
+    async def load_threads(
+        self,
+        limit: int,
+        after: str | None,
+        order: str,
+        context: dict[str, Any],
+    ) -> Page[ThreadMetadata]:
+        direction, cmp = ("DESC", "<") if order == "desc" else ("ASC", ">")
+
+        def query(conn: sqlite3.Connection) -> list[tuple[str, str]]:
+            where, args = "", []
+            if after:
+                cursor = conn.execute(
+                    "SELECT created_at FROM threads WHERE id = ?", (after,)
+                ).fetchone()
+                if cursor is None:
+                    return []
+                where = f"WHERE (created_at, id) {cmp} (?, ?)"
+                args = [cursor[0], after]
+            return conn.execute(
+                f"SELECT id, data FROM threads {where} "
+                f"ORDER BY created_at {direction}, id {direction} LIMIT ?",
+                (*args, limit + 1),
+            ).fetchall()
+
+        rows = await self._read(query)
+        threads = [ThreadMetadata.model_validate_json(data) for _, data in rows[:limit]]
+        has_more = len(rows) > limit
+        return Page(data=threads, has_more=has_more, after=threads[-1].id if has_more else None)
+
+    async def load_thread_items(
+        self,
+        thread_id: str,
+        after: str | None,
+        limit: int,
+        order: str,
+        context: dict[str, Any],
+    ) -> Page[ThreadItem]:
+        direction, cmp = ("DESC", "<") if order == "desc" else ("ASC", ">")
+
+        def query(conn: sqlite3.Connection) -> list[tuple[str, str, int]]:
+            where, args = "", []
+            if after:
+                cursor = conn.execute(
+                    "SELECT created_at, seq FROM items WHERE id = ? AND thread_id = ?",
+                    (after, thread_id),
+                ).fetchone()
+                if cursor is None:
+                    return []
+                where = f"AND (created_at, seq) {cmp} (?, ?)"
+                args = list(cursor)
+            return conn.execute(
+                f"SELECT id, data, version FROM items WHERE thread_id = ? {where} "
+                f"ORDER BY created_at {direction}, seq {direction} LIMIT ?",
+                (thread_id, *args, limit + 1),
+            ).fetchall()
+
+        rows = await self._read(query)
+        for item_id, _, version in rows[:limit]:
+            if version != self.item_version(thread_id, item_id):
+                self._set_version(thread_id, item_id, version)
+        items = [_item_adapter.validate_json(data) for _, data, _ in rows[:limit]]
+        has_more = len(rows) > limit
+        return Page(data=items, has_more=has_more, after=items[-1].id if has_more else None)
+
+    async def add_thread_item(
+        self, thread_id: str, item: ThreadItem, context: dict[str, Any]
+    ) -> None:
+        await self._upsert_item(thread_id, item)
+
+    async def save_item(
+        self, thread_id: str, item: ThreadItem, context: dict[str, Any]
+    ) -> None:
+        await self._upsert_item(thread_id, item)
+
+    async def _upsert_item(self, thread_id: str, item: ThreadItem) -> None:
+        data = _item_adapter.dump_json(item).decode()
+
+        def upsert(conn: sqlite3.Connection) -> int:
+            # IMMEDIATE takes the write lock first, so other processes draw distinct versions
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = conn.execute(
+                    "UPDATE item_version_counter SET value = value + 1 RETURNING value"
+                ).fetchone()[0]
+                conn.execute(
+                    "INSERT INTO items (id, thread_id, created_at, data, version) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT (id) DO UPDATE SET data = excluded.data, version = excluded.version",
+                    (item.id, thread_id, item.created_at.timestamp(), data, version),
+                )
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return version
+
+        self._set_version(thread_id, item.id, await self._write(upsert))
+
+    async def load_item(
+        self, thread_id: str, item_id: str, context: dict[str, Any]
+    ) -> ThreadItem:
+        row = await self._read(lambda conn: conn.execute(
+            "SELECT data FROM items WHERE id = ? AND thread_id = ?", (item_id, thread_id)
+        ).fetchone())
+        if row is None:
+            raise NotFoundError(f"Item {item_id} not found in thread {thread_id}")
+        return _item_adapter.validate_json(row[0])
+
+    async def delete_thread(
+        self, thread_id: str, context: dict[str, Any]
+    ) -> None:
+        def delete(conn: sqlite3.Connection) -> None:
+            conn.execute("BEGIN")
+            try:
+                conn.execute("DELETE FROM items WHERE thread_id = ?", (thread_id,))
+                conn.execute("DELETE FROM threads WHERE id = ?", (thread_id,))
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+        await self._write(delete)
+        self._forget_version(thread_id)
+
+    async def delete_thread_item(
+        self, thread_id: str, item_id: str, context: dict[str, Any]
+    ) -> None:
+        await self._write(lambda conn: conn.execute(
+            "DELETE FROM items WHERE id = ? AND thread_id = ?", (item_id, thread_id)
+        ))
+        self._forget_version(thread_id, item_id)
+
+    async def save_attachment(
+        self, attachment: Attachment, context: dict[str, Any]
+    ) -> None:
+        data = _attachment_adapter.dump_json(attachment).decode()
+        await self._write(lambda conn: conn.execute(
+            "INSERT INTO attachments (id, data) VALUES (?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET data = excluded.data",
+            (attachment.id, data),
+        ))
+
+    async def load_attachment(
+        self, attachment_id: str, context: dict[str, Any]
+    ) -> Attachment:
+        row = await self._read(lambda conn: conn.execute(
+            "SELECT data FROM attachments WHERE id = ?", (attachment_id,)
+        ).fetchone())
+        if row is None:
+            raise NotFoundError(f"Attachment {attachment_id} not found")
+        return _attachment_adapter.validate_json(row[0])
+
+    async def delete_attachment(
+        self, attachment_id: str, context: dict[str, Any]
+    ) -> None:
+        await self._write(lambda conn: conn.execute(
+            "DELETE FROM attachments WHERE id = ?", (attachment_id,)
+        ))
+
+    async def claim_key(self, key: str, ttl: float) -> bool:
+        def claim(conn: sqlite3.Connection) -> bool:
+            now = time.time()
+            conn.execute("DELETE FROM action_keys WHERE expires_at < ?", (now,))
+            return conn.execute(
+                "INSERT INTO action_keys (key, expires_at) VALUES (?, ?) ON CONFLICT (key) DO NOTHING",
+                (key, now + ttl),
+            ).rowcount == 1
+
+        return await self._write(claim)
+
+    async def release_key(self, key: str) -> None:
+        await self._write(lambda conn: conn.execute("DELETE FROM action_keys WHERE key = ?", (key,)))
+
+    async def acquire_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew the run lease on a thread; False while another owner holds an unexpired one."""
+        def acquire(conn: sqlite3.Connection) -> bool:
+            now = time.time()
+            return conn.execute(
+                "INSERT INTO run_leases (thread_id, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (thread_id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE run_leases.owner = excluded.owner OR run_leases.expires_at < ?",
+                (name, owner, now + ttl, now),
+            ).rowcount == 1
+
+        return await self._write(acquire)
+
+    async def release_lease(self, name: str, owner: str) -> None:
+        await self._write(lambda conn: conn.execute(
+            "DELETE FROM run_leases WHERE thread_id = ? AND owner = ?", (name, owner)
+        ))
+
+    async def save_prepared_tx(self, session_id: str, response: str, built_at: float) -> None:
+        await self._write(lambda conn: conn.execute(
+            "INSERT OR REPLACE INTO prepared_txs (session_id, response, built_at) VALUES (?, ?, ?)",
+            (session_id, response, built_at),
+        ))
+
+    async def load_prepared_tx(self, session_id: str) -> tuple[str, float] | None:
+        row = await self._read(lambda conn: conn.execute(
+            "SELECT response, built_at FROM prepared_txs WHERE session_id = ?", (session_id,)
+        ).fetchone())
+        return (row[0], row[1]) if row else None
+
+    async def delete_prepared_txs(self, built_before: float) -> None:
+        await self._write(lambda conn: conn.execute(
+            "DELETE FROM prepared_txs WHERE built_at < ?", (built_before,)
+        ))
@@ -1,6 +1,8 @@
 from .reads import (
     ens_check,
+    ens_check_many,
     ens_profile,
+    ens_profile_many,
     ens_resolve,
     ens_list,
     ens_verify,
@@ -21,7 +23,9 @@ from .writes import (
 
 read_tools = [
     ens_check,
+    ens_check_many,
     ens_profile,
+    ens_profile_many,
     ens_resolve,
     ens_list,
     ens_verify,
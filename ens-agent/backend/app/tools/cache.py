@@ -0,0 +1,118 @@
+"""Bounded TTL/LRU read-through cache for Worker read tools."""
+
+import json
+import os
+import time
+from collections import OrderedDict
+
+from .helpers import worker_get
+
+READ_CACHE_MAX_ENTRIES = int(os.environ.get("READ_CACHE_MAX_ENTRIES", "2048"))
+
+# Seconds a cached Worker response stays fresh, per tool
+READ_CACHE_TTLS: dict[str, float] = {
+    "ens_check": 30,
+    "ens_profile": 60,
+    "ens_resolve": 60,
+    "ens_resolver": 300,
+    "ens_list": 60,
+}
+
+CacheKey = tuple[str, tuple[tuple[str, str], ...], str]
+
+
+def _normalize(value: object) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value).strip().lower()
+
+
+class ReadCache:
+    """LRU cache of Worker responses keyed by (tool, normalized params, network)."""
+
+    def __init__(self, max_entries: int, ttls: dict[str, float]) -> None:
+        self.max_entries = max_entries
+        self.ttls = ttls
+        self._entries: OrderedDict[CacheKey, tuple[float, str]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def key(self, tool: str, params: dict) -> CacheKey:
+        network = _normalize(params.get("network") or "sepolia")
+        rest = tuple(sorted(
+            (k, _normalize(v))
+            for k, v in params.items()
+            if k != "network" and v not in (None, "")
+        ))
+        return (tool, rest, network)
+
+    def get(self, key: CacheKey) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: CacheKey, value: str) -> None:
+        ttl = self.ttls.get(key[0], 0)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, *terms: str) -> int:
+        """Drop every entry whose params mention one of the given names or addresses."""
+        targets = {_normalize(t) for t in terms if t}
+        # A full name also invalidates label-keyed lookups such as ens_check
+        targets |= {t.removesuffix(".eth") for t in targets if t.endswith(".eth")}
+        if not targets:
+            return 0
+        stale = [
+            key for key in self._entries
+            if any(value in targets for _, value in key[1])
+        ]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+read_cache = ReadCache(READ_CACHE_MAX_ENTRIES, READ_CACHE_TTLS)
+
+
+async def cached_get(tool: str, path: str, params: dict) -> str:
+    """worker_get through the read cache. Only successful responses are cached."""
+    key = read_cache.key(tool, params)
+    cached = read_cache.get(key)
+    if cached is not None:
+        return cached
+    response = await worker_get(path, params)
+    try:
+        ok = json.loads(response).get("ok") is True
+    except (json.JSONDecodeError, AttributeError):
+        ok = False
+    if ok:
+        read_cache.set(key, response)
+    return response
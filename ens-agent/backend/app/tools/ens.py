@@ -0,0 +1,127 @@
+"""Native ENS utilities: ENSIP-15 normalization, namehash/labelhash and deployments.
+
+Mirrors the Worker's lib/node.ts, lib/config.ts and routes/utils.ts so the
+namehash, labelhash and deployments tools can answer without a network hop.
+Responses are serialized the way Hono's c.json does (JSON.stringify), so the
+returned text is byte-identical to the Worker's.
+"""
+
+import json
+import re
+from functools import lru_cache
+from typing import Any
+
+from Crypto.Hash import keccak
+from ens_normalize import ens_normalize
+
+# Copied from ens-agent-api/src/lib/config.ts — keep in sync on release
+ENS_DEPLOYMENTS: dict[str, dict[str, Any]] = {
+    "mainnet": {
+        "chainId": 1,
+        "parentDomain": "eth",
+        "registry": "0x00000000000C2E074eC69A0dFb2997BA6C7d2e1e",
+        "resolver": "0x231b0Ee14048e9dCcD1d247744d114a4EB5E8E63",
+        "registrarController": "0x253553366Da8546fC250F225fe3d25d0C782303b",
+        "baseRegistrar": "0x57f1887a8BF19b14fC0dF6Fd9B2acc9Af147eA85",
+        "nameWrapper": "0xD4416b13d2b3a9aBae7AcD5D6C2BbDBE25686401",
+        "reverseRegistrar": "0xa58E81fe9b61B5c3fE2AFD33CF304c454AbFc7Cb",
+        "universalResolver": "0xeEeEEEeE14D718C2B47D9923Deab1335E144EeEe",
+        "ensNodeSubgraph": "https://api.alpha.ensnode.io/subgraph",
+        "rpcUrl": "https://eth.drpc.org",
+        "explorerUrl": "https://etherscan.io",
+    },
+    "sepolia": {
+        "chainId": 11155111,
+        "parentDomain": "eth",
+        "registry": "0x00000000000C2E074eC69A0dFb2997BA6C7d2e1e",
+        "resolver": "0xE99638b40E4Fff0129D56f03b55b6bbC4BBE49b5",
+        "registrarController": "0xfb3cE5D01e0f33f41DbB39035dB9745962F1f968",
+        "baseRegistrar": "0x57f1887a8bf19b14fc0df6fd9b2acc9af147ea85",
+        "nameWrapper": "0x0635513f179D50A207757E05759CbD106d7dFcE8",
+        "reverseRegistrar": "0xA0a1AbcDAe1a2a4A2EF8e9113Ff0e02DD81DC0C6",
+        "universalResolver": "0xeEeEEEeE14D718C2B47D9923Deab1335E144EeEe",
+        "ensNodeSubgraph": "https://api.alpha-sepolia.ensnode.io/subgraph",
+        "rpcUrl": "https://sepolia.drpc.org",
+        "explorerUrl": "https://sepolia.etherscan.io",
+    },
+}
+
+_ENCODED_LABEL = re.compile(r"^\[([0-9a-fA-F]{64})\]$")
+
+# The .eth registrar controller only registers labels at least this many characters long
+MIN_REGISTRABLE_LENGTH = 3
+
+
+def to_json(data: Any) -> str:
+    """Serialize like JSON.stringify: no whitespace, non-ASCII left as-is."""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+def keccak256(data: bytes) -> bytes:
+    return keccak.new(digest_bits=256, data=data).digest()
+
+
+def normalize(name: str) -> str:
+    """ENSIP-15 normalization (same algorithm as viem's normalize)."""
+    return ens_normalize(name)
+
+
+@lru_cache(maxsize=4096)
+def labelhash(label: str) -> str:
+    """keccak256 of a label's UTF-8 bytes as 0x-prefixed hex. Does not normalize."""
+    return "0x" + keccak256(label.encode("utf-8")).hex()
+
+
+@lru_cache(maxsize=4096)
+def namehash(name: str) -> str:
+    """EIP-137 namehash with viem semantics, including `[hash]` encoded labels. Does not normalize."""
+    node = bytes(32)
+    if not name:
+        return "0x" + node.hex()
+    for label in reversed(name.split(".")):
+        encoded = _ENCODED_LABEL.match(label)
+        hashed = bytes.fromhex(encoded.group(1)) if encoded else keccak256(label.encode("utf-8"))
+        node = keccak256(node + hashed)
+    return "0x" + node.hex()
+
+
+def normalize_ens_name(input: str) -> dict[str, str]:
+    """Port of normalizeEnsName: strip .eth, normalize each label, re-append .eth."""
+    label_path = input[:-4] if input.lower().endswith(".eth") else input
+    full_name = ".".join(normalize(part) for part in label_path.split(".")) + ".eth"
+    return {"label": label_path, "fullName": full_name, "node": namehash(full_name)}
+
+
+def _missing_param(message: str) -> str:
+    return to_json({"ok": False, "error": {"code": "MISSING_PARAM", "message": message}})
+
+
+def _internal_error(err: Exception) -> str:
+    return to_json({"ok": False, "error": {"code": "INTERNAL_ERROR", "message": str(err)}})
+
+
+def namehash_response(name: str) -> str:
+    """Same body as GET /namehash. Dotted names are hashed as given, bare labels get .eth."""
+    if not name:
+        return _missing_param("name is required")
+    if "." in name:
+        return to_json({"ok": True, "data": {"name": name, "node": namehash(name)}})
+    try:
+        normalized = normalize_ens_name(name)
+    except Exception as err:
+        return _internal_error(err)
+    return to_json({"ok": True, "data": {"name": normalized["fullName"], "node": normalized["node"]}})
+
+
+def labelhash_response(label: str) -> str:
+    """Same body as GET /labelhash. Only the first label is hashed, after normalization."""
+    if not label:
+        return _missing_param("label is required")
+    try:
+        normalized = normalize(label.split(".")[0])
+    except Exception as err:
+        return _internal_error(err)
+    return to_json({"ok": True, "data": {"label": normalized, "labelhash": labelhash(normalized)}})
+
+
+DEPLOYMENTS_RESPONSE = to_json({"ok": True, "data": ENS_DEPLOYMENTS})
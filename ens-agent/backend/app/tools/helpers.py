@@ -1,29 +1,388 @@
+import asyncio
+import json
 import os
+import random
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable, Hashable
 
 import httpx
 
+from ..metrics import ERRORS, WORKER_REQUEST_SECONDS
+from ..tracing import span, trace_headers
+
 WORKER_URL = os.environ.get("WORKER_URL", "http://localhost:8787")
 WORKER_API_KEY = os.environ.get("WORKER_API_KEY", "")
 
+# Connection pool sizing for the shared Worker client
+WORKER_MAX_CONNECTIONS = int(os.environ.get("WORKER_MAX_CONNECTIONS", "100"))
+WORKER_MAX_KEEPALIVE = int(os.environ.get("WORKER_MAX_KEEPALIVE", "20"))
+WORKER_KEEPALIVE_EXPIRY = float(os.environ.get("WORKER_KEEPALIVE_EXPIRY", "30"))
+WORKER_HTTP2 = os.environ.get("WORKER_HTTP2", "").lower() in ("1", "true", "yes")
 
-async def worker_get(path: str, params: dict | None = None) -> str:
-    """GET request to the ENS Worker API. Returns response text."""
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            f"{WORKER_URL}{path}",
-            params={k: v for k, v in (params or {}).items() if v is not None},
+
+def _parse_timeouts(spec: str) -> dict[str, float]:
+    """Parse "/list=15,/profile=15" into {"/list": 15.0, "/profile": 15.0}."""
+    timeouts = {}
+    for entry in spec.split(","):
+        path, _, seconds = entry.partition("=")
+        if path.strip() and seconds.strip():
+            timeouts[path.strip()] = float(seconds)
+    return timeouts
+
+
+# Request timeouts in seconds: reads, writes, and per-path overrides
+WORKER_TIMEOUT = float(os.environ.get("WORKER_TIMEOUT", "10"))
+WORKER_WRITE_TIMEOUT = float(os.environ.get("WORKER_WRITE_TIMEOUT", "20"))
+WORKER_TIMEOUTS = _parse_timeouts(os.environ.get("WORKER_TIMEOUTS", "/list=15,/profile=15"))
+
+# Retries for GETs only, with full-jitter exponential backoff
+WORKER_RETRIES = int(os.environ.get("WORKER_RETRIES", "2"))
+WORKER_RETRY_BASE = float(os.environ.get("WORKER_RETRY_BASE", "0.2"))
+WORKER_RETRY_MAX = float(os.environ.get("WORKER_RETRY_MAX", "2"))
+RETRY_STATUSES = {429, 502, 503, 504}
+
+# Hedged GETs: send a second request once the first is slower than the path's p95
+WORKER_HEDGE = os.environ.get("WORKER_HEDGE", "").lower() in ("1", "true", "yes")
+WORKER_HEDGE_MIN_SAMPLES = int(os.environ.get("WORKER_HEDGE_MIN_SAMPLES", "20"))
+
+# Circuit breaker: open after this many consecutive failures, for this many seconds
+WORKER_BREAKER_THRESHOLD = int(os.environ.get("WORKER_BREAKER_THRESHOLD", "5"))
+WORKER_BREAKER_COOLDOWN = float(os.environ.get("WORKER_BREAKER_COOLDOWN", "15"))
+FAILURE_STATUSES = {502, 503, 504}
+
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def get_client(base_url: str = WORKER_URL) -> httpx.AsyncClient:
+    """Return the process-wide pooled client for a Worker base URL, creating it on first use."""
+    client = _clients.get(base_url)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=base_url,
+            http2=WORKER_HTTP2,
+            limits=httpx.Limits(
+                max_connections=WORKER_MAX_CONNECTIONS,
+                max_keepalive_connections=WORKER_MAX_KEEPALIVE,
+                keepalive_expiry=WORKER_KEEPALIVE_EXPIRY,
+            ),
             timeout=30,
         )
-        return resp.text
+        _clients[base_url] = client
+    return client
+
+
+async def open_clients() -> None:
+    """Create the default Worker client. Called from the app lifespan on startup."""
+    get_client()
+
+
+async def close_clients() -> None:
+    """Close every pooled client. Called from the app lifespan on shutdown."""
+    clients = list(_clients.values())
+    _clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+# Requests sent through _send and not finished yet, per Worker base URL
+_in_flight: dict[str, int] = {}
+
+
+def _pool_usage(client: httpx.AsyncClient) -> dict[str, int]:
+    """Connections in use, idle and waiting requests, read from httpcore's pool.
+
+    These are private attributes; if a httpx/httpcore release changes them the
+    figures are left out rather than failing the health check.
+    """
+    try:
+        pool = client._transport._pool  # type: ignore[attr-defined]
+        connections = list(pool.connections)
+        requests = list(pool._requests)
+        idle = sum(1 for conn in connections if conn.is_idle())
+        waiting = sum(1 for req in requests if req.is_queued())
+    except Exception:
+        return {}
+    return {"connections": len(connections), "in_use": len(connections) - idle, "idle": idle, "waiting": waiting}
+
+
+def pool_stats() -> dict[str, dict[str, int]]:
+    """Connection pool usage per Worker base URL: requests in flight, plus pool detail when available."""
+    return {
+        base_url: {
+            "in_flight": _in_flight.get(base_url, 0),
+            **_pool_usage(client),
+            "max_connections": WORKER_MAX_CONNECTIONS,
+        }
+        for base_url, client in _clients.items()
+    }
+
+
+class SingleFlight:
+    """Joins concurrent calls with the same key onto one in-flight request.
+
+    The request runs as its own task, so a cancelled caller doesn't cancel it
+    for the others. Results and exceptions are delivered to every waiter.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: dict[Hashable, asyncio.Future[str]] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[str]]) -> str:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future[str]) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict[str, int]:
+        return {"inflight": len(self._inflight), "coalesced": self.coalesced}
+
+
+worker_singleflight = SingleFlight()
+
+
+async def worker_get(path: str, params: dict | None = None) -> str:
+    """GET request to the ENS Worker API. Returns response text.
+
+    Identical concurrent GETs share one in-flight request.
+    """
+    query = {k: v for k, v in (params or {}).items() if v is not None}
+    key = (path, tuple(sorted(query.items())))
+    return await worker_singleflight.do(key, lambda: _get(path, query))
+
+
+class WorkerUnavailable(Exception):
+    """Raised instead of sending a request while the circuit breaker is open."""
+
+
+# Permit for requests let through while the breaker is closed
+_PERMIT = object()
+
+
+class CircuitBreaker:
+    """Fails fast after `threshold` consecutive failures, for `cooldown` seconds.
+
+    After the cooldown a single trial request is let through (half-open): its
+    success closes the breaker, its failure opens it again. allow() hands out
+    a permit that is passed back to record(), so the trial is told apart from
+    requests that were already in flight; their outcomes don't decide the
+    half-open state, and no second trial starts until the first finishes.
+    """
+
+    def __init__(
+        self, threshold: int = WORKER_BREAKER_THRESHOLD, cooldown: float = WORKER_BREAKER_COOLDOWN
+    ) -> None:
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self.rejected = 0
+        self._trial: object | None = None
+
+    def allow(self) -> object | None:
+        """A permit for one request, or None if the breaker rejects it."""
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.cooldown:
+                self.rejected += 1
+                return None
+            self.state = "half_open"
+        if self.state == "half_open":
+            if self._trial is not None:
+                self.rejected += 1
+                return None
+            self._trial = object()
+            return self._trial
+        return _PERMIT
+
+    def record(self, permit: object, ok: bool | None) -> None:
+        """Record a request outcome. None means it never finished (cancelled)."""
+        trial = permit is self._trial
+        if trial:
+            self._trial = None
+        elif self.state == "half_open":
+            return
+        if ok is None:
+            return
+        if ok:
+            self.state = "closed"
+            self.failures = 0
+            return
+        self.failures += 1
+        if trial or self.failures >= self.threshold:
+            if self.state != "open":
+                self.opened += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict[str, object]:
+        retry_in = self.cooldown - (time.monotonic() - self.opened_at) if self.state == "open" else 0
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "retry_in": round(max(retry_in, 0), 1),
+        }
+
+
+class LatencyWindow:
+    """Recent successful request latencies per path, for the hedging threshold."""
+
+    def __init__(self, size: int = 200) -> None:
+        self._size = size
+        self._samples: dict[str, deque[float]] = {}
+
+    def record(self, path: str, seconds: float) -> None:
+        samples = self._samples.get(path)
+        if samples is None:
+            samples = self._samples[path] = deque(maxlen=self._size)
+        samples.append(seconds)
+
+    def p95(self, path: str) -> float | None:
+        samples = self._samples.get(path)
+        if samples is None or len(samples) < WORKER_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        return ordered[int(len(ordered) * 0.95) - 1]
+
+
+worker_breaker = CircuitBreaker()
+worker_latency = LatencyWindow()
+transport_counters = {"retries": 0, "hedges": 0, "hedge_wins": 0, "timeouts": 0, "errors": 0}
+
+
+def transport_stats() -> dict[str, object]:
+    return {"breaker": worker_breaker.stats(), **transport_counters}
+
+
+def _timeout(path: str, default: float) -> float:
+    return WORKER_TIMEOUTS.get(path, default)
+
+
+def _error_body(code: str, message: str) -> str:
+    """Worker-style error body, so tools hand the model the same shape as a Worker error."""
+    return json.dumps({"ok": False, "error": {"code": code, "message": message}}, separators=(",", ":"))
+
+
+def _transport_error(err: Exception) -> str:
+    transport_counters["errors"] += 1
+    ERRORS.labels("worker").inc()
+    if isinstance(err, WorkerUnavailable):
+        return _error_body("WORKER_UNAVAILABLE", "The ENS Worker is temporarily unavailable. Try again shortly.")
+    if isinstance(err, httpx.TimeoutException):
+        transport_counters["timeouts"] += 1
+        return _error_body("WORKER_TIMEOUT", "The ENS Worker did not respond in time.")
+    return _error_body("WORKER_UNREACHABLE", f"Could not reach the ENS Worker: {type(err).__name__}")
+
+
+async def _send(method: str, path: str, timeout: float, **kwargs) -> httpx.Response:
+    """One request through the circuit breaker, traced and carrying the trace id."""
+    permit = worker_breaker.allow()
+    if permit is None:
+        raise WorkerUnavailable(path)
+    ok = None
+    status = "cancelled"
+    start = time.perf_counter()
+    with span("worker_request", method=method, route=path) as request_span:
+        kwargs["headers"] = {**trace_headers(), **kwargs.get("headers", {})}
+        _in_flight[WORKER_URL] = _in_flight.get(WORKER_URL, 0) + 1
+        try:
+            resp = await get_client().request(method, path, timeout=timeout, **kwargs)
+            ok = resp.status_code not in FAILURE_STATUSES
+            status = str(resp.status_code)
+            if ok and method == "GET":
+                worker_latency.record(path, time.perf_counter() - start)
+            return resp
+        except httpx.TransportError as err:
+            ok = False
+            status = "timeout" if isinstance(err, httpx.TimeoutException) else "error"
+            raise
+        finally:
+            _in_flight[WORKER_URL] -= 1
+            worker_breaker.record(permit, ok)
+            WORKER_REQUEST_SECONDS.labels(method, path, status).observe(time.perf_counter() - start)
+            request_span.span_data.data["status"] = status
+
+
+async def _hedged_get(path: str, params: dict, timeout: float) -> httpx.Response:
+    """GET, plus a second identical GET if the first outlives the path's p95; first success wins."""
+    threshold = worker_latency.p95(path) if WORKER_HEDGE else None
+    if threshold is None:
+        return await _send("GET", path, timeout, params=params)
+
+    first = asyncio.ensure_future(_send("GET", path, timeout, params=params))
+    tasks = {first}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=threshold)
+        # A half-open breaker lets one trial through; a hedge would only be rejected
+        if not done and worker_breaker.state == "closed":
+            transport_counters["hedges"] += 1
+            tasks.add(asyncio.ensure_future(_send("GET", path, timeout, params=params)))
+        error: BaseException | None = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        transport_counters["hedge_wins"] += 1
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _get(path: str, params: dict) -> str:
+    """GET with per-path timeout, jittered retries and optional hedging.
+
+    Transport failures and an open breaker come back as Worker-style error
+    bodies rather than exceptions.
+    """
+    timeout = _timeout(path, WORKER_TIMEOUT)
+    attempt = 0
+    while True:
+        try:
+            resp = await _hedged_get(path, params, timeout)
+            if resp.status_code not in RETRY_STATUSES or attempt >= WORKER_RETRIES:
+                return resp.text
+        except WorkerUnavailable as err:
+            return _transport_error(err)
+        except httpx.TransportError as err:
+            if attempt >= WORKER_RETRIES:
+                return _transport_error(err)
+        transport_counters["retries"] += 1
+        await asyncio.sleep(random.uniform(0, min(WORKER_RETRY_MAX, WORKER_RETRY_BASE * 2**attempt)))
+        attempt += 1
 
 
 async def worker_post(path: str, body: dict) -> str:
-    """POST request to the ENS Worker API with auth header. Returns response text."""
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            f"{WORKER_URL}{path}",
+    """POST request to the ENS Worker API with auth header. Returns response text.
+
+    Never retried; timeouts and an open breaker come back as error bodies.
+    """
+    try:
+        resp = await _send(
+            "POST",
+            path,
+            _timeout(path, WORKER_WRITE_TIMEOUT),
             json=body,
             headers={"Authorization": f"Bearer {WORKER_API_KEY}"},
-            timeout=30,
         )
-        return resp.text
+    except (WorkerUnavailable, httpx.TransportError) as err:
+        return _transport_error(err)
+    return resp.text
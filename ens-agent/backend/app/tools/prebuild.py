@@ -0,0 +1,224 @@
+"""Register transactions built in the background during the commit-reveal wait.
+
+The Worker only builds a register tx once the commitment is 60s old on-chain,
+and deletes the commit session when it does. Building it as soon as the
+commitment matures, rather than after countdown_complete has gone through a
+model turn, takes the Worker round trip off the user's wait.
+
+Because the session is single-use, a prepared tx is the only way left to
+register once it is built: it is handed out (by countdown_complete or
+ens_build_register_tx) as often as asked, never dropped to make room, and
+kept until the commitment itself can no longer be revealed. With a
+PreparedTxs backend (SqliteStore) it also survives restarts. Several worker
+processes would each build and hold their own copy, so the feature is off
+when WEB_CONCURRENCY > 1.
+"""
+
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Protocol
+
+from .helpers import worker_post
+
+logger = logging.getLogger(__name__)
+
+REGISTER_PREBUILD = (
+    os.environ.get("REGISTER_PREBUILD", "true").lower() in ("1", "true", "yes")
+    and int(os.environ.get("WEB_CONCURRENCY", "1")) <= 1
+)
+
+# Start trying this many seconds before the client's countdown ends; the
+# commitment's on-chain age runs ahead of the countdown, which starts at receipt
+REGISTER_PREBUILD_LEAD = float(os.environ.get("REGISTER_PREBUILD_LEAD", "10"))
+
+# How long countdown_complete waits for a build that is still running before
+# falling back to an agent run
+REGISTER_PREBUILD_WAIT = float(os.environ.get("REGISTER_PREBUILD_WAIT", "15"))
+
+# A prepared tx is kept this long: the controller's maximum commitment age,
+# after which the commitment (and so the tx) can no longer be used
+REGISTER_PREBUILD_RETENTION = float(os.environ.get("REGISTER_PREBUILD_RETENTION", "86400"))
+
+# Worker attempts while the commitment is still too new
+REGISTER_PREBUILD_ATTEMPTS = 4
+
+_WAIT_MORE = re.compile(r"wait (\d+) more second")
+
+
+class PreparedTxs(Protocol):
+    """Durable storage for prepared register responses, keyed by commit session_id."""
+
+    async def save_prepared_tx(self, session_id: str, response: str, built_at: float) -> None: ...
+
+    async def load_prepared_tx(self, session_id: str) -> tuple[str, float] | None: ...
+
+    async def delete_prepared_txs(self, built_before: float) -> None: ...
+
+
+@dataclass
+class _Prebuild:
+    wake: asyncio.Event = field(default_factory=asyncio.Event)
+    task: asyncio.Task[None] | None = None
+    response: str | None = None
+    # Wall-clock time, so it stays meaningful when loaded after a restart
+    built_at: float = 0.0
+
+
+class RegisterPrebuilds:
+    """Background /register builds keyed by commit session_id.
+
+    max_sessions bounds the builds that haven't produced a tx (pending or
+    failed); prepared txs are only dropped once past retention.
+    """
+
+    def __init__(
+        self,
+        lead: float = REGISTER_PREBUILD_LEAD,
+        retention: float = REGISTER_PREBUILD_RETENTION,
+        max_sessions: int = 1024,
+        prepared: PreparedTxs | None = None,
+    ) -> None:
+        self.lead = lead
+        self.retention = retention
+        self.max_sessions = max_sessions
+        self.prepared = prepared
+        self._builds: OrderedDict[str, _Prebuild] = OrderedDict()
+        self.scheduled = 0
+        self.built = 0
+        self.failed = 0
+        self.served = 0
+        self.missed = 0
+
+    def _expired(self, entry: _Prebuild) -> bool:
+        return time.time() - entry.built_at > self.retention
+
+    def _make_room(self) -> None:
+        for session_id, entry in list(self._builds.items()):
+            if entry.response is not None and self._expired(entry):
+                del self._builds[session_id]
+        unbuilt = [session_id for session_id, entry in self._builds.items() if entry.response is None]
+        while len(self._builds) >= self.max_sessions and unbuilt:
+            oldest = self._builds.pop(unbuilt.pop(0))
+            if oldest.task is not None:
+                oldest.task.cancel()
+
+    def schedule(self, session_id: str, wait_seconds: float) -> bool:
+        """Build the register tx for a session once its commitment has matured. Idempotent."""
+        if session_id in self._builds:
+            return False
+        self._make_room()
+        entry = self._builds[session_id] = _Prebuild()
+        # A fresh context keeps the build out of the triggering request's trace
+        entry.task = asyncio.create_task(
+            self._build(session_id, entry, max(0.0, wait_seconds - self.lead)),
+            context=contextvars.Context(),
+        )
+        self.scheduled += 1
+        return True
+
+    async def _build(self, session_id: str, entry: _Prebuild, delay: float) -> None:
+        # Built before a restart: the Worker session is gone, the stored tx is all there is
+        stored = await self._load(session_id)
+        if stored is not None:
+            entry.response, entry.built_at = stored
+            return
+        try:
+            await asyncio.wait_for(entry.wake.wait(), timeout=delay)
+        except TimeoutError:
+            pass
+        for _ in range(REGISTER_PREBUILD_ATTEMPTS):
+            response = await worker_post("/register", {"session_id": session_id})
+            try:
+                data = json.loads(response)
+            except json.JSONDecodeError:
+                data = {}
+            if data.get("ok") is True:
+                entry.response = response
+                entry.built_at = time.time()
+                self.built += 1
+                await self._save(session_id, entry)
+                return
+            error = data.get("error") or {}
+            if error.get("code") != "COMMITMENT_TOO_NEW":
+                break
+            match = _WAIT_MORE.search(error.get("message", ""))
+            await asyncio.sleep(int(match.group(1)) + 1 if match else 5)
+        self.failed += 1
+        logger.info("Register prebuild for %s failed: %s", session_id, response[:200])
+
+    async def _save(self, session_id: str, entry: _Prebuild) -> None:
+        if self.prepared is None:
+            return
+        try:
+            await self.prepared.save_prepared_tx(session_id, entry.response, entry.built_at)
+            await self.prepared.delete_prepared_txs(time.time() - self.retention)
+        except Exception:
+            # Still held in memory and handed out from there
+            logger.exception("Could not store the prepared register tx for %s", session_id)
+
+    async def _load(self, session_id: str) -> tuple[str, float] | None:
+        if self.prepared is None:
+            return None
+        try:
+            stored = await self.prepared.load_prepared_tx(session_id)
+        except Exception:
+            logger.exception("Could not load the prepared register tx for %s", session_id)
+            return None
+        if stored is None or time.time() - stored[1] > self.retention:
+            return None
+        return stored
+
+    async def take(self, session_id: str, wait: float = REGISTER_PREBUILD_WAIT) -> str | None:
+        """The prepared register response for a session, or None to build it on demand.
+
+        A build still waiting for the commitment to mature is started now; one
+        already running is awaited for up to `wait` seconds. The tx stays
+        available afterwards, e.g. for a retry after the user rejected it.
+        """
+        entry = self._builds.get(session_id)
+        if entry is not None and entry.task is not None and not entry.task.done():
+            entry.wake.set()
+            try:
+                await asyncio.wait_for(asyncio.shield(entry.task), timeout=wait)
+            except TimeoutError:
+                # Keep the entry; ens_build_register_tx will pick the result up
+                self.missed += 1
+                return None
+            except Exception:
+                pass
+        entry = self._builds.get(session_id)
+        if entry is None or entry.response is None:
+            stored = await self._load(session_id)
+            if stored is not None:
+                entry = self._builds[session_id] = _Prebuild(response=stored[0], built_at=stored[1])
+        if entry is None or entry.response is None or self._expired(entry):
+            if entry is not None and self._builds.get(session_id) is entry:
+                # Failed or expired: let the on-demand build report what the Worker says
+                del self._builds[session_id]
+            self.missed += 1
+            return None
+        self.served += 1
+        return entry.response
+
+    def stats(self) -> dict[str, object]:
+        return {
+            "enabled": REGISTER_PREBUILD,
+            "durable": self.prepared is not None,
+            "pending": sum(1 for e in self._builds.values() if e.response is None),
+            "ready": sum(1 for e in self._builds.values() if e.response is not None),
+            "scheduled": self.scheduled,
+            "built": self.built,
+            "failed": self.failed,
+            "served": self.served,
+            "missed": self.missed,
+        }
+
+
+register_prebuilds = RegisterPrebuilds()
@@ -0,0 +1,99 @@
+"""Background warm-up of the read cache for a newly connected wallet."""
+
+import asyncio
+import contextvars
+import json
+import os
+import time
+
+from .cache import cached_get
+from .ens import ENS_DEPLOYMENTS
+
+PREFETCH_ENABLED = os.environ.get("PREFETCH_ON_CONNECT", "true").lower() in ("1", "true", "yes")
+
+# Worker requests in flight across all wallet prefetches, so a burst of
+# connects can't crowd out the agent's own tool calls
+PREFETCH_CONCURRENCY = int(os.environ.get("PREFETCH_CONCURRENCY", "4"))
+
+# A wallet prefetched this recently is skipped; matches the shortest TTL it warms
+PREFETCH_DEDUPE_SECONDS = float(os.environ.get("PREFETCH_DEDUPE_SECONDS", "60"))
+
+_CHAIN_NETWORKS = {str(config["chainId"]): network for network, config in ENS_DEPLOYMENTS.items()}
+
+
+def network_for_chain(chain_id: object) -> str | None:
+    """"mainnet" or "sepolia" for a chain id, None for chains ENS isn't deployed on."""
+    return _CHAIN_NETWORKS.get(str(chain_id)) if chain_id is not None else None
+
+
+class WalletPrefetcher:
+    """Fetches a wallet's names, primary name and profile into the read cache.
+
+    Requests use the same parameters as ens_list, ens_resolve and ens_profile,
+    so the agent's first calls for the wallet are cache hits (or join the
+    prefetch's in-flight request through the Worker singleflight).
+    """
+
+    def __init__(
+        self, concurrency: int = PREFETCH_CONCURRENCY, dedupe_seconds: float = PREFETCH_DEDUPE_SECONDS
+    ) -> None:
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.dedupe_seconds = dedupe_seconds
+        self._inflight: dict[tuple[str, str], asyncio.Task[None]] = {}
+        self._recent: dict[tuple[str, str], float] = {}
+        self.started = 0
+        self.deduped = 0
+        self.requests = 0
+        self.failed = 0
+
+    def start(self, address: str, network: str) -> bool:
+        """Schedule a prefetch unless one for this wallet is running or just finished."""
+        key = (address.lower(), network)
+        now = time.monotonic()
+        self._recent = {k: t for k, t in self._recent.items() if now - t < self.dedupe_seconds}
+        if key in self._inflight or key in self._recent:
+            self.deduped += 1
+            return False
+        self.started += 1
+        # A fresh context keeps the prefetch out of the triggering request's trace
+        task = asyncio.create_task(self._prefetch(address, network), context=contextvars.Context())
+        self._inflight[key] = task
+        task.add_done_callback(lambda t: self._finished(key, t))
+        return True
+
+    def _finished(self, key: tuple[str, str], task: asyncio.Task[None]) -> None:
+        del self._inflight[key]
+        self._recent[key] = time.monotonic()
+        if not task.cancelled() and task.exception() is not None:
+            self.failed += 1
+
+    async def _get(self, tool: str, path: str, params: dict) -> str:
+        async with self._semaphore:
+            self.requests += 1
+            return await cached_get(tool, path, params)
+
+    async def _prefetch(self, address: str, network: str) -> None:
+        _, primary, _ = await asyncio.gather(
+            self._get("ens_list", "/list", {"address": address, "network": network}),
+            self._get("ens_resolve", "/resolve", {"input": address, "network": network}),
+            self._get("ens_profile", "/profile", {"input": address, "network": network}),
+        )
+        # The agent usually follows up by name once it knows the primary name
+        try:
+            name = json.loads(primary)["data"]["name"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return
+        if isinstance(name, str) and name:
+            await self._get("ens_profile", "/profile", {"input": name, "network": network})
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "inflight": len(self._inflight),
+            "started": self.started,
+            "deduped": self.deduped,
+            "requests": self.requests,
+            "failed": self.failed,
+        }
+
+
+wallet_prefetcher = WalletPrefetcher()
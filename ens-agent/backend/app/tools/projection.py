@@ -0,0 +1,220 @@
+"""Per-tool projection of Worker responses before they are returned to the model.
+
+For busy names, ens_profile, ens_list and ens_verify responses are mostly
+empty fields, long lists and long values the model doesn't need. Projection
+drops empty values, trims lists to TOOL_OUTPUT_MAX_ITEMS with a count of what
+was left out, shortens long strings, and keeps only the requested fields when
+the tool is called with `fields`. Write tools keep everything but the
+calldata: the wallet gets the full transaction through the client tool call.
+
+Only the text handed to the model is projected. The read cache, prefetch,
+fast path, widgets and client tool calls all work from the full response.
+"""
+
+import json
+import os
+from collections import defaultdict
+from typing import Any
+
+from ..history import count_tokens
+from ..metrics import TOOL_OUTPUT_BYTES, TOOL_OUTPUT_TOKENS
+from .ens import to_json
+
+TOOL_PROJECTION = os.environ.get("TOOL_PROJECTION", "true").lower() in ("1", "true", "yes")
+
+# Longest list (or text record map) returned in full, and longest string value
+TOOL_OUTPUT_MAX_ITEMS = int(os.environ.get("TOOL_OUTPUT_MAX_ITEMS", "25"))
+TOOL_OUTPUT_MAX_CHARS = int(os.environ.get("TOOL_OUTPUT_MAX_CHARS", "500"))
+
+# Tokens are counted on one call in this many per tool; the rest are estimated
+# from their size at the sampled tokens-per-byte rate
+TOOL_OUTPUT_TOKEN_SAMPLE = max(1, int(os.environ.get("TOOL_OUTPUT_TOKEN_SAMPLE", "10")))
+
+# Kept whatever `fields` asks for, so a projection still says what it describes
+_IDENTITY = ("name", "input", "address", "network")
+
+_EMPTY = (None, "", [], {})
+
+
+def _compact(value: Any, max_chars: int) -> Any:
+    """Drop None and empty strings, lists and maps, recursively, and shorten long strings."""
+    if isinstance(value, dict):
+        out = {}
+        for key, item in value.items():
+            item = _compact(item, max_chars)
+            if item not in _EMPTY:
+                out[key] = item
+        return out
+    if isinstance(value, list):
+        return [item for item in (_compact(v, max_chars) for v in value) if item not in _EMPTY]
+    if isinstance(value, str) and len(value) > max_chars:
+        return f"{value[:max_chars]}… ({len(value)} chars)"
+    return value
+
+
+def _trim(data: dict, key: str, limit: int) -> None:
+    """Cut a list or map under `key` to `limit` entries, recording how many were left out."""
+    value = data.get(key)
+    if isinstance(value, (list, dict)) and len(value) > limit:
+        data[key] = value[:limit] if isinstance(value, list) else dict(list(value.items())[:limit])
+        data[f"{key}_omitted"] = len(value) - limit
+
+
+def _select(data: dict, fields: list[str]) -> dict:
+    """Keep the requested top-level fields; other names are looked up as text record keys."""
+    out = {key: value for key, value in data.items() if key in fields or key in _IDENTITY}
+    wanted = [field for field in fields if field not in data]
+    records = data.get("text_records")
+    if wanted and "text_records" not in fields:
+        if isinstance(records, dict):
+            picked: Any = {key: value for key, value in records.items() if key in wanted}
+        elif isinstance(records, list):
+            picked = [record for record in records if isinstance(record, dict) and record.get("key") in wanted]
+        else:
+            picked = None
+        if picked:
+            out["text_records"] = picked
+            found = picked if isinstance(picked, dict) else [record["key"] for record in picked]
+            wanted = [field for field in wanted if field not in found]
+    if wanted:
+        out["unknown_fields"] = wanted
+    return out
+
+
+def _expiry(data: dict) -> None:
+    # The ISO date says the same as the unix timestamp, in a form the model quotes directly
+    expiry = data.get("expiry")
+    if isinstance(expiry, dict):
+        expiry.pop("timestamp", None)
+
+
+def _profile(data: dict, limit: int) -> None:
+    _expiry(data)
+    _trim(data, "text_records", limit)
+
+
+def _list(data: dict, limit: int) -> None:
+    for entry in data.get("names") or []:
+        if isinstance(entry, dict):
+            _expiry(entry)
+    _trim(data, "names", limit)
+
+
+def _verify(data: dict, limit: int) -> None:
+    # Unset records become a list of keys; the summary already has the counts
+    records = data.get("text_records")
+    if isinstance(records, list):
+        data["text_records"] = [
+            {"key": r.get("key"), "value": r.get("value")} for r in records if r.get("status") == "set"
+        ]
+        data["empty_records"] = [r.get("key") for r in records if r.get("status") != "set"]
+    _trim(data, "text_records", limit)
+    _trim(data, "empty_records", limit)
+
+
+def _calldata(value: Any) -> Any:
+    """Replace transaction calldata with its size, wherever a tx appears."""
+    if isinstance(value, dict):
+        out = {key: _calldata(item) for key, item in value.items()}
+        tx = out.get("tx")
+        if isinstance(tx, dict) and isinstance(tx.get("data"), str) and len(tx["data"]) > 10:
+            size = (len(tx["data"]) - 2) // 2
+            out["tx"] = {**tx, "data": f"<{size} bytes of calldata, sent to the wallet>"}
+        return out
+    if isinstance(value, list):
+        return [_calldata(item) for item in value]
+    return value
+
+
+_TOOLS = {
+    "ens_profile": _profile,
+    "ens_list": _list,
+    "ens_verify": _verify,
+}
+
+
+def parse_fields(fields: str) -> list[str]:
+    """Comma-separated `fields` argument to a list of names."""
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+class OutputProjection:
+    """Projects tool responses and counts their size before and after."""
+
+    def __init__(
+        self,
+        max_items: int = TOOL_OUTPUT_MAX_ITEMS,
+        max_chars: int = TOOL_OUTPUT_MAX_CHARS,
+        token_sample: int = TOOL_OUTPUT_TOKEN_SAMPLE,
+    ) -> None:
+        self.max_items = max_items
+        self.max_chars = max_chars
+        self.token_sample = token_sample
+        self._totals: dict[str, dict[str, int]] = defaultdict(lambda: dict.fromkeys(
+            ("calls", "bytes_raw", "bytes_projected", "tokens_raw", "tokens_projected"), 0,
+        ))
+        # Sampled (tokens, bytes) per tool and stage
+        self._samples: dict[tuple[str, str], list[int]] = defaultdict(lambda: [0, 0])
+
+    def _project_data(self, tool: str, data: Any, fields: list[str]) -> Any:
+        if not isinstance(data, dict):
+            return data
+        if tool == "ens_profile_many":
+            for result in data.get("results") or []:
+                if isinstance(result, dict):
+                    result["data"] = self._project_data("ens_profile", result.get("data"), fields)
+            return _compact(data, self.max_chars)
+        # Trimming first spares compacting entries that are cut anyway
+        if tool in _TOOLS:
+            _TOOLS[tool](data, self.max_items)
+        data = _compact(data, self.max_chars)
+        return _select(data, fields) if fields else data
+
+    def project(self, tool: str, response: str, fields: str = "") -> str:
+        """The model-facing text for a tool's Worker response. Errors are returned unchanged."""
+        if not TOOL_PROJECTION:
+            return response
+        try:
+            body = json.loads(response)
+        except json.JSONDecodeError:
+            return response
+        if not isinstance(body, dict) or body.get("ok") is not True:
+            return response
+        if tool.startswith("ens_build_"):
+            projected = to_json(_calldata(body))
+        else:
+            projected = to_json({"ok": True, "data": self._project_data(tool, body.get("data"), parse_fields(fields))})
+        self._record(tool, response, projected)
+        return projected
+
+    def _tokens(self, tool: str, stage: str, text: str, size: int, sampled: bool) -> int:
+        sample = self._samples[tool, stage]
+        if sampled:
+            tokens = count_tokens(text)
+            sample[0] += tokens
+            sample[1] += size
+            return tokens
+        return round(size * sample[0] / sample[1]) if sample[1] else 0
+
+    def _record(self, tool: str, raw: str, projected: str) -> None:
+        totals = self._totals[tool]
+        raw_bytes, projected_bytes = len(raw.encode()), len(projected.encode())
+        # Tokenizing every full response costs more than the counts are worth
+        sampled = totals["calls"] % self.token_sample == 0
+        raw_tokens = self._tokens(tool, "raw", raw, raw_bytes, sampled)
+        projected_tokens = self._tokens(tool, "projected", projected, projected_bytes, sampled)
+        totals["calls"] += 1
+        totals["bytes_raw"] += raw_bytes
+        totals["bytes_projected"] += projected_bytes
+        totals["tokens_raw"] += raw_tokens
+        totals["tokens_projected"] += projected_tokens
+        TOOL_OUTPUT_BYTES.labels(tool, "raw").inc(raw_bytes)
+        TOOL_OUTPUT_BYTES.labels(tool, "projected").inc(projected_bytes)
+        TOOL_OUTPUT_TOKENS.labels(tool, "raw").inc(raw_tokens)
+        TOOL_OUTPUT_TOKENS.labels(tool, "projected").inc(projected_tokens)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        return {tool: dict(totals) for tool, totals in self._totals.items()}
+
+
+output_projection = OutputProjection()
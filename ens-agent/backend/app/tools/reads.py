@@ -1,9 +1,82 @@
-from agents import function_tool
+import asyncio
+import json
+import os
+import time
+from collections.abc import Awaitable, Callable
 
+from agents import RunContextWrapper, function_tool
+from chatkit.agents import AgentContext
+from chatkit.types import ProgressUpdateEvent
+
+from ..metrics import timed_tool
+from .cache import cached_get
+from .ens import (
+    DEPLOYMENTS_RESPONSE,
+    MIN_REGISTRABLE_LENGTH,
+    labelhash_response,
+    namehash_response,
+    normalize,
+    to_json,
+)
 from .helpers import worker_get
+from .projection import output_projection
+
+# Concurrent Worker requests per ens_profile_many call, and max inputs per call
+PROFILE_MANY_CONCURRENCY = int(os.environ.get("PROFILE_MANY_CONCURRENCY", "8"))
+PROFILE_MANY_MAX = int(os.environ.get("PROFILE_MANY_MAX", "25"))
+
+# Same for ens_check_many, plus how often (seconds) it reports progress to the chat
+CHECK_MANY_CONCURRENCY = int(os.environ.get("CHECK_MANY_CONCURRENCY", "16"))
+CHECK_MANY_MAX = int(os.environ.get("CHECK_MANY_MAX", "500"))
+CHECK_MANY_PROGRESS_INTERVAL = float(os.environ.get("CHECK_MANY_PROGRESS_INTERVAL", "1"))
+
+
+async def _fetch_each(
+    inputs: list[str],
+    fetch: Callable[[str], Awaitable[str]],
+    concurrency: int,
+    on_done: Callable[[int], Awaitable[None]] | None = None,
+) -> list[dict]:
+    """Run fetch for every input, at most `concurrency` at a time, in input order.
+
+    Each result is {"input", "ok", "data"} or {"input", "ok", "error"}; one
+    failed lookup never fails the batch. on_done, if given, is called with the
+    number of finished lookups after each one completes.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    done = 0
+
+    async def one(value: str) -> dict:
+        nonlocal done
+        async with semaphore:
+            try:
+                body = json.loads(await fetch(value))
+            except Exception as err:
+                error = {"code": "REQUEST_FAILED", "message": str(err) or type(err).__name__}
+                body = {"ok": False, "error": error}
+        done += 1
+        if on_done is not None:
+            await on_done(done)
+        if isinstance(body, dict) and body.get("ok"):
+            return {"input": value, "ok": True, "data": body.get("data")}
+        error = body.get("error") if isinstance(body, dict) else None
+        return {"input": value, "ok": False, "error": error or {"code": "INTERNAL_ERROR", "message": "Unexpected response"}}
+
+    return await asyncio.gather(*(one(value) for value in inputs))
+
+
+def _dedupe(values: list[str]) -> list[str]:
+    """Strip whitespace and drop blanks and case-insensitive repeats, keeping first-seen order."""
+    seen: dict[str, str] = {}
+    for value in values:
+        value = value.strip()
+        if value and value.lower() not in seen:
+            seen[value.lower()] = value
+    return list(seen.values())
 
 
 @function_tool
+@timed_tool
 async def ens_check(label: str, duration: str = "1y", network: str = "sepolia") -> str:
     """Check if an ENS name is available for registration and get the price.
 
@@ -12,21 +85,149 @@ async def ens_check(label: str, duration: str = "1y", network: str = "sepolia")
         duration: Registration duration like "1y", "2y", "6m". Defaults to "1y".
         network: "mainnet" or "sepolia". Defaults to "sepolia".
     """
-    return await worker_get("/check", {"label": label, "duration": duration, "network": network})
+    return await cached_get("ens_check", "/check", {"label": label, "duration": duration, "network": network})
 
 
 @function_tool
-async def ens_profile(input: str, network: str = "sepolia") -> str:
+@timed_tool
+async def ens_check_many(
+    ctx: RunContextWrapper[AgentContext],
+    labels: list[str],
+    duration: str = "1y",
+    network: str = "sepolia",
+) -> str:
+    """Check availability and price for a list of candidate names in one call.
+
+    Labels are normalized and deduplicated first. Returns the available names
+    sorted by price (cheapest first), the taken ones, labels that can't be
+    registered (not valid ENS names, or shorter than 3 characters), and any
+    checks that failed.
+
+    Args:
+        labels: Labels to check, with or without .eth (e.g. ["coolname", "other.eth"]). Up to 500.
+        duration: Registration duration like "1y", "2y", "6m". Defaults to "1y".
+        network: "mainnet" or "sepolia". Defaults to "sepolia".
+    """
+    valid: dict[str, None] = {}
+    invalid = []
+    for raw in _dedupe(labels):
+        label = raw[:-4] if raw.lower().endswith(".eth") else raw
+        try:
+            if "." in label:
+                raise ValueError("only second-level .eth names can be registered")
+            label = normalize(label)
+            # The controller reports these as unavailable; they can't be registered at all
+            if len(label) < MIN_REGISTRABLE_LENGTH:
+                raise ValueError(f"names must be at least {MIN_REGISTRABLE_LENGTH} characters")
+            valid[label] = None
+        except Exception as err:
+            invalid.append({"label": raw, "error": str(err)})
+    if not valid and not invalid:
+        return to_json({"ok": False, "error": {"code": "MISSING_PARAM", "message": "labels is required"}})
+    if len(valid) > CHECK_MANY_MAX:
+        return to_json({
+            "ok": False,
+            "error": {"code": "INVALID_PARAM", "message": f"at most {CHECK_MANY_MAX} labels per call"},
+        })
+
+    total = len(valid)
+    last_report = time.monotonic()
+
+    async def report(done: int) -> None:
+        nonlocal last_report
+        # Throttled so a long list doesn't flood the chat with updates
+        if done < total and time.monotonic() - last_report < CHECK_MANY_PROGRESS_INTERVAL:
+            return
+        last_report = time.monotonic()
+        if isinstance(ctx.context, AgentContext):
+            await ctx.context.stream(ProgressUpdateEvent(text=f"Checked {done} of {total} names"))
+
+    results = await _fetch_each(
+        list(valid),
+        lambda label: cached_get(
+            "ens_check", "/check", {"label": label, "duration": duration, "network": network}
+        ),
+        CHECK_MANY_CONCURRENCY,
+        on_done=report if total > CHECK_MANY_CONCURRENCY else None,
+    )
+
+    available, taken, failed = [], [], []
+    for result in results:
+        data = result.get("data") or {}
+        if not result["ok"]:
+            failed.append({"label": result["input"], "error": result["error"]})
+        elif data.get("available") and data.get("price"):
+            price = data["price"]
+            row = {"name": data.get("fullName"), "price_eth": price.get("total")}
+            if price.get("premium") not in (None, "0"):
+                row["premium_eth"] = price["premium"]
+            available.append(row)
+        else:
+            taken.append(data.get("fullName") or f"{result['input']}.eth")
+    available.sort(key=lambda row: (float(row["price_eth"] or 0), row["name"]))
+
+    return to_json({
+        "ok": True,
+        "data": {
+            "network": network,
+            "duration": duration,
+            "checked": total,
+            "available": available,
+            "taken": taken,
+            "invalid": invalid,
+            "failed": failed,
+        },
+    })
+
+
+@function_tool
+@timed_tool
+async def ens_profile(input: str, network: str = "sepolia", fields: str = "") -> str:
     """Get the full profile for an ENS name or address, including text records, avatar, owner, and expiry.
 
     Args:
         input: An ENS name (e.g. "vitalik.eth") or Ethereum address.
         network: "mainnet" or "sepolia". Defaults to "sepolia".
+        fields: Optional comma-separated fields to return, e.g. "owner,expiry" or text record
+            keys like "com.twitter,url". Returns the whole profile if empty. If the profile has
+            many text records, the rest are counted in text_records_omitted; ask for them by key.
+    """
+    response = await cached_get("ens_profile", "/profile", {"input": input, "network": network})
+    return output_projection.project("ens_profile", response, fields)
+
+
+@function_tool
+@timed_tool
+async def ens_profile_many(inputs: list[str], network: str = "sepolia", fields: str = "") -> str:
+    """Get profiles for several ENS names or addresses at once, e.g. to compare them.
+
+    Prefer this over repeated ens_profile calls. Lookups that fail are reported
+    per input without failing the others.
+
+    Args:
+        inputs: ENS names (e.g. "vitalik.eth") and/or Ethereum addresses. Up to 25.
+        network: "mainnet" or "sepolia". Defaults to "sepolia".
+        fields: Optional comma-separated fields to return for each profile, as for ens_profile.
     """
-    return await worker_get("/profile", {"input": input, "network": network})
+    inputs = _dedupe(inputs)
+    if not inputs:
+        return to_json({"ok": False, "error": {"code": "MISSING_PARAM", "message": "inputs is required"}})
+    if len(inputs) > PROFILE_MANY_MAX:
+        return to_json({
+            "ok": False,
+            "error": {"code": "INVALID_PARAM", "message": f"at most {PROFILE_MANY_MAX} inputs per call"},
+        })
+    results = await _fetch_each(
+        inputs,
+        lambda value: cached_get("ens_profile", "/profile", {"input": value, "network": network}),
+        PROFILE_MANY_CONCURRENCY,
+    )
+    response = to_json({"ok": True, "data": {"network": network, "results": results}})
+    return output_projection.project("ens_profile_many", response, fields)
 
 
 @function_tool
+@timed_tool
 async def ens_resolve(
     input: str, txt: str = "", contenthash: bool = False, network: str = "sepolia"
 ) -> str:
@@ -45,56 +246,95 @@ async def ens_resolve(
         params["txt"] = txt
     if contenthash:
         params["contenthash"] = "true"
-    return await worker_get("/resolve", params)
+    return await cached_get("ens_resolve", "/resolve", params)
+
+
+def _page_names(response: str, contains: str, offset: int) -> str:
+    """The /list response narrowed to names containing `contains`, from `offset` on."""
+    try:
+        body = json.loads(response)
+    except json.JSONDecodeError:
+        return response
+    data = body.get("data") if isinstance(body, dict) and body.get("ok") is True else None
+    if not isinstance(data, dict) or not isinstance(data.get("names"), list):
+        return response
+    names = data["names"]
+    if contains:
+        needle = contains.lower()
+        names = [
+            entry for entry in names
+            if isinstance(entry, dict) and needle in str(entry.get("name", "")).lower()
+        ]
+        data["contains"] = contains
+        data["matched"] = len(names)
+    data["offset"] = max(0, offset)
+    data["names"] = names[data["offset"]:]
+    return to_json(body)
 
 
 @function_tool
-async def ens_list(address: str, network: str = "sepolia") -> str:
+@timed_tool
+async def ens_list(address: str, network: str = "sepolia", contains: str = "", offset: int = 0) -> str:
     """List all ENS names owned by an Ethereum address.
 
+    Long lists are cut short; `names_omitted` says how many more there are after
+    this page. Get them with `offset`, or look for specific names with `contains`.
+
     Args:
         address: The Ethereum address to look up.
         network: "mainnet" or "sepolia". Defaults to "sepolia".
+        contains: Optional text the names must contain (case-insensitive), e.g. "dao".
+        offset: Number of (matching) names to skip, e.g. 25 for the second page.
     """
-    return await worker_get("/list", {"address": address, "network": network})
+    # The whole list is cached; filtering and paging only shape what the model reads
+    response = await cached_get("ens_list", "/list", {"address": address, "network": network})
+    if contains or offset:
+        response = _page_names(response, contains, offset)
+    return output_projection.project("ens_list", response)
 
 
 @function_tool
-async def ens_verify(name: str, records: str = "", network: str = "sepolia") -> str:
+@timed_tool
+async def ens_verify(name: str, records: str = "", network: str = "sepolia", fields: str = "") -> str:
     """Verify that on-chain records for an ENS name match expected values.
 
     Args:
         name: The ENS name to verify (e.g. "coolname.eth").
         records: Comma-separated list of record keys to check (e.g. "address,email").
         network: "mainnet" or "sepolia". Defaults to "sepolia".
+        fields: Optional comma-separated fields to return, e.g. "owner,primary_name,summary".
+            Returns everything if empty.
     """
     params: dict = {"name": name, "network": network}
     if records:
         params["records"] = records
-    return await worker_get("/verify", params)
+    return output_projection.project("ens_verify", await worker_get("/verify", params), fields)
 
 
 @function_tool
+@timed_tool
 async def ens_namehash(name: str) -> str:
     """Compute the namehash for an ENS name.
 
     Args:
         name: The ENS name (e.g. "vitalik.eth").
     """
-    return await worker_get("/namehash", {"name": name})
+    return namehash_response(name)
 
 
 @function_tool
+@timed_tool
 async def ens_labelhash(label: str) -> str:
     """Compute the labelhash for an ENS label.
 
     Args:
         label: The label (e.g. "vitalik", without .eth).
     """
-    return await worker_get("/labelhash", {"label": label})
+    return labelhash_response(label)
 
 
 @function_tool
+@timed_tool
 async def ens_resolver(name: str, network: str = "sepolia") -> str:
     """Get the resolver contract address for an ENS name.
 
@@ -102,10 +342,11 @@ async def ens_resolver(name: str, network: str = "sepolia") -> str:
         name: The ENS name (e.g. "vitalik.eth").
         network: "mainnet" or "sepolia". Defaults to "sepolia".
     """
-    return await worker_get("/resolver", {"name": name, "network": network})
+    return await cached_get("ens_resolver", "/resolver", {"name": name, "network": network})
 
 
 @function_tool
+@timed_tool
 async def ens_deployments() -> str:
     """Get all ENS contract deployment addresses for mainnet and sepolia."""
-    return await worker_get("/deployments")
+    return DEPLOYMENTS_RESPONSE
@@ -3,20 +3,21 @@ import json
 from agents import RunContextWrapper, function_tool
 from chatkit.agents import AgentContext, ClientToolCall
 
+from ..metrics import CLIENT_TOOL_CALLS, timed_tool
 from .helpers import worker_post
+from .prebuild import register_prebuilds
+from .projection import output_projection
 
 
-def _maybe_set_client_tool(
-    ctx: RunContextWrapper[AgentContext], response: str, operation_type: str = "transaction"
-) -> None:
-    """If the worker response contains a tx, set a client tool call for wallet signing."""
+def client_tool_call_for(response: str, operation_type: str = "transaction") -> ClientToolCall | None:
+    """The sign_transaction client tool call for a Worker response, or None if it carries no tx."""
     try:
         data = json.loads(response)
     except (json.JSONDecodeError, TypeError):
-        return
+        return None
 
     if not isinstance(data, dict) or not data.get("ok"):
-        return
+        return None
 
     payload = data.get("data", {})
 
@@ -27,11 +28,10 @@ def _maybe_set_client_tool(
             arguments["wait_seconds"] = payload["wait_seconds"]
         if "session_id" in payload:
             arguments["session_id"] = payload["session_id"]
-        ctx.context.client_tool_call = ClientToolCall(
+        return ClientToolCall(
             name="sign_transaction",
             arguments=arguments,
         )
-        return
 
     # Multi-transaction (subname)
     if "transactions" in payload:
@@ -39,13 +39,25 @@ def _maybe_set_client_tool(
         if txs:
             # Send the first step for signing
             first = txs[0]
-            ctx.context.client_tool_call = ClientToolCall(
+            return ClientToolCall(
                 name="sign_transaction",
                 arguments={"tx": first.get("tx", {}), "operation": first.get("step", "subname"), "steps": txs, "operation_type": operation_type},
             )
+    return None
+
+
+def _maybe_set_client_tool(
+    ctx: RunContextWrapper[AgentContext], response: str, operation_type: str = "transaction"
+) -> None:
+    """If the worker response contains a tx, set a client tool call for wallet signing."""
+    call = client_tool_call_for(response, operation_type)
+    if call is not None:
+        ctx.context.client_tool_call = call
+        CLIENT_TOOL_CALLS.labels(operation_type).inc()
 
 
 @function_tool
+@timed_tool
 async def ens_build_commit_tx(
     ctx: RunContextWrapper[AgentContext],
     label: str,
@@ -74,10 +86,11 @@ async def ens_build_commit_tx(
         "network": network,
     })
     _maybe_set_client_tool(ctx, response, operation_type="commit")
-    return response
+    return output_projection.project("ens_build_commit_tx", response)
 
 
 @function_tool
+@timed_tool
 async def ens_build_register_tx(
     ctx: RunContextWrapper[AgentContext],
     session_id: str,
@@ -89,12 +102,16 @@ async def ens_build_register_tx(
     Args:
         session_id: The session ID returned from the commit step.
     """
-    response = await worker_post("/register", {"session_id": session_id})
+    # Usually already built in the background while the commitment matured
+    response = await register_prebuilds.take(session_id) or await worker_post(
+        "/register", {"session_id": session_id}
+    )
     _maybe_set_client_tool(ctx, response, operation_type="register")
-    return response
+    return output_projection.project("ens_build_register_tx", response)
 
 
 @function_tool
+@timed_tool
 async def ens_build_set_records_tx(
     ctx: RunContextWrapper[AgentContext],
     name: str,
@@ -121,10 +138,11 @@ async def ens_build_set_records_tx(
         body["resolver"] = resolver
     response = await worker_post("/records", body)
     _maybe_set_client_tool(ctx, response, operation_type="set_records")
-    return response
+    return output_projection.project("ens_build_set_records_tx", response)
 
 
 @function_tool
+@timed_tool
 async def ens_build_renew_tx(
     ctx: RunContextWrapper[AgentContext],
     label: str,
@@ -144,10 +162,11 @@ async def ens_build_renew_tx(
         "network": network,
     })
     _maybe_set_client_tool(ctx, response, operation_type="renew")
-    return response
+    return output_projection.project("ens_build_renew_tx", response)
 
 
 @function_tool
+@timed_tool
 async def ens_build_transfer_tx(
     ctx: RunContextWrapper[AgentContext],
     label: str,
@@ -173,10 +192,11 @@ async def ens_build_transfer_tx(
         "network": network,
     })
     _maybe_set_client_tool(ctx, response, operation_type="transfer")
-    return response
+    return output_projection.project("ens_build_transfer_tx", response)
 
 
 @function_tool
+@timed_tool
 async def ens_build_primary_tx(
     ctx: RunContextWrapper[AgentContext],
     name: str,
@@ -199,10 +219,11 @@ async def ens_build_primary_tx(
         "network": network,
     })
     _maybe_set_client_tool(ctx, response, operation_type="set_primary")
-    return response
+    return output_projection.project("ens_build_primary_tx", response)
 
 
 @function_tool
+@timed_tool
 async def ens_build_subname_tx(
     ctx: RunContextWrapper[AgentContext],
     label: str,
@@ -235,4 +256,4 @@ async def ens_build_subname_tx(
         body["address"] = address
     response = await worker_post("/subname", body)
     _maybe_set_client_tool(ctx, response, operation_type="create_subname")
-    return response
+    return output_projection.project("ens_build_subname_tx", response)
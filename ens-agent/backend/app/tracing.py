@@ -0,0 +1,222 @@
+"""Request tracing, built on the Agents SDK's tracing.
+
+Each /chatkit request is one trace. The SDK already records the agent run,
+every model response and every tool call; the spans added here cover the
+endpoint, respond/action, store loads, history conversion and Worker
+requests, so they all land in one tree. The trace id is sent to the Worker
+as a W3C traceparent header (plus X-Trace-Id) and returned to the client in
+X-Trace-Id.
+
+Export with TRACE_EXPORT=jsonl (one JSON object per span, to
+TRACE_JSONL_PATH) or TRACE_EXPORT=otlp (OTLP/HTTP JSON to
+OTEL_EXPORTER_OTLP_ENDPOINT).
+"""
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any
+
+import httpx
+from agents.tracing import (
+    Span,
+    Trace,
+    add_trace_processor,
+    custom_span,
+    gen_trace_id,
+    get_current_span,
+    get_current_trace,
+    trace,
+)
+from agents.tracing.processor_interface import TracingExporter
+from agents.tracing.processors import BatchTraceProcessor
+from agents.tracing.scope import Scope
+
+logger = logging.getLogger(__name__)
+
+TRACE_EXPORT = os.environ.get("TRACE_EXPORT", "").lower()
+TRACE_JSONL_PATH = os.environ.get("TRACE_JSONL_PATH", "traces.jsonl")
+OTLP_ENDPOINT = os.environ.get("OTEL_EXPORTER_OTLP_TRACES_ENDPOINT") or (
+    os.environ.get("OTEL_EXPORTER_OTLP_ENDPOINT", "http://localhost:4318").rstrip("/") + "/v1/traces"
+)
+SERVICE_NAME = os.environ.get("OTEL_SERVICE_NAME", "ens-agent-backend")
+
+# Traces go to third parties, so wallet addresses are never recorded as-is:
+# with this key they are replaced by a keyed hash (stable across workers and
+# restarts, so one wallet's requests can be grouped); without it, only whether
+# a wallet was connected is kept
+TRACE_WALLET_KEY = os.environ.get("TRACE_WALLET_KEY", "")
+
+_HEX32 = re.compile(r"^[0-9a-f]{32}$")
+
+
+def wallet_tag(address: str) -> str:
+    """Trace-safe stand-in for a wallet address ("" when none is connected)."""
+    if not address:
+        return ""
+    if not TRACE_WALLET_KEY:
+        return "connected"
+    digest = hmac.new(TRACE_WALLET_KEY.encode(), address.lower().encode(), hashlib.sha256).hexdigest()
+    return f"hmac:{digest[:16]}"
+
+
+def span(name: str, **data: Any) -> Span[Any]:
+    """A span under the current one. A no-op outside a trace."""
+    return custom_span(name, data=data)
+
+
+class RequestTrace:
+    """The trace of one /chatkit request, kept open until its response is sent.
+
+    ChatKit only calls respond/action while a streaming response is consumed,
+    so for streaming requests the trace is re-entered around the stream and
+    finished when it ends.
+    """
+
+    def __init__(self, **metadata: Any) -> None:
+        self.trace = trace("chatkit", trace_id=gen_trace_id(), metadata=metadata)
+        self.trace_id = self.trace.trace_id
+        self.trace.start()
+        with self.active(root=False):
+            self.root = custom_span("chatkit_endpoint", data=dict(metadata))
+        self.root.start()
+
+    @contextmanager
+    def active(self, root: bool = True) -> Iterator[None]:
+        """Make this trace (and its root span) current without finishing either."""
+        trace_token = Scope.set_current_trace(self.trace)
+        span_token = Scope.set_current_span(self.root) if root else None
+        try:
+            yield
+        finally:
+            if span_token is not None:
+                Scope.reset_current_span(span_token)
+            Scope.reset_current_trace(trace_token)
+
+    def finish(self, error: BaseException | None = None) -> None:
+        if error is not None:
+            self.root.set_error({"message": type(error).__name__, "data": {"error": str(error)}})
+        self.root.finish()
+        self.trace.finish()
+
+    async def stream(self, stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Pass a streaming response through with this trace current, then finish it."""
+        error: BaseException | None = None
+        try:
+            with self.active():
+                async for chunk in stream:
+                    yield chunk
+        except BaseException as err:
+            error = err
+            raise
+        finally:
+            self.finish(error)
+
+
+def trace_headers() -> dict[str, str]:
+    """W3C traceparent and X-Trace-Id for the current span, or {} outside a trace."""
+    current = get_current_trace()
+    trace_hex = current.trace_id.removeprefix("trace_") if current is not None else ""
+    if not _HEX32.match(trace_hex):
+        return {}
+    parent = get_current_span()
+    span_hex = _span_hex(parent.span_id) if parent is not None else trace_hex[:16]
+    return {"traceparent": f"00-{trace_hex}-{span_hex}-01", "X-Trace-Id": current.trace_id}
+
+
+def _span_hex(span_id: str | None) -> str:
+    return (span_id or "").removeprefix("span_")[:16]
+
+
+class JsonlExporter(TracingExporter):
+    """Appends every trace and span, as exported by the SDK, to a JSONL file."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def export(self, items: list[Trace | Span[Any]]) -> None:
+        lines = [json.dumps(data, default=str) for data in (item.export() for item in items) if data]
+        if lines:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+
+class OtlpExporter(TracingExporter):
+    """Sends spans to an OTLP/HTTP collector using the JSON encoding."""
+
+    def __init__(self, endpoint: str, service_name: str = SERVICE_NAME) -> None:
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self._client = httpx.Client(timeout=10)
+
+    def export(self, items: list[Trace | Span[Any]]) -> None:
+        spans = [self._span(item) for item in items if isinstance(item, Span)]
+        spans = [s for s in spans if s is not None]
+        if not spans:
+            return
+        body = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{"scope": {"name": "ens-agent"}, "spans": spans}],
+            }]
+        }
+        try:
+            self._client.post(self.endpoint, json=body).raise_for_status()
+        except httpx.HTTPError as err:
+            logger.warning("OTLP export to %s failed: %s", self.endpoint, err)
+
+    @staticmethod
+    def _span(item: Span[Any]) -> dict[str, Any] | None:
+        exported = item.export()
+        if not exported or not exported.get("started_at"):
+            return None
+        data = dict(exported.get("span_data") or {})
+        kind = data.pop("type", "span")
+        name = data.pop("name", None)
+        if kind == "custom":
+            data = data.get("data") or {}
+        attributes = [_attribute(f"agents.{key}", value) for key, value in data.items() if value is not None]
+        otlp: dict[str, Any] = {
+            "traceId": item.trace_id.removeprefix("trace_"),
+            "spanId": _span_hex(item.span_id),
+            "parentSpanId": _span_hex(exported.get("parent_id")),
+            "name": name if kind == "custom" else f"{kind} {name}" if name else kind,
+            "kind": 1,
+            "startTimeUnixNano": _unix_nanos(exported["started_at"]),
+            "endTimeUnixNano": _unix_nanos(exported.get("ended_at") or exported["started_at"]),
+            "attributes": attributes,
+        }
+        if exported.get("error"):
+            otlp["status"] = {"code": 2, "message": str(exported["error"].get("message", ""))}
+        return otlp
+
+
+def _attribute(key: str, value: Any) -> dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return {"key": key, "value": {"stringValue": text[:2000]}}
+
+
+def _unix_nanos(timestamp: str) -> str:
+    return str(int(datetime.fromisoformat(timestamp).timestamp() * 1_000_000_000))
+
+
+def setup_tracing() -> None:
+    """Register the exporter selected by TRACE_EXPORT, if any. Called once at startup."""
+    if TRACE_EXPORT == "jsonl":
+        add_trace_processor(BatchTraceProcessor(JsonlExporter(TRACE_JSONL_PATH)))
+    elif TRACE_EXPORT == "otlp":
+        add_trace_processor(BatchTraceProcessor(OtlpExporter(OTLP_ENDPOINT)))
+    elif TRACE_EXPORT:
+        logger.warning("Unknown TRACE_EXPORT=%s, spans are not exported", TRACE_EXPORT)
@@ -0,0 +1,277 @@
+"""Deterministic stand-ins for the OpenAI model and the ENS Worker, for offline benchmarks.
+
+ScriptedModel answers every turn the same way: if the latest input is a user
+message or action context, it calls one read tool for the first name in it
+(ens_profile by default); once the tool output is in, it streams a short
+text reply. Offered a handoff (the lite agent's start_transaction_flow), it
+takes it for messages asking to register, renew, transfer or set something.
+Latencies are fixed and configurable, so runs are comparable.
+
+worker_app() serves canned JSON for every Worker route with a fixed delay.
+"""
+
+import asyncio
+import json
+import re
+import time
+import uuid
+from collections.abc import AsyncIterator
+from typing import Any
+
+from agents import Model, ModelProvider, ModelResponse, Usage
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseContentPartAddedEvent,
+    ResponseContentPartDoneEvent,
+    ResponseCreatedEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputItemAddedEvent,
+    ResponseOutputItemDoneEvent,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+    ResponseTextDoneEvent,
+    ResponseUsage,
+)
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+NAME = re.compile(r"[a-z0-9-]+\.eth")
+WRITE = re.compile(r"\b(register|renew|transfer|set)\b")
+
+REPLY = (
+    "{name} is registered and points to 0x1111111111111111111111111111111111111111. "
+    "It expires on 2030-01-01 and has avatar, twitter and url records set."
+)
+
+
+def _last_turn_text(input: str | list[Any]) -> tuple[str, bool]:
+    """Text of the latest user message (or action context), and whether a tool output follows it.
+
+    Developer messages (wallet context, history summary) are skipped.
+    """
+    if isinstance(input, str):
+        return input, False
+    for item in reversed(input):
+        if item.get("type") == "function_call_output":
+            return "", True
+        if item.get("role") == "user" and item.get("type", "message") == "message":
+            content = item.get("content")
+            if isinstance(content, list):
+                content = " ".join(p.get("text", "") for p in content if isinstance(p, dict))
+            return str(content), False
+    return "", False
+
+
+class ScriptedModel(Model):
+    """Calls `tool` for the first ENS name in the latest turn, then replies in text.
+
+    first_token_delay is the time to the first streamed event of each model
+    call; token_delay is the gap between text deltas (one per word).
+    """
+
+    def __init__(
+        self,
+        tool: str = "ens_profile",
+        first_token_delay: float = 0.3,
+        token_delay: float = 0.01,
+        cached_tokens: int = 0,
+    ) -> None:
+        self.tool = tool
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.cached_tokens = cached_tokens
+        self.calls = 0
+
+    def _plan(self, input: str | list[Any], handoffs: list[Any]) -> ResponseFunctionToolCall | ResponseOutputMessage:
+        self.calls += 1
+        text, answered = _last_turn_text(input)
+        if not answered and handoffs and WRITE.search(text.lower()):
+            return ResponseFunctionToolCall(
+                type="function_call",
+                id=f"fc_{uuid.uuid4().hex}",
+                call_id=f"call_{uuid.uuid4().hex}",
+                name=handoffs[0].tool_name,
+                arguments="{}",
+                status="completed",
+            )
+        if not answered:
+            match = NAME.search(text.lower())
+            if match:
+                return ResponseFunctionToolCall(
+                    type="function_call",
+                    id=f"fc_{uuid.uuid4().hex}",
+                    call_id=f"call_{uuid.uuid4().hex}",
+                    name=self.tool,
+                    arguments=json.dumps({"input": match.group(0), "network": "sepolia"}),
+                    status="completed",
+                )
+        names = NAME.findall(json.dumps(input).lower()) if not isinstance(input, str) else []
+        reply = REPLY.format(name=names[-1] if names else "That name")
+        return ResponseOutputMessage(
+            type="message",
+            id=f"msg_{uuid.uuid4().hex}",
+            role="assistant",
+            status="completed",
+            content=[ResponseOutputText(type="output_text", text=reply, annotations=[])],
+        )
+
+    def _response(self, item: Any, input: str | list[Any]) -> Response:
+        input_tokens = len(json.dumps(input, default=str)) // 4
+        return Response(
+            id=f"resp_{uuid.uuid4().hex}",
+            object="response",
+            created_at=time.time(),
+            model="scripted",
+            output=[item],
+            parallel_tool_calls=False,
+            tool_choice="auto",
+            tools=[],
+            usage=ResponseUsage(
+                input_tokens=input_tokens,
+                input_tokens_details=InputTokensDetails(
+                    cached_tokens=min(self.cached_tokens, input_tokens), cache_write_tokens=0),
+                output_tokens=20,
+                output_tokens_details=OutputTokensDetails(reasoning_tokens=0),
+                total_tokens=input_tokens + 20,
+            ),
+        )
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                           handoffs, tracing, **kwargs: Any) -> ModelResponse:
+        await asyncio.sleep(self.first_token_delay)
+        response = self._response(self._plan(input, handoffs), input)
+        usage = response.usage
+        return ModelResponse(
+            output=response.output,
+            usage=Usage(
+                requests=1,
+                input_tokens=usage.input_tokens,
+                output_tokens=usage.output_tokens,
+                total_tokens=usage.total_tokens,
+                input_tokens_details=usage.input_tokens_details,
+                output_tokens_details=usage.output_tokens_details,
+            ),
+            response_id=response.id,
+        )
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema,
+                              handoffs, tracing, **kwargs: Any) -> AsyncIterator[Any]:
+        item = self._plan(input, handoffs)
+        response = self._response(item, input)
+        seq = iter(range(1_000_000))
+        await asyncio.sleep(self.first_token_delay)
+        yield ResponseCreatedEvent(type="response.created", response=response, sequence_number=next(seq))
+        if isinstance(item, ResponseFunctionToolCall):
+            yield ResponseOutputItemAddedEvent(
+                type="response.output_item.added", item=item, output_index=0, sequence_number=next(seq))
+        else:
+            text = item.content[0].text
+            empty = ResponseOutputText(type="output_text", text="", annotations=[])
+            started = item.model_copy(update={"content": [], "status": "in_progress"})
+            yield ResponseOutputItemAddedEvent(
+                type="response.output_item.added", item=started, output_index=0, sequence_number=next(seq))
+            yield ResponseContentPartAddedEvent(
+                type="response.content_part.added", item_id=item.id, output_index=0, content_index=0,
+                part=empty, sequence_number=next(seq))
+            for word in re.findall(r"\S+\s*", text):
+                await asyncio.sleep(self.token_delay)
+                yield ResponseTextDeltaEvent(
+                    type="response.output_text.delta", item_id=item.id, output_index=0, content_index=0,
+                    delta=word, logprobs=[], sequence_number=next(seq))
+            yield ResponseTextDoneEvent(
+                type="response.output_text.done", item_id=item.id, output_index=0, content_index=0,
+                text=text, logprobs=[], sequence_number=next(seq))
+            yield ResponseContentPartDoneEvent(
+                type="response.content_part.done", item_id=item.id, output_index=0, content_index=0,
+                part=item.content[0], sequence_number=next(seq))
+        yield ResponseOutputItemDoneEvent(
+            type="response.output_item.done", item=item, output_index=0, sequence_number=next(seq))
+        yield ResponseCompletedEvent(type="response.completed", response=response, sequence_number=next(seq))
+
+
+class ScriptedModelProvider(ModelProvider):
+    """Returns the ScriptedModel registered for a model name, or the default one."""
+
+    def __init__(self, model: ScriptedModel | None = None, models: dict[str, ScriptedModel] | None = None) -> None:
+        self.model = model or ScriptedModel()
+        self.models = models or {}
+
+    def get_model(self, model_name: str | None) -> Model:
+        return self.models.get(model_name or "", self.model)
+
+
+PROFILE = {
+    "ok": True,
+    "data": {
+        "address": "0x1111111111111111111111111111111111111111",
+        "expiry": "2030-01-01T00:00:00Z",
+        "records": {"avatar": "https://example.com/a.png", "com.twitter": "ens", "url": "https://ens.domains"},
+    },
+}
+
+
+# Rent for a 5+ character name, in wei per second (about 0.0031 ETH a year)
+_RENT_WEI_PER_SECOND = 98_300_000
+_DURATION_UNITS = {"y": 365 * 86400, "m": 30 * 86400, "d": 86400}
+
+
+def _ether(wei: int) -> str:
+    """Like viem's formatEther: no trailing zeros, no exponent."""
+    whole, frac = divmod(wei, 10**18)
+    return f"{whole}.{frac:018d}".rstrip("0").rstrip(".")
+
+
+def check_response(label: str, duration: str = "1y", network: str = "sepolia") -> dict[str, Any]:
+    """A /check body shaped like the Worker's checkName(): the label is available at a fixed rent."""
+    duration = duration.strip().lower()
+    if duration[-1:] in _DURATION_UNITS:
+        seconds = int(float(duration[:-1] or 1) * _DURATION_UNITS[duration[-1]])
+    else:
+        seconds = int(duration) if duration.isdigit() else _DURATION_UNITS["y"]
+    base = _RENT_WEI_PER_SECOND * seconds
+    total = base
+    total_with_buffer = total + total // 10
+    return {
+        "ok": True,
+        "data": {
+            "available": True,
+            "label": label.lower(),
+            "fullName": f"{label.lower()}.eth",
+            "price": {
+                "base": _ether(base),
+                "premium": _ether(0),
+                "total": _ether(total),
+                "total_with_buffer": _ether(total_with_buffer),
+                "wei": {
+                    "base": str(base),
+                    "premium": "0",
+                    "total": str(total),
+                    "total_with_buffer": str(total_with_buffer),
+                },
+            },
+            "duration_seconds": seconds,
+            "network": network,
+        },
+    }
+
+
+def worker_app(delay: float = 0.02) -> Starlette:
+    """A Worker stand-in: every GET and POST returns canned JSON after `delay` seconds."""
+
+    async def handle(request: Request) -> JSONResponse:
+        await asyncio.sleep(delay)
+        if request.url.path == "/check":
+            params = request.query_params
+            return JSONResponse(check_response(
+                params.get("label", ""), params.get("duration", "1y"), params.get("network", "sepolia"),
+            ))
+        if request.method == "POST":
+            return JSONResponse({"ok": True, "data": {"to": "0x" + "2" * 40, "data": "0x", "value": "0"}})
+        return JSONResponse(PROFILE)
+
+    return Starlette(routes=[Route("/{path:path}", handle, methods=["GET", "POST"])])
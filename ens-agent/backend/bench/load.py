@@ -0,0 +1,253 @@
+"""End-to-end /chatkit load test with a scripted model and a stub Worker, fully offline.
+
+Starts the Worker stub and the backend (with ScriptedModel in place of the
+OpenAI model) as subprocesses, then runs THREADS conversations, CONCURRENCY
+at a time. Each conversation creates a thread and sends TURNS messages in it;
+every turn is one tool call plus a streamed reply. Reports requests/s,
+latency to the end of the stream and time to first SSE event, and writes
+them as JSON. With --baseline, prints the change against an earlier run.
+
+Tracing stays on, as in production, with spans exported to a local JSONL file
+instead of the OpenAI dashboard. By default the run is repeated on a fresh
+backend with tracing disabled, and both results are reported.
+
+Usage: python -m bench.load [--threads 200] [--concurrency 20] [--turns 2]
+                            [--model-delay 0.3] [--token-delay 0.01] [--worker-delay 0.02]
+                            [--tracing both|on|off]
+                            [--out bench/results/load.json] [--baseline old.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from bench.workers import free_port
+
+METRICS = ("rps", "latency_ms.p50", "latency_ms.p95", "latency_ms.p99", "ttfe_ms.p50", "ttfe_ms.p95", "ttfe_ms.p99")
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    if not samples:
+        return {}
+    samples = sorted(samples)
+    pct = lambda p: samples[min(len(samples) - 1, int(len(samples) * p))]
+    return {
+        "mean": round(statistics.fmean(samples), 2),
+        "p50": round(pct(0.50), 2),
+        "p95": round(pct(0.95), 2),
+        "p99": round(pct(0.99), 2),
+    }
+
+
+def serve_backend(port: int, args: argparse.Namespace) -> None:
+    import uvicorn
+
+    from agents import set_trace_processors
+
+    # Drop the SDK's OpenAI exporter before app.main adds TRACE_EXPORT's, so
+    # spans are built and exported locally rather than sent over the network
+    set_trace_processors([])
+
+    from app.agent import ens_agent, lite_agent, summary_agent
+    from app.main import app
+    from bench.fakes import ScriptedModel
+
+    model = ScriptedModel(first_token_delay=args.model_delay, token_delay=args.token_delay)
+    ens_agent.model = model
+    lite_agent.model = model
+    summary_agent.model = model
+    uvicorn.run(app, port=port, log_level="warning")
+
+
+def serve_worker(port: int, args: argparse.Namespace) -> None:
+    import uvicorn
+
+    from bench.fakes import worker_app
+
+    uvicorn.run(worker_app(args.worker_delay), port=port, log_level="warning")
+
+
+def start(role: str, port: int, args: argparse.Namespace, env: dict[str, str]) -> subprocess.Popen:
+    cmd = [sys.executable, "-m", "bench.load", "--serve", role, "--port", str(port),
+           "--model-delay", str(args.model_delay), "--token-delay", str(args.token_delay),
+           "--worker-delay", str(args.worker_delay)]
+    return subprocess.Popen(cmd, env={**os.environ, **env})
+
+
+async def wait_ready(url: str) -> None:
+    deadline = time.monotonic() + 60
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not start")
+
+
+def message(text: str) -> dict:
+    return {"content": [{"type": "input_text", "text": text}], "attachments": [], "inference_options": {}}
+
+
+async def send(client: httpx.AsyncClient, body: dict) -> tuple[float, float, str | None]:
+    """POST one streaming request. Returns (ttfe_ms, total_ms, thread id if one was created)."""
+    start = time.perf_counter()
+    ttfe = None
+    thread_id = None
+    async with client.stream("POST", "/chatkit", content=json.dumps(body)) as resp:
+        resp.raise_for_status()
+        async for line in resp.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            if ttfe is None:
+                ttfe = (time.perf_counter() - start) * 1000
+            event = json.loads(line[6:])
+            if event.get("type") == "thread.created":
+                thread_id = event["thread"]["id"]
+            elif event.get("type") == "error":
+                raise RuntimeError(event.get("message") or "error event")
+    total = (time.perf_counter() - start) * 1000
+    return ttfe if ttfe is not None else total, total, thread_id
+
+
+async def drive(port: int, threads: int, concurrency: int, turns: int) -> dict:
+    latencies: list[float] = []
+    ttfes: list[float] = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    gate = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=120) as client:
+
+        async def conversation(n: int) -> None:
+            nonlocal errors
+            async with gate:
+                thread_id = None
+                for turn in range(turns):
+                    text = f"Look up load{n}-{turn}.eth"
+                    if thread_id is None:
+                        body = {"type": "threads.create", "params": {"input": message(text)}}
+                    else:
+                        body = {"type": "threads.add_user_message",
+                                "params": {"thread_id": thread_id, "input": message(text)}}
+                    try:
+                        ttfe, total, created = await send(client, body)
+                    except (httpx.HTTPError, RuntimeError):
+                        errors += 1
+                        return
+                    thread_id = thread_id or created
+                    ttfes.append(ttfe)
+                    latencies.append(total)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(conversation(n) for n in range(threads)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "duration_s": round(elapsed, 2),
+        "rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": percentiles(latencies),
+        "ttfe_ms": percentiles(ttfes),
+    }
+
+
+def lookup(results: dict, metric: str) -> float | None:
+    value = results
+    for key in metric.split("."):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def compare(current: dict, baseline: dict, title: str) -> None:
+    print(f"\n{title}")
+    for metric in METRICS:
+        old, new = lookup(baseline, metric), lookup(current, metric)
+        if old and new is not None:
+            print(f"  {metric:16s} {old:10.2f} -> {new:10.2f}  ({100 * (new - old) / old:+.1f}%)")
+
+
+def run(args: argparse.Namespace, tracing: bool, trace_dir: str) -> dict:
+    """One load run against fresh Worker stub and backend processes."""
+    worker_port, backend_port = free_port(), free_port()
+    env = {
+        "WORKER_URL": f"http://127.0.0.1:{worker_port}",
+        "CHATKIT_STORE": "memory",
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "unused"),
+    }
+    if tracing:
+        env.update(TRACE_EXPORT="jsonl", TRACE_JSONL_PATH=os.path.join(trace_dir, "traces.jsonl"))
+    else:
+        env["OPENAI_AGENTS_DISABLE_TRACING"] = "1"
+    procs = [start("worker", worker_port, args, env), start("backend", backend_port, args, env)]
+    try:
+        asyncio.run(wait_ready(f"http://127.0.0.1:{worker_port}/"))
+        asyncio.run(wait_ready(f"http://127.0.0.1:{backend_port}/"))
+        return asyncio.run(drive(backend_port, args.threads, args.concurrency, args.turns))
+    finally:
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=2)
+    parser.add_argument("--model-delay", type=float, default=0.3, help="seconds to first event per model call")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between streamed words")
+    parser.add_argument("--worker-delay", type=float, default=0.02, help="seconds per Worker request")
+    parser.add_argument("--tracing", choices=["both", "on", "off"], default="both",
+                        help="run with tracing on (exported to a local file), off, or both")
+    parser.add_argument("--out", default="bench/results/load.json")
+    parser.add_argument("--baseline")
+    parser.add_argument("--serve", choices=["backend", "worker"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve == "backend":
+        return serve_backend(args.port, args)
+    if args.serve == "worker":
+        return serve_worker(args.port, args)
+
+    with tempfile.TemporaryDirectory() as trace_dir:
+        runs = {mode: run(args, mode == "on", trace_dir)
+                for mode in (("on", "off") if args.tracing == "both" else (args.tracing,))}
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"cpus": os.cpu_count(), "python": platform.python_version()},
+        "config": {k: getattr(args, k) for k in
+                   ("threads", "concurrency", "turns", "model_delay", "token_delay", "worker_delay", "tracing")},
+        # With tracing on (as deployed) unless only the untraced run was asked for
+        "results": runs.get("on") or runs["off"],
+    }
+    if len(runs) == 2:
+        report["results_without_tracing"] = runs["off"]
+    print(json.dumps(report, indent=2))
+    if len(runs) == 2:
+        compare(runs["on"], runs["off"], "tracing off -> on")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        compare(report["results"], baseline["results"], f"vs baseline ({baseline.get('timestamp', '?')})")
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""Micro-benchmarks for the code that runs on every turn, with baseline comparison.
+
+Cases cover MemoryStore operations on a seeded store, converting long thread
+histories to agent input (cold, with ThreadItemConverter, and warm, through
+AgentInputCache), _maybe_set_client_tool on large Worker responses, tool
+output projection, and the widget builders. Each case is timed over ROUNDS rounds of enough calls to
+last ~20 ms, interleaved across cases and with the garbage collector paused
+as timeit does. The fastest round is what gets compared: on a shared host
+the slower rounds mostly measure other tenants. The median is reported
+alongside.
+
+Results are compared against the baseline (bench/baselines/micro.json by
+default). Cases slower than the baseline by more than --threshold are flagged
+and the exit status is 1. --save-baseline writes this run as the new baseline.
+
+Usage: python -m bench.micro [--rounds 25] [--threshold 0.2] [--only store,widgets]
+                             [--baseline bench/baselines/micro.json] [--save-baseline]
+                             [--out bench/results/micro.json]
+"""
+
+import argparse
+import asyncio
+import gc
+import inspect
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+from typing import Any
+
+from agents import RunContextWrapper
+from chatkit.agents import AgentContext, ThreadItemConverter
+from chatkit.types import (
+    AssistantMessageContent,
+    AssistantMessageItem,
+    ClientToolCallItem,
+    HiddenContextItem,
+    InferenceOptions,
+    ThreadMetadata,
+    UserMessageItem,
+    UserMessageTextContent,
+)
+
+from app.history import AgentInputCache
+from app.store import MemoryStore
+from app.tools.projection import OutputProjection
+from app.tools.writes import _maybe_set_client_tool
+from app.widgets import build_countdown_card, build_records_preview, build_subname_steps, build_tx_card
+from bench.store import BASE_TIME, CTX, make_item, seed_memory
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+
+Case = Callable[[], Any] | Callable[[], Awaitable[Any]]
+
+
+def history(thread_id: str, turns: int) -> list:
+    """A realistic thread: each turn is a user message, a signed transaction, its confirmation and a reply."""
+    items: list = []
+    for n in range(turns):
+        at = BASE_TIME + timedelta(seconds=4 * n)
+        items.append(UserMessageItem(
+            id=f"msg_u{n}", thread_id=thread_id, created_at=at,
+            content=[UserMessageTextContent(text=f"Set the avatar and twitter records on name{n}.eth")],
+            inference_options=InferenceOptions(),
+        ))
+        items.append(ClientToolCallItem(
+            id=f"ctc_{n}", thread_id=thread_id, created_at=at + timedelta(seconds=1), status="completed",
+            call_id=f"call_{n}", name="sign_transaction",
+            arguments={"tx": {"to": "0x" + "2" * 40, "data": "0x" + "ab" * 300, "value": "0"},
+                       "operation": f"name{n}.eth", "operation_type": "records"},
+            output={"tx_hash": "0x" + "cd" * 32},
+        ))
+        items.append(HiddenContextItem(
+            id=f"hid_{n}", thread_id=thread_id, created_at=at + timedelta(seconds=2),
+            content=f"Transaction confirmed with hash: 0x{'cd' * 32}",
+        ))
+        items.append(AssistantMessageItem(
+            id=f"msg_a{n}", thread_id=thread_id, created_at=at + timedelta(seconds=3),
+            content=[AssistantMessageContent(text=f"Done. name{n}.eth now has avatar and twitter records. " * 3)],
+        ))
+    return items
+
+
+def subname_response(steps: int) -> str:
+    """A Worker /subname response with `steps` transactions carrying large calldata."""
+    return json.dumps({"ok": True, "data": {"name": "sub.name.eth", "transactions": [
+        {"step": "create_subname", "tx": {"to": "0x" + "2" * 40, "data": "0x" + "ab" * 2000, "value": "0"}}
+        for _ in range(steps)
+    ]}})
+
+
+def register_response() -> str:
+    return json.dumps({"ok": True, "data": {
+        "name": "longname.eth", "session_id": str(uuid.uuid4()), "wait_seconds": 60,
+        "tx": {"to": "0x" + "2" * 40, "data": "0x" + "ab" * 5000, "value": "3100000000000000"},
+        "price": {"eth": "0.0031", "wei": "3100000000000000"},
+        "records": {f"key{i}": "v" * 200 for i in range(50)},
+    }})
+
+
+def store_cases(threads: int, items: int) -> dict[str, Case]:
+    store = MemoryStore()
+    thread_ids = [str(uuid.uuid4()) for _ in range(threads)]
+    seed_memory(store, thread_ids, items)
+    rng = random.Random(0)
+    counter = iter(range(items, 10**9))
+    # save_item rewrites a known item on one of these threads
+    targets = thread_ids[:100]
+    for tid in targets:
+        store._items[tid].append(make_item(tid, items, item_id=f"fixed-{tid}"))
+
+    async def load_thread_items() -> None:
+        await store.load_thread_items(rng.choice(thread_ids), after=None, limit=100, order="desc", context=CTX)
+
+    async def load_thread() -> None:
+        await store.load_thread(rng.choice(thread_ids), CTX)
+
+    async def add_thread_item() -> None:
+        tid = rng.choice(thread_ids)
+        await store.add_thread_item(tid, make_item(tid, next(counter)), CTX)
+
+    async def save_item() -> None:
+        tid = rng.choice(targets)
+        await store.save_item(tid, make_item(tid, items, item_id=f"fixed-{tid}"), CTX)
+
+    return {
+        f"store.load_thread_items[{threads}x{items}]": load_thread_items,
+        f"store.load_thread[{threads}x{items}]": load_thread,
+        f"store.add_thread_item[{threads}x{items}]": add_thread_item,
+        f"store.save_item[{threads}x{items}]": save_item,
+    }
+
+
+def converter_cases(turns: int) -> dict[str, Case]:
+    converter = ThreadItemConverter()
+    store = MemoryStore()
+    thread = ThreadMetadata(id="thr_bench", created_at=BASE_TIME)
+    items = history(thread.id, turns)
+    cache = AgentInputCache(converter, store)
+
+    async def cold() -> None:
+        await converter.to_agent_input(items)
+
+    async def warm() -> None:
+        await cache.to_agent_input(thread.id, items)
+
+    return {
+        f"converter.to_agent_input[{len(items)} items]": cold,
+        f"input_cache.to_agent_input[{len(items)} items]": warm,
+    }
+
+
+def client_tool_cases() -> dict[str, Case]:
+    ctx = RunContextWrapper(AgentContext(
+        thread=ThreadMetadata(id="thr_bench", created_at=BASE_TIME), store=MemoryStore(), request_context={},
+    ))
+    register = register_response()
+    subname = subname_response(3)
+    error = json.dumps({"ok": False, "error": {"code": "NAME_TAKEN", "message": "x" * 500}})
+    return {
+        f"maybe_set_client_tool[register {len(register) // 1024}KB]": lambda: _maybe_set_client_tool(ctx, register),
+        f"maybe_set_client_tool[subname {len(subname) // 1024}KB]": lambda: _maybe_set_client_tool(ctx, subname, "subname"),
+        "maybe_set_client_tool[error]": lambda: _maybe_set_client_tool(ctx, error),
+    }
+
+
+def projection_cases() -> dict[str, Case]:
+    projection = OutputProjection()
+    profile = json.dumps({"ok": True, "data": {
+        "name": "busy.eth", "address": "0x" + "1" * 40, "owner": "0x" + "1" * 40, "resolver": "0x" + "2" * 40,
+        "primary_name": "busy.eth", "avatar_url": None, "network": "mainnet",
+        "expiry": {"date": "2030-01-01T00:00:00.000Z", "timestamp": 1893456000, "expired": False},
+        "text_records": {f"key{i}": "v" * 200 for i in range(50)},
+    }})
+    names = json.dumps({"ok": True, "data": {"address": "0x" + "1" * 40, "total": 300, "network": "mainnet", "names": [
+        {"name": f"name{i}.eth", "expiry": {"date": "2030-01-01T00:00:00.000Z", "timestamp": 1893456000,
+                                           "expired": False, "days_left": 1000}}
+        for i in range(300)
+    ]}})
+    register = register_response()
+    return {
+        f"projection.ens_profile[{len(profile) // 1024}KB]": lambda: projection.project("ens_profile", profile),
+        f"projection.ens_list[{len(names) // 1024}KB]": lambda: projection.project("ens_list", names),
+        f"projection.register[{len(register) // 1024}KB]": lambda: projection.project("ens_build_register_tx", register),
+    }
+
+
+def widget_cases() -> dict[str, Case]:
+    tx = {"to": "0x" + "2" * 40, "data": "0x" + "ab" * 2000, "value": "3100000000000000"}
+    records = [f"com.twitter = ens{i}" for i in range(30)]
+    warnings = [f"avatar{i} is not a valid URL" for i in range(5)]
+    steps = json.loads(subname_response(3))["data"]["transactions"]
+    return {
+        "widgets.build_tx_card": lambda: build_tx_card("Register longname.eth", tx, "0.0031"),
+        "widgets.build_countdown_card": lambda: build_countdown_card(60),
+        "widgets.build_records_preview[30]": lambda: build_records_preview(records, warnings),
+        "widgets.build_subname_steps[3]": lambda: build_subname_steps(steps),
+    }
+
+
+class Timer:
+    """Times one case in rounds of `number` calls, sized to last about `target` seconds."""
+
+    def __init__(self, fn: Case, target: float = 0.02) -> None:
+        self.fn = fn
+        self.is_async = inspect.iscoroutinefunction(fn)
+        self.target = target
+        self.number = 1
+        self.per_call: list[float] = []
+
+    async def _run(self, n: int) -> float:
+        start = time.perf_counter()
+        if self.is_async:
+            for _ in range(n):
+                await self.fn()
+        else:
+            for _ in range(n):
+                self.fn()
+        return time.perf_counter() - start
+
+    async def calibrate(self) -> None:
+        while (elapsed := await self._run(self.number)) < self.target:
+            self.number = max(self.number * 2, int(self.number * self.target / max(elapsed, 1e-9)))
+
+    async def round(self) -> None:
+        self.per_call.append(1e6 * await self._run(self.number) / self.number)
+
+    def result(self) -> dict[str, float]:
+        return {
+            "us": round(min(self.per_call), 3),
+            "median_us": round(statistics.median(self.per_call), 3),
+            "calls": self.number,
+        }
+
+
+async def run_cases(args: argparse.Namespace) -> dict[str, dict[str, float]]:
+    groups = {
+        "store": lambda: store_cases(args.threads, args.items),
+        "converter": lambda: converter_cases(args.turns),
+        "client_tool": client_tool_cases,
+        "projection": projection_cases,
+        "widgets": widget_cases,
+    }
+    selected = args.only.split(",") if args.only else list(groups)
+    timers = {name: Timer(fn) for group in selected for name, fn in groups[group]().items()}
+    for timer in timers.values():
+        await timer.calibrate()
+
+    # Rounds are interleaved across cases, so a slow stretch on the host costs
+    # every case one round rather than one case all of its rounds
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(args.rounds):
+            for timer in timers.values():
+                await timer.round()
+    finally:
+        gc.enable()
+
+    results = {name: timer.result() for name, timer in timers.items()}
+    for name, result in results.items():
+        print(f"  {name:48s} {result['us']:10.2f} us  (median {result['median_us']:.2f})")
+    return results
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Print each case against the baseline; returns the names that regressed beyond threshold."""
+    regressions = []
+    print(f"\nvs baseline ({baseline.get('timestamp', '?')}), threshold +{threshold:.0%}")
+    for name, current in results.items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"  {name:48s} (new)")
+            continue
+        change = (current["us"] - old["us"]) / old["us"]
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"  {name:48s} {old['us']:10.2f} -> {current['us']:10.2f} us  ({change:+.1%}){flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=25)
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, as a fraction")
+    parser.add_argument("--only", default="", help="comma-separated groups: store,converter,client_tool,projection,widgets")
+    parser.add_argument("--threads", type=int, default=1_000)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--out", default="bench/results/micro.json")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_cases(args))
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {"cpus": os.cpu_count(), "python": platform.python_version()},
+        "results": results,
+    }
+
+    path = args.baseline if args.save_baseline else args.out
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    if args.save_baseline:
+        print(f"\nSaved baseline to {path}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Per-call latency of load_thread_items and add_thread_item for MemoryStore vs SqliteStore.
+
+Seeds each store with THREADS x ITEMS items, then times CALLS calls of each
+operation against random threads.
+
+Usage: python -m bench.store [--threads 10000] [--items 200] [--calls 2000] [--stores memory,sqlite]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from chatkit.types import AssistantMessageContent, AssistantMessageItem, ThreadMetadata
+
+from app.store import MemoryStore, OrderedIndex, SqliteStore, _item_adapter
+
+CTX: dict = {}
+BASE_TIME = datetime(2026, 1, 1)
+
+
+def make_item(thread_id: str, n: int, item_id: str | None = None) -> AssistantMessageItem:
+    return AssistantMessageItem(
+        id=item_id or str(uuid.uuid4()),
+        thread_id=thread_id,
+        created_at=BASE_TIME + timedelta(seconds=n),
+        content=[AssistantMessageContent(text="nick.eth is registered until 2030. " * 8)],
+    )
+
+
+def seed_memory(store: MemoryStore, thread_ids: list[str], items: int) -> None:
+    for tid in thread_ids:
+        store._threads.append(ThreadMetadata(id=tid, created_at=BASE_TIME))
+        store._items[tid] = OrderedIndex()
+        for n in range(items):
+            store._items[tid].append(make_item(tid, n))
+
+
+def seed_sqlite(store: SqliteStore, thread_ids: list[str], items: int) -> None:
+    # Bulk insert directly; going through the async API would take far longer
+    template = _item_adapter.dump_json(make_item("__THREAD__", 0, "__ID__")).decode()
+    conn = store._write_conn
+    conn.execute("BEGIN")
+    for tid in thread_ids:
+        thread = ThreadMetadata(id=tid, created_at=BASE_TIME)
+        conn.execute(
+            "INSERT INTO threads (id, created_at, data) VALUES (?, ?, ?)",
+            (tid, BASE_TIME.timestamp(), thread.model_dump_json()),
+        )
+        rows = []
+        for n in range(items):
+            item_id = str(uuid.uuid4())
+            created_at = BASE_TIME + timedelta(seconds=n)
+            data = (
+                template.replace("__THREAD__", tid)
+                .replace("__ID__", item_id, 1)
+                .replace(BASE_TIME.isoformat(), created_at.isoformat(), 1)
+            )
+            rows.append((item_id, tid, created_at.timestamp(), data))
+        conn.executemany(
+            "INSERT INTO items (id, thread_id, created_at, data) VALUES (?, ?, ?, ?)", rows
+        )
+    conn.execute("COMMIT")
+
+
+async def time_calls(fn, calls: int) -> list[float]:
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def summarize(samples: list[float]) -> str:
+    samples = sorted(samples)
+    pct = lambda p: samples[min(len(samples) - 1, int(len(samples) * p))]
+    return (
+        f"mean {statistics.fmean(samples):7.3f}ms  p50 {pct(0.50):7.3f}ms  "
+        f"p95 {pct(0.95):7.3f}ms  p99 {pct(0.99):7.3f}ms"
+    )
+
+
+async def bench(store, thread_ids: list[str], items: int, calls: int) -> dict[str, list[float]]:
+    rng = random.Random(0)
+
+    async def load() -> None:
+        tid = rng.choice(thread_ids)
+        await store.load_thread_items(tid, after=None, limit=100, order="desc", context=CTX)
+
+    counter = iter(range(items, items + calls))
+
+    async def add() -> None:
+        tid = rng.choice(thread_ids)
+        await store.add_thread_item(tid, make_item(tid, next(counter)), CTX)
+
+    return {
+        "load_thread_items": await time_calls(load, calls),
+        "add_thread_item": await time_calls(add, calls),
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=10_000)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--calls", type=int, default=2_000)
+    parser.add_argument("--stores", default="memory,sqlite")
+    args = parser.parse_args()
+
+    thread_ids = [str(uuid.uuid4()) for _ in range(args.threads)]
+    print(f"Seeding {args.threads} threads x {args.items} items...")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stores: list[tuple[str, object]] = []
+        selected = args.stores.split(",")
+
+        if "memory" in selected:
+            memory = MemoryStore()
+            start = time.perf_counter()
+            seed_memory(memory, thread_ids, args.items)
+            print(f"  MemoryStore seeded in {time.perf_counter() - start:.1f}s")
+            stores.append(("MemoryStore", memory))
+
+        if "sqlite" in selected:
+            sqlite = SqliteStore(os.path.join(tmp, "bench.db"))
+            start = time.perf_counter()
+            seed_sqlite(sqlite, thread_ids, args.items)
+            print(f"  SqliteStore seeded in {time.perf_counter() - start:.1f}s")
+            stores.append(("SqliteStore", sqlite))
+
+        for name, store in stores:
+            results = await bench(store, thread_ids, args.items, args.calls)
+            print(f"\n{name} ({args.calls} calls each)")
+            for op, samples in results.items():
+                print(f"  {op:<18} {summarize(samples)}")
+            if isinstance(store, SqliteStore):
+                store.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
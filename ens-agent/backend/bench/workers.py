@@ -0,0 +1,129 @@
+"""Throughput of the /chatkit endpoint with 1 vs N uvicorn worker processes.
+
+Seeds a shared SQLite store, starts `uvicorn --workers N` for each N, and
+drives it with CONCURRENCY clients issuing ChatKit items.list and
+threads.get_by_id requests (store reads plus ChatKit serialization; no model
+calls) for DURATION seconds.
+
+Usage: python -m bench.workers [--workers 1,4] [--concurrency 32] [--duration 15]
+                               [--threads 1000] [--items 100]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+from app.store import SqliteStore
+from bench.store import seed_sqlite, summarize
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, db_path: str, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "CHATKIT_STORE": "sqlite",
+        "CHATKIT_SQLITE_PATH": db_path,
+        "WEB_CONCURRENCY": str(workers),
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "unused"),
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, workers: int) -> None:
+    # Every worker has to be up, or the first seconds only measure the ones that are
+    pids: set[int] = set()
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            # A new connection per probe, so the kernel can hand it to any worker
+            resp = await client.get("/", headers={"Connection": "close"})
+            pids.add(resp.json()["pid"])
+            if len(pids) >= workers:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.05)
+    raise RuntimeError(f"only {len(pids)} of {workers} workers answered")
+
+
+async def drive(
+    port: int, workers: int, thread_ids: list[str], concurrency: int, duration: float
+) -> tuple[list[float], int]:
+    samples: list[float] = []
+    errors: list[int] = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as client:
+        await wait_ready(client, workers)
+        stop = time.monotonic() + duration
+
+        async def worker(seed: int) -> None:
+            rng = random.Random(seed)
+            while time.monotonic() < stop:
+                thread_id = rng.choice(thread_ids)
+                if rng.random() < 0.8:
+                    body = {"type": "items.list", "params": {"thread_id": thread_id, "limit": 50}}
+                else:
+                    body = {"type": "threads.get_by_id", "params": {"thread_id": thread_id}}
+                start = time.perf_counter()
+                try:
+                    resp = await client.post("/chatkit", content=json.dumps(body))
+                    resp.raise_for_status()
+                except httpx.HTTPError:
+                    errors.append(1)
+                    continue
+                samples.append((time.perf_counter() - start) * 1000)
+
+        await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return samples, len(errors)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", default=f"1,{os.cpu_count() or 1}")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--threads", type=int, default=1_000)
+    parser.add_argument("--items", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        thread_ids = [str(uuid.uuid4()) for _ in range(args.threads)]
+        store = SqliteStore(db_path)
+        seed_sqlite(store, thread_ids, args.items)
+        store.close()
+        print(f"Seeded {args.threads} threads x {args.items} items, {os.cpu_count()} CPUs")
+
+        for workers in sorted({int(n) for n in args.workers.split(",")}):
+            port = free_port()
+            proc = start_server(workers, db_path, port)
+            try:
+                samples, errors = asyncio.run(drive(port, workers, thread_ids, args.concurrency, args.duration))
+            finally:
+                proc.terminate()
+                proc.wait()
+            print(f"\n{workers} worker(s), {args.concurrency} clients, {args.duration:.0f}s")
+            print(f"  {len(samples) / args.duration:8.1f} req/s  {summarize(samples)}  errors {errors}")
+
+
+if __name__ == "__main__":
+    main()
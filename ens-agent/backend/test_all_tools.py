@@ -1,4 +1,4 @@
-"""Test all 16 agent tools via ChatKit endpoint."""
+"""Test all 18 agent tools via ChatKit endpoint."""
 
 import json
 import sys
@@ -8,9 +8,11 @@ import httpx
 CHATKIT_URL = "http://localhost:8000/chatkit"
 
 TESTS = [
-    # --- 9 READ TOOLS ---
+    # --- 11 READ TOOLS ---
     ("ens_check", "Is the name cooltestxyz987.eth available for registration on sepolia? Check for a 1 year duration."),
+    ("ens_check_many", "Check which of these are available on sepolia for 1 year: cooltestxyz987, nick, Cooltestxyz987.eth, anothertestxyz123, vitalik."),
     ("ens_profile", "Show me the full profile for nick.eth on mainnet."),
+    ("ens_profile_many", "Compare the profiles of nick.eth, vitalik.eth and brantly.eth on mainnet in one lookup."),
     ("ens_resolve", "Resolve the email text record for nick.eth on mainnet."),
     ("ens_list", "List all ENS names owned by address 0xb8c2C29ee19D8307cb7255e1Cd9CbDE883A267d5 on mainnet."),
     ("ens_verify", "Verify the records for nick.eth on mainnet."),
@@ -0,0 +1,161 @@
+"""Batch read tools against a stubbed Worker: ens_profile_many and ens_check_many."""
+
+import asyncio
+import json
+
+import pytest
+from agents.tool_context import ToolContext
+
+from app.tools import cache, reads
+from app.tools.cache import READ_CACHE_TTLS, ReadCache
+
+ADDRESS = "0xd8dA6BF26964aF9D7eEd9e03E53415D37aA96045"
+
+
+class Worker:
+    """Stands in for worker_get: answers each request with respond(path, params), counting them."""
+
+    def __init__(self) -> None:
+        self.requests: list[tuple[str, dict]] = []
+        self.respond = lambda path, params: {"ok": True, "data": dict(params)}
+
+    async def __call__(self, path: str, params: dict | None = None) -> str:
+        self.requests.append((path, params or {}))
+        body = self.respond(path, params or {})
+        if isinstance(body, Exception):
+            raise body
+        return json.dumps(body)
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    worker = Worker()
+    monkeypatch.setattr(cache, "worker_get", worker)
+    # A fresh read cache, so every lookup reaches the stub
+    monkeypatch.setattr(cache, "read_cache", ReadCache(100, READ_CACHE_TTLS))
+    return worker
+
+
+def _invoke(tool, **kwargs) -> dict:
+    args = json.dumps(kwargs)
+    ctx = ToolContext(context=None, tool_name=tool.name, tool_call_id="1", tool_arguments=args)
+    return json.loads(asyncio.run(tool.on_invoke_tool(ctx, args)))
+
+
+def test_profiles_are_deduplicated_in_input_order(worker):
+    # Whitespace and case don't make a new input; the first spelling is kept
+    body = _invoke(reads.ens_profile_many, inputs=["nick.eth", ADDRESS, " NICK.eth ", "", ADDRESS.lower()])
+    assert [params["input"] for _, params in worker.requests] == ["nick.eth", ADDRESS]
+    assert [result["input"] for result in body["data"]["results"]] == ["nick.eth", ADDRESS]
+
+
+def test_profiles_mix_names_and_addresses(worker):
+    worker.respond = lambda path, params: {"ok": True, "data": {"input": params["input"], "network": params["network"]}}
+    body = _invoke(reads.ens_profile_many, inputs=[ADDRESS, "nick.eth"], network="mainnet")
+    assert body["ok"] and body["data"]["network"] == "mainnet"
+    assert [(path, params["input"]) for path, params in worker.requests] == [("/profile", ADDRESS), ("/profile", "nick.eth")]
+    assert [(r["input"], r["ok"], r["data"]["input"]) for r in body["data"]["results"]] == [
+        (ADDRESS, True, ADDRESS), ("nick.eth", True, "nick.eth"),
+    ]
+
+
+def test_failed_profile_does_not_fail_the_batch(worker):
+    def respond(path, params):
+        if params["input"] == "down.eth":
+            return ConnectionError("worker down")
+        if params["input"] == "missing.eth":
+            return {"ok": False, "error": {"code": "NOT_FOUND", "message": "no such name"}}
+        return {"ok": True, "data": {"input": params["input"]}}
+
+    worker.respond = respond
+    body = _invoke(reads.ens_profile_many, inputs=["down.eth", "nick.eth", "missing.eth"])
+    results = {result["input"]: result for result in body["data"]["results"]}
+    assert body["ok"]
+    assert results["nick.eth"]["ok"]
+    assert results["down.eth"]["error"] == {"code": "REQUEST_FAILED", "message": "worker down"}
+    assert results["missing.eth"]["error"]["code"] == "NOT_FOUND"
+
+
+def test_profile_inputs_are_limited(worker, monkeypatch):
+    monkeypatch.setattr(reads, "PROFILE_MANY_MAX", 3)
+    # Repeats don't count towards the limit
+    assert _invoke(reads.ens_profile_many, inputs=["a.eth", "b.eth", "c.eth", "A.eth"])["ok"]
+    over = _invoke(reads.ens_profile_many, inputs=["a.eth", "b.eth", "c.eth", "d.eth"])
+    empty = _invoke(reads.ens_profile_many, inputs=[" ", ""])
+    assert over["error"]["code"] == "INVALID_PARAM"
+    assert empty["error"]["code"] == "MISSING_PARAM"
+    assert len(worker.requests) == 3
+
+
+def _checked(prices: dict[str, tuple[str, str] | None]):
+    """Worker /check responses: label -> (total, premium) if available, None if taken."""
+
+    def respond(path, params):
+        label = params["label"]
+        price = prices[label]
+        data = {"available": price is not None, "fullName": f"{label}.eth", "price": None}
+        if price is not None:
+            data["price"] = {"total": price[0], "premium": price[1]}
+        return {"ok": True, "data": data}
+
+    return respond
+
+
+def test_labels_are_normalized_and_deduplicated(worker):
+    worker.respond = _checked({"foo": None, "bar": None})
+    body = _invoke(reads.ens_check_many, labels=["Foo", "foo.eth", " FOO ", "bar.ETH", "", "ab", "sub.foo.eth"])
+    data = body["data"]
+    assert [params["label"] for _, params in worker.requests] == ["foo", "bar"]
+    assert data["checked"] == 2 and data["taken"] == ["foo.eth", "bar.eth"]
+    assert [entry["label"] for entry in data["invalid"]] == ["ab", "sub.foo.eth"]
+
+
+def test_available_names_are_sorted_by_price(worker):
+    worker.respond = _checked({
+        "pricey": ("0.01", "0"),
+        "cheap": ("0.003", "0"),
+        "acheap": ("0.003", "0"),
+        "middle": ("0.0031", "0"),
+        "expired": ("0.5", "0.49"),
+        "taken": None,
+    })
+    data = _invoke(reads.ens_check_many, labels=["pricey", "cheap", "taken", "expired", "middle", "acheap"])["data"]
+    # Cheapest first, by numeric value, ties by name; a premium is shown separately
+    assert data["available"] == [
+        {"name": "acheap.eth", "price_eth": "0.003"},
+        {"name": "cheap.eth", "price_eth": "0.003"},
+        {"name": "middle.eth", "price_eth": "0.0031"},
+        {"name": "pricey.eth", "price_eth": "0.01"},
+        {"name": "expired.eth", "price_eth": "0.5", "premium_eth": "0.49"},
+    ]
+    assert data["taken"] == ["taken.eth"]
+
+
+def test_failed_check_does_not_fail_the_batch(worker):
+    checked = _checked({"good": ("0.003", "0")})
+
+    def respond(path, params):
+        if params["label"] == "slow":
+            return TimeoutError()
+        if params["label"] == "flaky":
+            return {"ok": False, "error": {"code": "RPC_ERROR", "message": "upstream"}}
+        return checked(path, params)
+
+    worker.respond = respond
+    body = _invoke(reads.ens_check_many, labels=["slow", "good", "flaky"])
+    assert body["ok"] and body["data"]["available"] == [{"name": "good.eth", "price_eth": "0.003"}]
+    assert body["data"]["failed"] == [
+        {"label": "slow", "error": {"code": "REQUEST_FAILED", "message": "TimeoutError"}},
+        {"label": "flaky", "error": {"code": "RPC_ERROR", "message": "upstream"}},
+    ]
+
+
+def test_labels_are_limited_after_deduplication(worker, monkeypatch):
+    monkeypatch.setattr(reads, "CHECK_MANY_MAX", 3)
+    worker.respond = _checked({"one": None, "two": None, "three": None})
+    assert _invoke(reads.ens_check_many, labels=["one", "two", "three", "one.eth", "x"])["ok"]
+    over = _invoke(reads.ens_check_many, labels=["one", "two", "three", "four"])
+    empty = _invoke(reads.ens_check_many, labels=[" "])
+    assert over["error"]["code"] == "INVALID_PARAM"
+    assert empty["error"]["code"] == "MISSING_PARAM"
+    assert len(worker.requests) == 3
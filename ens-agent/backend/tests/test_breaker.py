@@ -0,0 +1,81 @@
+"""CircuitBreaker transitions, in particular the single half-open trial."""
+
+from app.tools.helpers import CircuitBreaker
+
+
+def _open(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.threshold):
+        breaker.record(breaker.allow(), False)
+
+
+def _cool_down(breaker: CircuitBreaker) -> None:
+    breaker.opened_at -= breaker.cooldown + 1
+
+
+def _cooled() -> CircuitBreaker:
+    """An open breaker whose cooldown has passed."""
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    _open(breaker)
+    _cool_down(breaker)
+    return breaker
+
+
+def test_opens_after_threshold_failures():
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    breaker.record(breaker.allow(), False)
+    assert breaker.state == "closed"
+    breaker.record(breaker.allow(), False)
+    assert breaker.state == "open"
+    assert breaker.allow() is None
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_success_resets_consecutive_failures():
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    breaker.record(breaker.allow(), False)
+    breaker.record(breaker.allow(), True)
+    breaker.record(breaker.allow(), False)
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_one_trial_through():
+    breaker = _cooled()
+    trial = breaker.allow()
+    assert trial is not None and breaker.state == "half_open"
+    assert breaker.allow() is None
+
+
+def test_trial_success_closes():
+    breaker = _cooled()
+    breaker.record(breaker.allow(), True)
+    assert breaker.state == "closed"
+    assert breaker.allow() is not None
+
+
+def test_trial_failure_reopens():
+    breaker = _cooled()
+    breaker.record(breaker.allow(), False)
+    assert breaker.state == "open"
+    assert breaker.stats()["opened"] == 2
+    assert breaker.allow() is None
+
+
+def test_cancelled_trial_allows_a_new_one():
+    breaker = _cooled()
+    breaker.record(breaker.allow(), None)
+    assert breaker.state == "half_open"
+    assert breaker.allow() is not None
+
+
+def test_older_requests_do_not_end_the_trial():
+    breaker = CircuitBreaker(threshold=2, cooldown=60)
+    in_flight = breaker.allow()
+    _open(breaker)
+    _cool_down(breaker)
+    trial = breaker.allow()
+    # A request from before the breaker opened completes during the trial
+    breaker.record(in_flight, False)
+    assert breaker.state == "half_open"
+    assert breaker.allow() is None
+    breaker.record(trial, True)
+    assert breaker.state == "closed"
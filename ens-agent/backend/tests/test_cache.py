@@ -0,0 +1,111 @@
+"""ReadCache expiry, LRU eviction and invalidation, and invalidation after a signed transaction."""
+
+from datetime import datetime, timezone
+
+import pytest
+from chatkit.types import ClientToolCallItem
+
+from app import server
+from app.tools import cache
+from app.tools.cache import ReadCache
+
+WALLET = "0x000000000000000000000000000000000000dEaD"
+
+
+class _Clock:
+    now = 1000.0
+
+    @classmethod
+    def monotonic(cls) -> float:
+        return cls.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    monkeypatch.setattr(cache, "time", _Clock)
+    _Clock.now = 1000.0
+    return _Clock
+
+
+def _cache(max_entries: int = 10) -> ReadCache:
+    return ReadCache(max_entries, {"ens_check": 30, "ens_profile": 60, "ens_list": 60})
+
+
+def test_entries_expire_after_their_tool_ttl(clock):
+    reads = _cache()
+    check = reads.key("ens_check", {"label": "foo"})
+    profile = reads.key("ens_profile", {"input": "foo.eth"})
+    reads.set(check, "check")
+    reads.set(profile, "profile")
+    clock.now += 31
+    assert reads.get(check) is None
+    assert reads.get(profile) == "profile"
+    assert reads.stats()["entries"] == 1
+
+
+def test_keys_normalize_params_and_network():
+    reads = _cache()
+    assert reads.key("ens_profile", {"input": " Foo.ETH ", "network": None}) == reads.key(
+        "ens_profile", {"input": "foo.eth", "network": "sepolia"}
+    )
+    assert reads.key("ens_profile", {"input": "foo.eth", "network": "mainnet"}) != reads.key(
+        "ens_profile", {"input": "foo.eth"}
+    )
+
+
+def test_tools_without_a_ttl_are_not_cached():
+    reads = _cache()
+    key = reads.key("ens_verify", {"name": "foo.eth"})
+    reads.set(key, "verify")
+    assert reads.get(key) is None
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    reads = _cache(max_entries=2)
+    a, b, c = (reads.key("ens_profile", {"input": name}) for name in ("a.eth", "b.eth", "c.eth"))
+    reads.set(a, "a")
+    reads.set(b, "b")
+    reads.get(a)
+    reads.set(c, "c")
+    assert reads.get(b) is None
+    assert reads.get(a) == "a" and reads.get(c) == "c"
+    assert reads.stats()["evictions"] == 1
+
+
+def test_invalidate_drops_name_label_and_owner_keys(clock):
+    reads = _cache()
+    keys = {
+        "profile": reads.key("ens_profile", {"input": "foo.eth"}),
+        "check": reads.key("ens_check", {"label": "foo", "duration": "1y"}),
+        "list": reads.key("ens_list", {"address": WALLET}),
+        "other": reads.key("ens_profile", {"input": "bar.eth"}),
+    }
+    for name, key in keys.items():
+        reads.set(key, name)
+    assert reads.invalidate("Foo.eth", WALLET.lower()) == 3
+    assert reads.get(keys["other"]) == "other"
+    assert all(reads.get(keys[name]) is None for name in ("profile", "check", "list"))
+    assert reads.invalidate("", None) == 0
+
+
+def _signed(output: dict, operation: str = "foo.eth") -> ClientToolCallItem:
+    return ClientToolCallItem(
+        id="c", thread_id="t", created_at=datetime.now(timezone.utc), status="completed",
+        call_id="call", name="sign_transaction",
+        arguments={"tx": {"to": "0x1"}, "operation": operation, "operation_type": "register"},
+        output=output,
+    )
+
+
+def test_signed_transaction_invalidates_name_and_wallet(clock, monkeypatch):
+    reads = _cache()
+    monkeypatch.setattr(server, "read_cache", reads)
+    profile = reads.key("ens_profile", {"input": "foo.eth"})
+    owned = reads.key("ens_list", {"address": WALLET})
+
+    reads.set(profile, "profile")
+    reads.set(owned, "list")
+    server._invalidate_signed_reads(_signed({"success": False, "error": "rejected"}), {"wallet_address": WALLET})
+    assert reads.stats()["entries"] == 2
+    server._invalidate_signed_reads(_signed({"success": True, "tx_hash": "0xabc"}), {"wallet_address": WALLET})
+    assert reads.get(profile) is None and reads.get(owned) is None
@@ -0,0 +1,89 @@
+"""Parity between app/tools/ens.py and the Worker's /namehash, /labelhash and /deployments.
+
+Offline, responses are compared with recorded Worker responses and the
+deployments table with ens-agent-api/src/lib/config.ts. Set ENS_PARITY_LIVE=1
+to also byte-compare against the Worker at WORKER_URL.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+
+import httpx
+import pytest
+
+from app.tools.ens import DEPLOYMENTS_RESPONSE, ENS_DEPLOYMENTS, labelhash_response, namehash_response
+
+WORKER_URL = os.environ.get("WORKER_URL", "http://localhost:8787")
+CONFIG_TS = Path(__file__).resolve().parents[3] / "ens-agent-api" / "src" / "lib" / "config.ts"
+
+live = pytest.mark.skipif(
+    os.environ.get("ENS_PARITY_LIVE", "").lower() not in ("1", "true", "yes"),
+    reason="set ENS_PARITY_LIVE=1 to compare against a running Worker",
+)
+
+VITALIK_NODE = "0xee6c4522aab0003e8d14cd40a6af439055fd2577951148c14b6cea9a53475835"
+VITALIK_LABELHASH = "0xaf2caa1c2ca1d027f1ac823b529d0a67cd144264b2789fa2ea4d63a67c7103cc"
+
+# (route, query value, recorded Worker response body)
+RECORDED = [
+    ("namehash", "vitalik.eth", '{"ok":true,"data":{"name":"vitalik.eth","node":"%s"}}' % VITALIK_NODE),
+    ("namehash", "vitalik", '{"ok":true,"data":{"name":"vitalik.eth","node":"%s"}}' % VITALIK_NODE),
+    ("namehash", "Vitalik", '{"ok":true,"data":{"name":"vitalik.eth","node":"%s"}}' % VITALIK_NODE),
+    ("namehash", "foo.eth", '{"ok":true,"data":{"name":"foo.eth","node":"0xde9b09fd7c5f901e23a3f19fecc54828e9c848539801e86591bd9801b019f84f"}}'),
+    # A bare "eth" is treated as a label, so the Worker hashes eth.eth
+    ("namehash", "eth", '{"ok":true,"data":{"name":"eth.eth","node":"0x46d0423629b535bc111eb87598fbafd9f5463077e3832e2b980e7025d052e52d"}}'),
+    ("namehash", f"[{VITALIK_LABELHASH[2:]}].eth", '{"ok":true,"data":{"name":"[%s].eth","node":"%s"}}' % (VITALIK_LABELHASH[2:], VITALIK_NODE)),
+    ("namehash", "", '{"ok":false,"error":{"code":"MISSING_PARAM","message":"name is required"}}'),
+    ("labelhash", "vitalik", '{"ok":true,"data":{"label":"vitalik","labelhash":"%s"}}' % VITALIK_LABELHASH),
+    ("labelhash", "Vitalik", '{"ok":true,"data":{"label":"vitalik","labelhash":"%s"}}' % VITALIK_LABELHASH),
+    ("labelhash", "vitalik.eth", '{"ok":true,"data":{"label":"vitalik","labelhash":"%s"}}' % VITALIK_LABELHASH),
+    ("labelhash", "", '{"ok":false,"error":{"code":"MISSING_PARAM","message":"label is required"}}'),
+]
+
+# Extra inputs only checked against a live Worker (unicode, emoji, mixed case)
+LIVE_ONLY = [
+    ("namehash", "Nick.ETH"),
+    ("namehash", "sub.nick.eth"),
+    ("namehash", "ñandú"),
+    ("namehash", "🔥🔥🔥"),
+    ("labelhash", "ÑANDÚ"),
+    ("labelhash", "🔥🔥🔥"),
+]
+
+
+def _local(route: str, value: str) -> str:
+    return namehash_response(value) if route == "namehash" else labelhash_response(value)
+
+
+@pytest.mark.parametrize(("route", "value", "expected"), RECORDED)
+def test_matches_recorded_worker_response(route, value, expected):
+    assert _local(route, value) == expected
+
+
+def test_deployments_match_config_ts():
+    """ENS_DEPLOYMENTS parsed out of config.ts equals the embedded table."""
+    source = CONFIG_TS.read_text()
+    body = re.search(r"ENS_DEPLOYMENTS[^=]*=\s*(\{.*?\n\});", source, re.S).group(1)
+    body = re.sub(r"^(\s*)(\w+):", r'\1"\2":', body, flags=re.M)
+    body = re.sub(r",(\s*[}\]])", r"\1", body)
+    assert json.loads(body) == ENS_DEPLOYMENTS
+
+
+@pytest.fixture(scope="module")
+def worker():
+    with httpx.Client(base_url=WORKER_URL, timeout=30) as client:
+        yield client
+
+
+@live
+@pytest.mark.parametrize(("route", "value"), [(route, value) for route, value, _ in RECORDED] + LIVE_ONLY)
+def test_matches_live_worker(worker, route, value):
+    param = "name" if route == "namehash" else "label"
+    assert _local(route, value) == worker.get(f"/{route}", params={param: value}).text
+
+
+@live
+def test_deployments_match_live_worker(worker):
+    assert DEPLOYMENTS_RESPONSE == worker.get("/deployments").text
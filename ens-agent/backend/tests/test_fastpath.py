@@ -0,0 +1,101 @@
+"""Fast-path matching and the network an availability check resolves to."""
+
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import pytest
+from chatkit.types import InferenceOptions, UserMessageItem, UserMessageTextContent
+
+from app import fastpath
+from app.fastpath import FastPath, Match, match, thread_network
+
+
+def _message(text: str) -> UserMessageItem:
+    return UserMessageItem(
+        id="m",
+        thread_id="t",
+        created_at=datetime.now(timezone.utc),
+        content=[UserMessageTextContent(text=text)],
+        attachments=[],
+        inference_options=InferenceOptions(),
+    )
+
+
+@pytest.mark.parametrize("text", [
+    "is it available?",
+    "Is that still available on mainnet?",
+    "what's the namehash of?",
+    "labelhash for this",
+])
+def test_pronouns_and_filler_are_not_names(text):
+    assert match(_message(text)) is None
+
+
+def test_quoted_word_is_taken_literally():
+    found = match(_message('labelhash of "it"'))
+    assert found is not None and found.name == "it"
+
+
+def _network(context, earlier=None):
+    async def texts():
+        return earlier
+
+    return asyncio.run(thread_network(context, texts if earlier is not None else None))
+
+
+def test_network_from_wallet_chain_and_thread():
+    assert _network({"chain_id": "1"}) == "mainnet"
+    assert _network({}, ["let's register something on sepolia"]) == "sepolia"
+    assert _network({"chain_id": "11155111"}, ["is it cheaper on Sepolia?"]) == "sepolia"
+
+
+def test_ambiguous_network_is_none():
+    assert _network({}) is None
+    assert _network({}, ["no network mentioned"]) is None
+    assert _network({"chain_id": "1"}, ["try it on sepolia"]) is None
+    assert _network({}, ["mainnet or sepolia?"]) is None
+    assert _network({"chain_id": "137"}) is None
+
+
+def test_check_falls_back_without_eth_or_network():
+    async def scenario():
+        fast_path = FastPath()
+        # A bare word isn't an explicit .eth name; no network can be resolved
+        answers = [
+            await fast_path.answer(_message("is foo available on sepolia")),
+            await fast_path.answer(_message("is foo.eth available")),
+            await fast_path.answer(_message("is ab.eth available on sepolia")),
+        ]
+        return answers, fast_path.fallbacks
+
+    assert asyncio.run(scenario()) == ([None, None, None], 3)
+
+
+@pytest.mark.parametrize("text, network", [
+    ("show the deployments", None),
+    ("ens contracts on sepolia", "sepolia"),
+    ("what are the ens contract addresses on mainnet?", "mainnet"),
+])
+def test_deployments_requests(text, network):
+    assert match(_message(text)) == Match("deployments", "", network)
+
+
+@pytest.mark.parametrize("text", ["contracts", "deployments", "the contracts?", "deployments on mainnet"])
+def test_bare_deployments_word_is_not_a_request(text):
+    assert match(_message(text)) is None
+
+
+def test_available_price_quotes_the_buffer_and_refund(monkeypatch):
+    async def check(tool, path, params):
+        return json.dumps({"ok": True, "data": {
+            "available": True,
+            "fullName": "foo.eth",
+            "network": params["network"],
+            "price": {"total": "0.003", "total_with_buffer": "0.0033"},
+        }})
+
+    monkeypatch.setattr(fastpath, "cached_get", check)
+    text = asyncio.run(FastPath().answer(_message("is foo.eth available on sepolia")))
+    assert "costs 0.003 ETH" in text
+    assert "0.0033 ETH, a 10% buffer, and the excess is refunded" in text
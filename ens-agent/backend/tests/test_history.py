@@ -0,0 +1,188 @@
+"""Incremental agent input conversion, and history summaries computed off the request path."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from chatkit.agents import ThreadItemConverter
+from chatkit.types import (
+    AssistantMessageContent,
+    AssistantMessageItem,
+    InferenceOptions,
+    ThreadMetadata,
+    UserMessageItem,
+    UserMessageTextContent,
+)
+
+from app.history import AgentInputCache
+from app.server import SUMMARY_KEY, ENSChatKitServer, HistoryPolicy
+from app.store import MemoryStore
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _turns(count: int) -> list:
+    items = []
+    for n in range(count):
+        at = START + timedelta(minutes=n)
+        items.append(UserMessageItem(
+            id=f"u{n}", thread_id="t", created_at=at,
+            content=[UserMessageTextContent(text=f"question {n}")],
+            attachments=[], inference_options=InferenceOptions(),
+        ))
+        items.append(AssistantMessageItem(
+            id=f"a{n}", thread_id="t", created_at=at + timedelta(seconds=1),
+            content=[AssistantMessageContent(text=f"answer {n}")],
+        ))
+    return items
+
+
+def _texts(input_items: list) -> list[str]:
+    texts = []
+    for item in input_items:
+        content = item["content"]
+        texts.append(content if isinstance(content, str) else " ".join(part["text"] for part in content))
+    return texts
+
+
+async def _cached(count: int = 2) -> tuple[MemoryStore, AgentInputCache, list]:
+    store = MemoryStore()
+    await store.save_thread(ThreadMetadata(id="t", created_at=START), {})
+    items = _turns(count)
+    for item in items:
+        await store.add_thread_item("t", item, {})
+    return store, AgentInputCache(ThreadItemConverter(), store), items
+
+
+def test_input_cache_reuses_unchanged_items():
+    async def scenario():
+        store, cache, items = await _cached()
+        first = await cache.to_agent_input("t", items)
+        second = await cache.to_agent_input("t", items)
+        return first, second, cache
+
+    first, second, cache = asyncio.run(scenario())
+    assert first == second
+    assert cache.converted == 4 and cache.reused == 4
+
+
+def test_input_cache_reconverts_saved_and_readded_items():
+    async def scenario():
+        store, cache, items = await _cached()
+        await cache.to_agent_input("t", items)
+        items[1].content = [AssistantMessageContent(text="edited")]
+        await store.save_item("t", items[1], {})
+        edited = _texts(await cache.to_agent_input("t", items))
+        # Deleted and added again under the same id
+        await store.delete_thread_item("t", "a1", {})
+        items[3] = AssistantMessageItem(
+            id="a1", thread_id="t", created_at=items[3].created_at,
+            content=[AssistantMessageContent(text="replaced")],
+        )
+        await store.add_thread_item("t", items[3], {})
+        replaced = _texts(await cache.to_agent_input("t", items))
+        return edited, replaced, cache.converted
+
+    edited, replaced, converted = asyncio.run(scenario())
+    assert edited == ["question 0", "edited", "question 1", "answer 1"]
+    assert replaced == ["question 0", "edited", "question 1", "replaced"]
+    assert converted == 6
+
+
+def test_input_cache_reconverts_quoted_message_once_it_is_no_longer_last():
+    async def scenario():
+        store, cache, items = await _cached(1)
+        quoted = UserMessageItem(
+            id="q", thread_id="t", created_at=START + timedelta(hours=1),
+            content=[UserMessageTextContent(text="what about this?")], quoted_text="answer 0",
+            attachments=[], inference_options=InferenceOptions(),
+        )
+        await store.add_thread_item("t", quoted, {})
+        last = await cache.convert("t", [*items, quoted])
+        reply = AssistantMessageItem(
+            id="r", thread_id="t", created_at=START + timedelta(hours=2),
+            content=[AssistantMessageContent(text="reply")],
+        )
+        await store.add_thread_item("t", reply, {})
+        earlier = await cache.convert("t", [*items, quoted, reply])
+        again = await cache.convert("t", [*items, quoted, reply])
+        return last[-1], earlier[-2], again[-2], cache
+
+    last, earlier, again, cache = asyncio.run(scenario())
+    assert last.as_last and not earlier.as_last
+    assert last.input != earlier.input
+    assert again is earlier
+    assert cache.converted == 5
+
+
+def test_input_cache_prunes_deleted_items():
+    async def scenario():
+        store, cache, items = await _cached(20)
+        await cache.convert("t", items)
+        await cache.convert("t", items[-2:])
+        return cache._threads["t"]
+
+    assert sorted(asyncio.run(scenario())) == ["a19", "u19"]
+
+
+async def _server(items: list) -> tuple[ENSChatKitServer, ThreadMetadata, asyncio.Event]:
+    store = MemoryStore()
+    server = ENSChatKitServer(store, HistoryPolicy(token_budget=100_000, keep_recent_turns=1, max_recent_turns=2))
+    release = asyncio.Event()
+
+    async def summarize(previous, folded):
+        await release.wait()
+        return "summary"
+
+    server._summarize = summarize
+    thread = ThreadMetadata(id="t", created_at=START)
+    await store.save_thread(thread, {})
+    for item in items:
+        await store.add_thread_item("t", item, {})
+    return server, thread, release
+
+
+def test_summary_is_computed_in_the_background():
+    async def scenario():
+        items = _turns(3)
+        server, thread, release = await _server(items)
+        # The summarizer hasn't returned, yet the turn gets its input
+        pending = _texts(await server._history_input(thread, items, {}))
+        release.set()
+        await server._summaries["t"]
+        stored = (await server.store.load_thread("t", {})).metadata[SUMMARY_KEY]
+        summarized = _texts(await server._history_input(thread, items, {}))
+        return pending, stored, summarized
+
+    pending, stored, summarized = asyncio.run(scenario())
+    assert pending == [f"{kind} {n}" for n in range(3) for kind in ("question", "answer")]
+    assert stored["through"] == "a1" and stored["text"] == "summary"
+    assert summarized[1:] == ["question 2", "answer 2"]
+    assert summarized[0].endswith("summary")
+
+
+def test_summary_placed_after_its_last_item_is_deleted():
+    async def scenario():
+        items = _turns(3)
+        server, thread, release = await _server(items)
+        thread.metadata[SUMMARY_KEY] = {
+            "through": "a1", "through_at": items[3].created_at.isoformat(), "text": "summary",
+        }
+        remaining = [item for item in items if item.id != "a1"]
+        return _texts(await server._history_input(thread, remaining, {}))
+
+    texts = asyncio.run(scenario())
+    assert texts[1:] == ["question 2", "answer 2"]
+
+
+def test_summary_without_timestamp_sends_only_the_window():
+    async def scenario():
+        items = _turns(3)
+        server, thread, release = await _server(items)
+        thread.metadata[SUMMARY_KEY] = {"through": "gone", "text": "summary"}
+        texts = _texts(await server._history_input(thread, items, {}))
+        release.set()
+        await server._summaries["t"]
+        return texts
+
+    texts = asyncio.run(scenario())
+    assert texts[1:] == ["question 2", "answer 2"]
@@ -0,0 +1,154 @@
+"""Keyset cursor paging of threads and items, for both stores."""
+
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from chatkit.types import AssistantMessageContent, AssistantMessageItem, ThreadMetadata
+
+from app.store import MemoryStore, SqliteStore
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryStore()
+        return
+    store = SqliteStore(os.path.join(tmp_path, "store.db"))
+    yield store
+    store.close()
+
+
+def _item(n: int, at: datetime | None = None) -> AssistantMessageItem:
+    return AssistantMessageItem(
+        id=f"i{n}",
+        thread_id="t",
+        created_at=at or START + timedelta(seconds=n),
+        content=[AssistantMessageContent(text=str(n))],
+    )
+
+
+async def _fill(store, count: int, same_time: bool = False) -> None:
+    await store.save_thread(ThreadMetadata(id="t", created_at=START), {})
+    for n in range(count):
+        await store.add_thread_item("t", _item(n, START if same_time else None), {})
+
+
+async def _walk(store, order: str, limit: int, between=None) -> list[tuple[list[str], bool, str | None]]:
+    """Every page of thread t's items; `between` runs after each page."""
+    pages, after = [], None
+    while True:
+        page = await store.load_thread_items("t", after, limit, order, {})
+        pages.append(([item.id for item in page.data], page.has_more, page.after))
+        if not page.has_more:
+            return pages
+        after = page.after
+        if between is not None:
+            await between()
+
+
+def test_items_page_ascending(store):
+    async def scenario():
+        await _fill(store, 5)
+        return await _walk(store, "asc", 2)
+
+    assert asyncio.run(scenario()) == [
+        (["i0", "i1"], True, "i1"),
+        (["i2", "i3"], True, "i3"),
+        (["i4"], False, None),
+    ]
+
+
+def test_items_page_descending(store):
+    async def scenario():
+        await _fill(store, 5)
+        return await _walk(store, "desc", 2)
+
+    assert asyncio.run(scenario()) == [
+        (["i4", "i3"], True, "i3"),
+        (["i2", "i1"], True, "i1"),
+        (["i0"], False, None),
+    ]
+
+
+def test_last_page_ending_on_the_boundary_has_no_more(store):
+    async def scenario():
+        await _fill(store, 4)
+        return await _walk(store, "asc", 2)
+
+    assert asyncio.run(scenario())[-1] == (["i2", "i3"], False, None)
+
+
+def test_newest_items_first(store):
+    async def scenario():
+        await _fill(store, 5)
+        page = await store.load_thread_items("t", None, 3, "desc", {})
+        return [item.id for item in page.data], page.has_more
+
+    assert asyncio.run(scenario()) == (["i4", "i3", "i2"], True)
+
+
+def test_ties_on_created_at_keep_insertion_order(store):
+    async def scenario():
+        await _fill(store, 5, same_time=True)
+        return await _walk(store, "asc", 2), await _walk(store, "desc", 2)
+
+    ascending, descending = asyncio.run(scenario())
+    assert [item for ids, _, _ in ascending for item in ids] == ["i0", "i1", "i2", "i3", "i4"]
+    assert [item for ids, _, _ in descending for item in ids] == ["i4", "i3", "i2", "i1", "i0"]
+
+
+@pytest.mark.parametrize("cursor", ["missing", "i1"])
+def test_unknown_or_deleted_cursor_gives_an_empty_page(store, cursor):
+    async def scenario():
+        await _fill(store, 5)
+        await store.delete_thread_item("t", "i1", {})
+        return [await store.load_thread_items("t", cursor, 2, order, {}) for order in ("asc", "desc")]
+
+    for page in asyncio.run(scenario()):
+        assert page.data == [] and not page.has_more and page.after is None
+
+
+def test_paging_is_stable_while_items_are_appended(store):
+    added = iter(range(5, 8))
+
+    async def append():
+        n = next(added, None)
+        if n is not None:
+            await store.add_thread_item("t", _item(n), {})
+
+    async def scenario():
+        await _fill(store, 5)
+        ascending = await _walk(store, "asc", 2, between=append)
+        await store.delete_thread("t", {})
+        await _fill(store, 5)
+        descending = await _walk(store, "desc", 2, between=append)
+        return ascending, descending
+
+    ascending, descending = asyncio.run(scenario())
+    # Each item exactly once, in order, including those added while paging
+    assert [item for ids, _, _ in ascending for item in ids] == [f"i{n}" for n in range(8)]
+    # Newer items never show up behind a descending cursor
+    assert [item for ids, _, _ in descending for item in ids] == ["i4", "i3", "i2", "i1", "i0"]
+
+
+def test_threads_page_in_both_orders(store):
+    async def scenario():
+        for n in range(5):
+            await store.save_thread(ThreadMetadata(id=f"t{n}", created_at=START + timedelta(seconds=n)), {})
+        pages = {}
+        for order in ("asc", "desc"):
+            first = await store.load_threads(2, None, order, {})
+            second = await store.load_threads(2, first.after, order, {})
+            third = await store.load_threads(2, second.after, order, {})
+            pages[order] = [([t.id for t in page.data], page.has_more) for page in (first, second, third)]
+        unknown = await store.load_threads(2, "missing", "asc", {})
+        return pages, unknown
+
+    pages, unknown = asyncio.run(scenario())
+    assert pages["asc"] == [(["t0", "t1"], True), (["t2", "t3"], True), (["t4"], False)]
+    assert pages["desc"] == [(["t4", "t3"], True), (["t2", "t1"], True), (["t0"], False)]
+    assert unknown.data == [] and not unknown.has_more
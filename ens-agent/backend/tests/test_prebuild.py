@@ -0,0 +1,101 @@
+"""Prepared register txs outliving the Worker's single-use commit session."""
+
+import asyncio
+import json
+import os
+
+import httpx
+
+from app.store import SqliteStore
+from app.tools import helpers
+from app.tools.prebuild import RegisterPrebuilds
+
+READY = json.dumps({"ok": True, "data": {"tx": {"to": "0xc0ffee", "data": "0x", "value": "1"}}})
+GONE = json.dumps({"ok": False, "error": {"code": "SESSION_EXPIRED", "message": "Session not found"}})
+
+
+def _worker(sessions: set[str]) -> list[str]:
+    """A Worker that deletes each commit session on its first successful /register."""
+    calls = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        session_id = json.loads(request.content)["session_id"]
+        calls.append(session_id)
+        if session_id not in sessions:
+            return httpx.Response(404, text=GONE)
+        sessions.discard(session_id)
+        return httpx.Response(200, text=READY)
+
+    helpers._clients[helpers.WORKER_URL] = httpx.AsyncClient(
+        transport=httpx.MockTransport(handle), base_url=helpers.WORKER_URL
+    )
+    return calls
+
+
+def test_prepared_tx_is_handed_out_again():
+    async def scenario():
+        calls = _worker({"s"})
+        prebuilds = RegisterPrebuilds(lead=0)
+        prebuilds.schedule("s", 0)
+        first = await prebuilds.take("s")
+        # The user rejected the wallet prompt and asks again
+        second = await prebuilds.take("s")
+        return first, second, calls
+
+    first, second, calls = asyncio.run(scenario())
+    assert first == second == READY
+    assert calls == ["s"]
+
+
+def test_prepared_txs_are_not_evicted():
+    async def scenario():
+        _worker({"a", "b", "c"})
+        prebuilds = RegisterPrebuilds(lead=0, max_sessions=1)
+        for session_id in ("a", "b", "c"):
+            prebuilds.schedule(session_id, 0)
+            await prebuilds.take(session_id)
+        return [await prebuilds.take(session_id) for session_id in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == [READY] * 3
+
+
+def test_expired_prepared_tx_is_dropped():
+    async def scenario():
+        _worker({"s"})
+        prebuilds = RegisterPrebuilds(lead=0, retention=60)
+        prebuilds.schedule("s", 0)
+        await prebuilds.take("s")
+        prebuilds._builds["s"].built_at -= 61
+        return await prebuilds.take("s"), prebuilds.stats()["ready"]
+
+    assert asyncio.run(scenario()) == (None, 0)
+
+
+def test_prepared_tx_survives_a_restart(tmp_path):
+    path = os.path.join(tmp_path, "store.db")
+
+    async def scenario():
+        calls = _worker({"s"})
+        store = SqliteStore(path)
+        try:
+            before = RegisterPrebuilds(lead=0, prepared=store)
+            before.schedule("s", 0)
+            await before.take("s")
+        finally:
+            store.close()
+        store = SqliteStore(path)
+        try:
+            # After the restart the countdown completes before any rebuild is scheduled
+            after = RegisterPrebuilds(lead=0, prepared=store)
+            taken = await after.take("s")
+            # A rebuild scheduled from the thread history uses the stored tx too
+            again = RegisterPrebuilds(lead=0, prepared=store)
+            again.schedule("s", 0)
+            rebuilt = await again.take("s")
+        finally:
+            store.close()
+        return taken, rebuilt, calls
+
+    taken, rebuilt, calls = asyncio.run(scenario())
+    assert taken == rebuilt == READY
+    assert calls == ["s"]
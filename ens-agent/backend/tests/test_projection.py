@@ -0,0 +1,53 @@
+"""ens_list paging and sampled token counts in tool output projection."""
+
+import asyncio
+import json
+
+import httpx
+from agents.tool_context import ToolContext
+
+from app.tools import helpers
+from app.tools.cache import read_cache
+from app.tools.projection import OutputProjection, output_projection
+from app.tools.reads import ens_list
+
+ADDRESS = "0x000000000000000000000000000000000000dEaD"
+
+
+def _worker(count: int) -> None:
+    names = [{"name": f"{'dao' if n % 10 == 0 else 'name'}{n}.eth"} for n in range(count)]
+    body = json.dumps({"ok": True, "data": {"address": ADDRESS, "names": names, "total": count, "network": "sepolia"}})
+    helpers._clients[helpers.WORKER_URL] = httpx.AsyncClient(
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, text=body)),
+        base_url=helpers.WORKER_URL,
+    )
+
+
+def _list(**kwargs) -> dict:
+    args = json.dumps({"address": ADDRESS, **kwargs})
+    ctx = ToolContext(context=None, tool_name="ens_list", tool_call_id="1", tool_arguments=args)
+    return json.loads(asyncio.run(ens_list.on_invoke_tool(ctx, args)))["data"]
+
+
+def test_ens_list_pages_and_filters():
+    read_cache.invalidate(ADDRESS)
+    _worker(60)
+    limit = output_projection.max_items
+    first, second = _list(), _list(offset=limit)
+    matching = _list(contains="DAO")
+    assert first["names"][0]["name"] == "dao0.eth" and first["names_omitted"] == 60 - limit
+    assert second["names"][0]["name"] == f"name{limit}.eth" and second["offset"] == limit
+    assert [entry["name"] for entry in matching["names"]] == [f"dao{n}.eth" for n in range(0, 60, 10)]
+    assert matching["matched"] == 6 and "names_omitted" not in matching
+
+
+def test_tokens_are_sampled_and_estimated():
+    projection = OutputProjection(token_sample=4)
+    response = json.dumps({"ok": True, "data": {"name": "nick.eth", "description": "x" * 400}})
+    calls = []
+    for _ in range(8):
+        projection.project("ens_profile", response)
+        calls.append(list(projection._samples["ens_profile", "raw"]))
+    totals = projection.stats()["ens_profile"]
+    assert calls[0] == calls[3] and calls[4] != calls[3]
+    assert totals["tokens_raw"] > 0 and totals["tokens_projected"] > 0
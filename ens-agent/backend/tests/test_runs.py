@@ -0,0 +1,240 @@
+"""Per-thread run locks and action idempotency keys, including their release paths."""
+
+import asyncio
+import os
+from datetime import datetime, timezone
+
+import pytest
+from chatkit.types import Action, ThreadMetadata
+
+from app.runs import IdempotencyKeys, RunQueueFull, ThreadRunQueue
+from app.server import ENSChatKitServer
+from app.store import MemoryStore, SqliteStore
+
+KEY = ("thread", "tx_confirmed", "0xabc")
+
+
+def _thread() -> ThreadMetadata:
+    return ThreadMetadata(id="thread", created_at=datetime.now(timezone.utc))
+
+
+def _action() -> Action:
+    return Action(type="tx_confirmed", payload={"tx_hash": "0xABC"})
+
+
+def _server(handle) -> ENSChatKitServer:
+    server = ENSChatKitServer(MemoryStore())
+    server._handle_action = handle
+    return server
+
+
+def test_run_lock_released_after_error():
+    async def scenario():
+        runs = ThreadRunQueue()
+        with pytest.raises(ValueError):
+            async with runs.run("t"):
+                raise ValueError
+        async with runs.run("t"):
+            pass
+        return runs.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 0
+    assert stats["runs"] == 2
+
+
+def test_run_queue_rejects_beyond_max_queued():
+    async def scenario():
+        runs = ThreadRunQueue(max_queued=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with runs.run("t"):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with pytest.raises(RunQueueFull):
+            async with runs.run("t"):
+                pass
+        release.set()
+        await asyncio.gather(holder, waiter)
+        return runs
+
+    runs = asyncio.run(scenario())
+    assert runs.rejected == 1
+    assert runs.stats()["active"] == 0
+    assert not runs._locks
+
+
+def test_cancelled_waiter_leaves_no_lock_behind():
+    async def scenario():
+        runs = ThreadRunQueue()
+        release = asyncio.Event()
+
+        async def hold():
+            async with runs.run("t"):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        release.set()
+        await holder
+        return runs
+
+    runs = asyncio.run(scenario())
+    assert runs.stats()["queued"] == 0
+    assert not runs._locks
+
+
+def test_idempotency_key_claim_and_release():
+    async def scenario():
+        keys = IdempotencyKeys()
+        first = await keys.claim(KEY)
+        repeat = await keys.claim(KEY)
+        await keys.release(KEY)
+        retry = await keys.claim(KEY)
+        return first, repeat, retry, keys.duplicates
+
+    assert asyncio.run(scenario()) == (True, False, True, 1)
+
+
+def test_action_keeps_key_after_it_finishes():
+    async def handle(thread, action, context):
+        yield "done"
+
+    async def scenario():
+        server = _server(handle)
+        first = [event async for event in server.action(_thread(), _action(), None, {})]
+        repeat = [event async for event in server.action(_thread(), _action(), None, {})]
+        return first, repeat
+
+    first, repeat = asyncio.run(scenario())
+    assert first == ["done"]
+    assert repeat == []
+
+
+def test_action_releases_key_when_it_fails():
+    async def handle(thread, action, context):
+        raise RuntimeError("agent failed")
+        yield
+
+    async def scenario():
+        server = _server(handle)
+        with pytest.raises(RuntimeError):
+            async for _ in server.action(_thread(), _action(), None, {}):
+                pass
+        return server.action_keys.stats()["keys"]
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_action_releases_key_on_disconnect():
+    async def handle(thread, action, context):
+        yield "started"
+        await asyncio.sleep(60)
+        yield "finished"
+
+    async def scenario():
+        server = _server(handle)
+        stream = server.action(_thread(), _action(), None, {})
+        assert await anext(stream) == "started"
+        # The client went away: ChatKit closes the stream with GeneratorExit
+        await stream.aclose()
+        return server.action_keys.stats()["keys"], server.runs.stats()["active"]
+
+    assert asyncio.run(scenario()) == (0, 0)
+
+
+def test_action_releases_key_when_cancelled():
+    async def scenario():
+        running = asyncio.Event()
+
+        async def handle(thread, action, context):
+            running.set()
+            await asyncio.sleep(60)
+            yield "finished"
+
+        server = _server(handle)
+
+        async def consume():
+            async for _ in server.action(_thread(), _action(), None, {}):
+                pass
+
+        task = asyncio.create_task(consume())
+        await running.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return server.action_keys.stats()["keys"]
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_action_releases_key_when_queue_is_full():
+    async def handle(thread, action, context):
+        yield "done"
+
+    async def scenario():
+        server = _server(handle)
+        server.runs.max_queued = 0
+        release = asyncio.Event()
+
+        async def hold():
+            async with server.runs.run("thread"):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        events = [event async for event in server.action(_thread(), _action(), None, {})]
+        keys = server.action_keys.stats()["keys"]
+        release.set()
+        await holder
+        return events, keys
+
+    events, keys = asyncio.run(scenario())
+    assert len(events) == 1 and events[0].type == "error"
+    assert keys == 0
+
+
+def test_lease_and_keys_are_shared_between_processes(tmp_path):
+    path = os.path.join(tmp_path, "runs.db")
+
+    async def scenario():
+        # Two stores on one file stand in for two worker processes
+        a, b = SqliteStore(path), SqliteStore(path)
+        try:
+            runs_a = ThreadRunQueue(coordination=a, lease_seconds=0.3)
+            runs_b = ThreadRunQueue(coordination=b, lease_seconds=0.3)
+            order = []
+
+            async def run(runs, name):
+                async with runs.run("t"):
+                    order.append(f"{name} start")
+                    # Longer than the lease: it must be renewed
+                    await asyncio.sleep(0.4)
+                    order.append(f"{name} end")
+
+            await asyncio.gather(run(runs_a, "a"), run(runs_b, "b"))
+
+            keys_a, keys_b = IdempotencyKeys(coordination=a), IdempotencyKeys(coordination=b)
+            claimed = await keys_a.claim(KEY)
+            repeat = await keys_b.claim(KEY)
+            await keys_a.release(KEY)
+            retry = await keys_b.claim(KEY)
+            leases = a._read_conn.execute("SELECT COUNT(*) FROM run_leases").fetchone()[0]
+            return order, (claimed, repeat, retry), leases
+        finally:
+            a.close()
+            b.close()
+
+    order, claims, leases = asyncio.run(scenario())
+    assert order in (["a start", "a end", "b start", "b end"], ["b start", "b end", "a start", "a end"])
+    assert claims == (True, False, True)
+    assert leases == 0
@@ -0,0 +1,125 @@
+"""SingleFlight: concurrent identical Worker GETs share one request."""
+
+import asyncio
+
+from app.tools import helpers
+from app.tools.helpers import SingleFlight
+
+
+class Upstream:
+    """A request that counts its calls and finishes when released."""
+
+    def __init__(self, error: Exception | None = None) -> None:
+        self.calls = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+        self.error = error
+
+    async def __call__(self) -> str:
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return "response"
+
+
+def test_concurrent_callers_share_one_request():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        callers = [asyncio.create_task(flight.do("k", upstream)) for _ in range(5)]
+        await asyncio.sleep(0)
+        during = flight.stats()
+        upstream.release.set()
+        results = await asyncio.gather(*callers)
+        return results, upstream.calls, during, flight.stats()
+
+    results, calls, during, after = asyncio.run(scenario())
+    assert results == ["response"] * 5
+    assert calls == 1
+    assert during == {"inflight": 1, "coalesced": 4}
+    assert after == {"inflight": 0, "coalesced": 4}
+
+
+def test_every_waiter_gets_the_failure():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream(ValueError("boom"))
+        callers = [asyncio.create_task(flight.do("k", upstream)) for _ in range(3)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        return await asyncio.gather(*callers, return_exceptions=True), upstream.calls
+
+    results, calls = asyncio.run(scenario())
+    assert calls == 1
+    assert all(isinstance(result, ValueError) and str(result) == "boom" for result in results)
+    assert results[0] is results[1] is results[2]
+
+
+def test_cancelled_waiter_does_not_cancel_the_request():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream()
+        first = asyncio.create_task(flight.do("k", upstream))
+        second = asyncio.create_task(flight.do("k", upstream))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        upstream.release.set()
+        return await second, first.cancelled(), upstream.cancelled
+
+    assert asyncio.run(scenario()) == ("response", True, False)
+
+
+def test_request_completes_after_every_waiter_is_cancelled():
+    async def scenario():
+        flight, upstream = SingleFlight(), Upstream(ValueError("boom"))
+        caller = asyncio.create_task(flight.do("k", upstream))
+        await asyncio.sleep(0)
+        caller.cancel()
+        upstream.release.set()
+        # Nothing awaits the request now; it still finishes and is forgotten
+        for _ in range(3):
+            await asyncio.sleep(0)
+        return upstream.cancelled, flight.stats()
+
+    assert asyncio.run(scenario()) == (False, {"inflight": 0, "coalesced": 0})
+
+
+def test_later_and_different_keys_are_not_coalesced():
+    async def scenario():
+        flight = SingleFlight()
+        a, b = Upstream(), Upstream()
+        a.release.set()
+        b.release.set()
+        await flight.do("a", a)
+        await flight.do("a", a)
+        await asyncio.gather(flight.do("a", a), flight.do("b", b))
+        return a.calls, b.calls, flight.stats()
+
+    assert asyncio.run(scenario()) == (3, 1, {"inflight": 0, "coalesced": 0})
+
+
+def test_worker_get_keys_on_path_and_params(monkeypatch):
+    requests = []
+
+    async def get(path, params):
+        requests.append((path, params))
+        await asyncio.sleep(0)
+        return "{}"
+
+    monkeypatch.setattr(helpers, "_get", get)
+    monkeypatch.setattr(helpers, "worker_singleflight", SingleFlight())
+
+    async def scenario():
+        await asyncio.gather(
+            helpers.worker_get("/check", {"label": "foo", "network": "sepolia"}),
+            # Same query: other order, and a None value that isn't sent
+            helpers.worker_get("/check", {"network": "sepolia", "label": "foo", "duration": None}),
+            helpers.worker_get("/check", {"label": "bar", "network": "sepolia"}),
+        )
+
+    asyncio.run(scenario())
+    assert sorted(params["label"] for _, params in requests) == ["bar", "foo"]
+    assert helpers.worker_singleflight.coalesced == 1
@@ -0,0 +1,176 @@
+"""Store eviction, spill reloads and item versioning."""
+
+import asyncio
+import os
+from datetime import datetime, timezone
+
+from chatkit.agents import ThreadItemConverter
+from chatkit.types import AssistantMessageContent, AssistantMessageItem, ThreadMetadata
+
+from app.history import AgentInputCache
+from app.store import DirectorySpill, MemoryStore, SqliteStore
+
+
+def _thread(thread_id: str) -> ThreadMetadata:
+    return ThreadMetadata(id=thread_id, created_at=datetime.now(timezone.utc))
+
+
+def _item(thread_id: str, item_id: str, text: str) -> AssistantMessageItem:
+    return AssistantMessageItem(
+        id=item_id,
+        thread_id=thread_id,
+        created_at=datetime.now(timezone.utc),
+        content=[AssistantMessageContent(text=text)],
+    )
+
+
+def _texts(agent_input: list) -> list[str]:
+    return [part["text"] for item in agent_input for part in item["content"]]
+
+
+async def _items(store: MemoryStore, thread_id: str) -> list:
+    return (await store.load_thread_items(thread_id, None, 100, "asc", {})).data
+
+
+def test_eviction_spills_and_reloads_items(tmp_path):
+    async def scenario():
+        store = MemoryStore(max_threads=1, spill=DirectorySpill(str(tmp_path)))
+        for thread_id in ("a", "b"):
+            await store.save_thread(_thread(thread_id), {})
+            await store.add_thread_item(thread_id, _item(thread_id, f"{thread_id}1", thread_id), {})
+        spilled = sorted(os.listdir(tmp_path))
+        items = await _items(store, "a")
+        return store, spilled, items
+
+    store, spilled, items = asyncio.run(scenario())
+    assert spilled == ["a.json"]
+    assert [item.id for item in items] == ["a1"]
+    stats = store.stats()
+    assert stats["evictions"] == 2 and stats["reloads"] == 1
+    assert stats["resident_threads"] == 1 and stats["spilled_threads"] == 1
+
+
+def test_eviction_without_spill_drops_the_thread():
+    async def scenario():
+        store = MemoryStore(max_threads=1)
+        await store.save_thread(_thread("a"), {})
+        await store.add_thread_item("a", _item("a", "a1", "hello"), {})
+        await store.save_thread(_thread("b"), {})
+        return store, await _items(store, "a")
+
+    store, items = asyncio.run(scenario())
+    assert items == []
+    assert store.stats()["threads"] == 1
+
+
+def test_stats_does_not_evict():
+    store = MemoryStore(idle_seconds=0.01)
+
+    async def scenario():
+        await store.save_thread(_thread("a"), {})
+        await asyncio.sleep(0.02)
+
+    asyncio.run(scenario())
+    before = store.stats()
+    assert store.stats() == before
+    assert before["resident_threads"] == 1 and before["evictions"] == 0
+
+
+def test_version_never_repeats_after_reload(tmp_path):
+    async def scenario():
+        store = MemoryStore(max_threads=1, spill=DirectorySpill(str(tmp_path)))
+        cache = AgentInputCache(ThreadItemConverter(), store)
+        await store.save_thread(_thread("a"), {})
+        await store.add_thread_item("a", _item("a", "x", "one"), {})
+        await store.save_item("a", _item("a", "x", "two"), {})
+        # Cached at the rewritten version, then evicted and reloaded
+        first = await cache.to_agent_input("a", await _items(store, "a"))
+        version = store.item_version("a", "x")
+        await store.save_thread(_thread("b"), {})
+        await store.save_item("a", _item("a", "x", "three"), {})
+        second = await cache.to_agent_input("a", await _items(store, "a"))
+        return first, second, version, store.item_version("a", "x")
+
+    first, second, before, after = asyncio.run(scenario())
+    assert _texts(first) == ["two"]
+    assert _texts(second) == ["three"]
+    assert after > before
+
+
+def test_concurrent_access_waits_for_reload(tmp_path):
+    async def scenario():
+        store = MemoryStore(max_threads=2, spill=DirectorySpill(str(tmp_path)))
+
+        async def fill(thread_id: str) -> None:
+            await store.save_thread(_thread(thread_id), {})
+            for n in range(10):
+                await store.add_thread_item(thread_id, _item(thread_id, f"{thread_id}-{n}", "x" * 40), {})
+
+        await asyncio.gather(*(fill(f"t{n}") for n in range(6)))
+        return [len(await _items(store, f"t{n}")) for n in range(6)]
+
+    assert asyncio.run(scenario()) == [10] * 6
+
+
+def test_sqlite_versions_reload_after_lru_drop(tmp_path):
+    async def scenario():
+        store = SqliteStore(os.path.join(tmp_path, "store.db"), max_version_threads=1)
+        try:
+            saved = {}
+            for thread_id in ("a", "b"):
+                await store.save_thread(_thread(thread_id), {})
+                item = _item(thread_id, f"{thread_id}1", "hi")
+                await store.add_thread_item(thread_id, item, {})
+                await store.save_item(thread_id, item, {})
+                saved[thread_id] = store.item_version(thread_id, item.id)
+            dropped = store.item_version("a", "a1")
+            await store.load_thread_items("a", None, 10, "asc", {})
+            return saved, dropped, store.item_version("a", "a1"), list(store._versions)
+        finally:
+            store.close()
+
+    saved, dropped, reloaded, resident = asyncio.run(scenario())
+    assert dropped == 0
+    assert reloaded == saved["a"] > 0
+    assert resident == ["a"]
+
+
+def test_readded_item_gets_a_new_version(tmp_path):
+    async def versions(store):
+        await store.save_thread(_thread("a"), {})
+        await store.add_thread_item("a", _item("a", "x", "one"), {})
+        first = store.item_version("a", "x")
+        await store.delete_thread_item("a", "x", {})
+        await store.add_thread_item("a", _item("a", "x", "two"), {})
+        return first, store.item_version("a", "x")
+
+    async def scenario():
+        memory = await versions(MemoryStore())
+        sqlite = SqliteStore(os.path.join(tmp_path, "store.db"))
+        try:
+            return memory, await versions(sqlite)
+        finally:
+            sqlite.close()
+
+    for first, second in asyncio.run(scenario()):
+        assert 0 < first < second
+
+
+def test_sqlite_versions_are_shared_between_processes(tmp_path):
+    path = os.path.join(tmp_path, "store.db")
+
+    async def scenario():
+        # Two stores on one file stand in for two worker processes
+        a, b = SqliteStore(path), SqliteStore(path)
+        try:
+            await a.save_thread(_thread("t"), {})
+            await a.add_thread_item("t", _item("t", "x", "one"), {})
+            await b.add_thread_item("t", _item("t", "y", "one"), {})
+            await a.save_item("t", _item("t", "x", "two"), {})
+            return a.item_version("t", "x"), b.item_version("t", "y")
+        finally:
+            a.close()
+            b.close()
+
+    x, y = asyncio.run(scenario())
+    assert x != y and x > y
@@ -0,0 +1,118 @@
+"""Agent runs with scripted models in place of OpenAI: which tier they go to and their prompt cache key."""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from agents import set_tracing_disabled
+from chatkit.types import InferenceOptions, ThreadMetadata, UserMessageItem, UserMessageTextContent
+
+from app import server as server_module
+from app.agent import LITE_MODEL, ens_agent
+from app.server import TIER_KEY, ENSChatKitServer, HistoryPolicy
+from app.store import MemoryStore
+from bench.fakes import ScriptedModel, ScriptedModelProvider
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def no_tracing():
+    set_tracing_disabled(True)
+    yield
+    set_tracing_disabled(False)
+
+
+class RecordingModel(ScriptedModel):
+    """A ScriptedModel that keeps the model settings of every call."""
+
+    def __init__(self) -> None:
+        super().__init__(first_token_delay=0, token_delay=0)
+        self.settings = []
+
+    def stream_response(self, system_instructions, input, model_settings, *args, **kwargs):
+        self.settings.append(model_settings)
+        return super().stream_response(system_instructions, input, model_settings, *args, **kwargs)
+
+
+class Conversation:
+    """A thread on a server whose lite and full models are scripted and counted."""
+
+    def __init__(self) -> None:
+        self.lite = RecordingModel()
+        self.full = RecordingModel()
+        provider = ScriptedModelProvider(models={LITE_MODEL: self.lite, ens_agent.model: self.full})
+        self.server = ENSChatKitServer(MemoryStore(), HistoryPolicy(summarize=False), model_provider=provider)
+        self.thread = ThreadMetadata(id="t", created_at=START)
+        self.turns = 0
+
+    async def say(self, text: str) -> tuple[int, int]:
+        """Run a turn for a user message; the lite and full model calls it made."""
+        store = self.server.store
+        if self.turns == 0:
+            await store.save_thread(self.thread, {})
+        self.turns += 1
+        await store.add_thread_item("t", UserMessageItem(
+            id=f"u{self.turns}",
+            thread_id="t",
+            created_at=START + timedelta(minutes=self.turns),
+            content=[UserMessageTextContent(text=text)],
+            attachments=[],
+            inference_options=InferenceOptions(),
+        ), {})
+        before = self.lite.calls, self.full.calls
+        async for _ in self.server._run(self.thread, {}):
+            pass
+        return self.lite.calls - before[0], self.full.calls - before[1]
+
+
+def test_read_only_turn_runs_on_lite():
+    async def scenario():
+        conversation = Conversation()
+        calls = await conversation.say("what can you do?")
+        stored = await conversation.server.store.load_thread("t", {})
+        return calls, stored.metadata.get(TIER_KEY)
+
+    assert asyncio.run(scenario()) == ((1, 0), "lite")
+
+
+def test_transaction_request_escalates_and_sticks():
+    async def scenario():
+        conversation = Conversation()
+        read = await conversation.say("hello")
+        # Lite hands off through start_transaction_flow; the full agent answers
+        escalated = await conversation.say("register foo.eth for me")
+        stored = await conversation.server.store.load_thread("t", {})
+        # The rest of the flow stays on the full agent, even read-only turns
+        after = [await conversation.say(text) for text in ("what next?", "thanks")]
+        return read, escalated, stored.metadata.get(TIER_KEY), after
+
+    read, escalated, tier, after = asyncio.run(scenario())
+    assert read == (1, 0)
+    assert escalated == (1, 1)
+    assert tier == "full"
+    assert after == [(0, 1), (0, 1)]
+
+
+def test_tiering_off_runs_everything_on_full(monkeypatch):
+    monkeypatch.setattr(server_module, "MODEL_TIERING", False)
+
+    async def scenario():
+        conversation = Conversation()
+        calls = [await conversation.say(text) for text in ("hello", "register a name for me")]
+        stored = await conversation.server.store.load_thread("t", {})
+        return calls, stored.metadata.get(TIER_KEY)
+
+    assert asyncio.run(scenario()) == ([(0, 1), (0, 1)], None)
+
+
+def test_model_requests_carry_the_thread_prompt_cache_key():
+    async def scenario():
+        conversation = Conversation()
+        for text in ("hello", "register foo.eth for me", "thanks"):
+            await conversation.say(text)
+        return conversation.lite.settings + conversation.full.settings
+
+    settings = asyncio.run(scenario())
+    assert len(settings) == 4
+    assert all((s.extra_args or {}).get("prompt_cache_key") == "t" for s in settings)